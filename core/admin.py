@@ -1,5 +1,14 @@
 from django.contrib import admin
-from .models import Field, Review, Booking, TimeSlot, FieldImage, Match, Team
+from django.db import transaction
+from . import ics
+from .events import log_changes, log_created, update_status
+from .models import (
+    Field, Review, Booking, ArchivedBooking, TimeSlot, FieldImage, Match, Team, TeamBooking, TeamMember,
+    WaitlistEntry, Notification, BookingEvent, Venue, SlotHold, Tournament,
+)
+from .ratings import RATING_FIELDS
+from .venues import staff_bookings, staff_venues
+from .waitlist import release_slots
 
 
 @admin.register(Review)
@@ -7,24 +16,104 @@ class ReviewAdmin(admin.ModelAdmin):
     list_display = ('field', 'user', 'rating', 'created_at')
     list_filter = ('rating', 'field')
 
+@admin.register(Venue)
+class VenueAdmin(admin.ModelAdmin):
+    list_display = ('name', 'address', 'created_at')
+    filter_horizontal = ('staff',)
+
+    def get_queryset(self, request):
+        return staff_venues(request.user)
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ('user', 'field', 'date', 'start_time', 'end_time', 'status')
-    list_filter = ('status', 'date')
+    list_display = ('user', 'field', 'venue', 'date', 'start_time', 'end_time', 'status')
+    list_filter = ('venue', 'status', 'date')
+    readonly_fields = ('venue',)  # follows the field
     actions = ['approve_bookings', 'reject_bookings']
 
+    def get_queryset(self, request):
+        return staff_bookings(request.user, super().get_queryset(request))
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'field' and not request.user.is_superuser:
+            kwargs['queryset'] = Field.objects.filter(venue__staff=request.user)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            old = Booking.objects.select_for_update().filter(pk=obj.pk).first() if change else None
+            super().save_model(request, obj, form, change)
+            if old is None:
+                log_created([obj], actor=request.user)
+            else:
+                log_changes(obj, old_status=old.status, old_payment_status=old.payment_status, actor=request.user)
+            # the events bump the booking's feeds; the old field and user's feeds may show it too
+            ics.bookings_changed([b for b in (old, obj) if b is not None])
+        if old is not None and old.status == 'approved' and obj.status != 'approved':
+            release_slots([old])
+
     def approve_bookings(self, request, queryset):
-        queryset.update(status='approved')
+        update_status(queryset, 'approved', actor=request.user)
     approve_bookings.short_description = "Approve selected bookings"
 
     def reject_bookings(self, request, queryset):
-        queryset.update(status='rejected')
+        changed = update_status(queryset, 'rejected', actor=request.user)
+        release_slots([b for b in changed if b.status == 'approved'])
     reject_bookings.short_description = "Reject selected bookings"
 
 
-@admin.register(Field)
-class FieldAdmin(admin.ModelAdmin):
-    list_display = ('name', 'location', 'price_per_hour', 'is_available')
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'field', 'venue', 'date', 'start_time', 'end_time', 'status', 'payment_status')
+    list_filter = ('venue', 'status', 'payment_status', 'date')
+
+    def get_queryset(self, request):
+        return staff_bookings(request.user, super().get_queryset(request))
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BookingEvent)
+class BookingEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'booking_id', 'kind', 'old_value', 'new_value', 'actor', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('=booking_id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'field', 'date', 'start_time', 'end_time', 'priority', 'status', 'requested_at')
+    list_filter = ('status', 'field', 'date')
+    list_editable = ('priority',)
+
+
+@admin.register(SlotHold)
+class SlotHoldAdmin(admin.ModelAdmin):
+    list_display = ('user', 'field', 'date', 'start_time', 'end_time', 'amount', 'expires_at', 'released_at')
+    list_filter = ('field', 'date')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'booking', 'created_at', 'sent_at')
+    list_filter = ('kind',)
 
 
 @admin.register(TimeSlot)
@@ -38,15 +127,30 @@ class FieldImageInline(admin.TabularInline):
 
 @admin.register(Field)
 class FieldAdmin(admin.ModelAdmin):
-    list_display = ('name', 'location', 'price_per_hour', 'is_available')
+    list_display = ('name', 'venue', 'location', 'price_per_hour', 'is_available', 'rating_count')
+    list_filter = ('venue',)
+    readonly_fields = RATING_FIELDS  # maintained from reviews
     inlines = [FieldImageInline]
 
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs if request.user.is_superuser else qs.filter(venue__staff=request.user)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'venue':
+            kwargs['queryset'] = staff_venues(request.user)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 admin.site.register(FieldImage)
 
 @admin.register(Match)
 class MatchAdmin(admin.ModelAdmin):
-    list_display = ('team_a', 'team_b', 'field', 'date', 'status')
-    list_filter = ('status', 'field', 'date')
+    list_display = ('team_a', 'team_b', 'field', 'date', 'status', 'tournament', 'round')
+    list_filter = ('status', 'tournament', 'field', 'date')
+
+@admin.register(Tournament)
+class TournamentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'format', 'created_by', 'created_at')
 
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
@@ -55,8 +159,12 @@ class TeamAdmin(admin.ModelAdmin):
 
 @admin.register(TeamBooking)
 class TeamBookingAdmin(admin.ModelAdmin):
-    list_display = ('booking', 'max_players', 'is_public')
+    list_display = ('booking', 'member_count', 'max_players', 'is_public')
 
 @admin.register(TeamMember)
 class TeamMemberAdmin(admin.ModelAdmin):
-    list_display = ('team', 'user', 'is_captain', 'joined_at')
\ No newline at end of file
+    list_display = ('team', 'user', 'is_captain', 'joined_at')
+
+    def get_readonly_fields(self, request, obj=None):
+        # moving a member would bypass the member_count upkeep in core/pickup.py
+        return ('team',) if obj else ()
@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key: every page is an indexed range scan,
+    however deep the client pages, and rows inserted meanwhile are never
+    skipped or repeated.
+    """
+    ordering = '-id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 10000
+
+
+class GameCursorPagination(IdCursorPagination):
+    """Open pickup games, soonest first."""
+    ordering = ('date', 'start_time', 'id')
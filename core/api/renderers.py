@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to DRF's stdlib encoder
+    orjson = None
+
+
+def _default(obj):
+    # DRF renders decimals as strings (COERCE_DECIMAL_TO_STRING); match it
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, Promise):  # lazy translation strings
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONRenderer(BaseRenderer):
+    """
+    Compact JSON via orjson, which serializes dates, times and datetimes
+    natively and is several times faster than json.dumps on large pages.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None:
+            return JSONRenderer().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
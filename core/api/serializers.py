@@ -0,0 +1,95 @@
+from rest_framework import serializers
+
+from ..models import Field, Booking, Match, Team, TeamBooking
+
+
+def requested_fields(request):
+    """Sparse fieldset from ?fields=a,b,c, or None for all fields."""
+    if request is None:
+        return None
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """Drop every field not listed in ?fields= from the output."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'))
+        if wanted:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class FieldSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Field
+        fields = ['id', 'venue', 'name', 'location', 'price_per_hour', 'is_available', 'latitude', 'longitude']
+
+
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Booking
+        fields = [
+            'id', 'user', 'field', 'team', 'date', 'start_time', 'end_time',
+            'status', 'amount', 'payment_status', 'payment_date', 'created_at',
+        ]
+        read_only_fields = fields
+
+
+class BookingWriteSerializer(serializers.Serializer):
+    """
+    One booking in a (bulk) create request. Field and team ids are resolved
+    for the whole batch at once by the view, not one query per row.
+    """
+    field = serializers.IntegerField()
+    team = serializers.IntegerField(required=False, allow_null=True)
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+    def validate(self, attrs):
+        if attrs['end_time'] <= attrs['start_time']:
+            raise serializers.ValidationError("End time must be after start time.")
+        return attrs
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=5000)
+    status = serializers.ChoiceField(choices=Booking.STATUS_CHOICES)
+
+
+class MatchSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Match
+        fields = [
+            'id', 'team_a', 'team_b', 'field', 'date', 'start_time', 'end_time',
+            'score_a', 'score_b', 'status', 'created_at',
+        ]
+
+
+class TeamSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Team
+        fields = ['id', 'name', 'owner', 'is_public', 'created_at']
+
+
+class PickupGameSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """An open game from pickup.find_games(), which annotates the booking's columns."""
+    field = serializers.IntegerField(read_only=True)
+    venue = serializers.IntegerField(read_only=True, allow_null=True)
+    date = serializers.DateField(read_only=True)
+    start_time = serializers.TimeField(read_only=True)
+    end_time = serializers.TimeField(read_only=True)
+    spots_left = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = TeamBooking
+        fields = [
+            'id', 'booking', 'field', 'venue', 'date', 'start_time', 'end_time',
+            'max_players', 'member_count', 'spots_left',
+        ]
+        read_only_fields = fields
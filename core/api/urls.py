@@ -0,0 +1,12 @@
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+router = DefaultRouter()
+router.register('fields', views.FieldViewSet, basename='api-field')
+router.register('bookings', views.BookingViewSet, basename='api-booking')
+router.register('matches', views.MatchViewSet, basename='api-match')
+router.register('teams', views.TeamViewSet, basename='api-team')
+router.register('games', views.PickupGameViewSet, basename='api-game')
+
+urlpatterns = router.urls
@@ -0,0 +1,253 @@
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .. import events, metrics, pickup
+from ..models import Field, Booking, Match, Team, TeamBooking, booking_amount
+from ..holds import hold_conflicts
+from ..venues import staff_bookings
+from ..waitlist import release_slots
+from .serializers import (
+    requested_fields,
+    FieldSerializer, BookingSerializer, BookingWriteSerializer, BulkStatusSerializer,
+    MatchSerializer, TeamSerializer, PickupGameSerializer,
+)
+from .pagination import GameCursorPagination
+
+
+def date_param(params, name='date'):
+    """The YYYY-MM-DD query parameter `name` as a date, or None if absent; 400 if malformed."""
+    if not params.get(name):
+        return None
+    try:
+        day = parse_date(params[name])
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({name: "Use a valid YYYY-MM-DD date."})
+    return day
+
+
+class ValuesListMixin:
+    """
+    list() straight from queryset.values().
+
+    Every API serializer exposes plain columns only (foreign keys as ids), so
+    list pages skip model instantiation and per-field serializer calls; the
+    renderer turns the dicts into JSON directly. The serializer stays the
+    source of truth for which columns are exposed.
+    """
+
+    def list(self, request, *args, **kwargs):
+        exposed = self.get_serializer_class().Meta.fields
+        wanted = requested_fields(request)
+        columns = [name for name in exposed if wanted is None or name in wanted]
+
+        # the cursor needs the (leading) ordering column even when it was not asked for
+        ordering = self.paginator.ordering
+        cursor_column = (ordering if isinstance(ordering, str) else ordering[0]).lstrip('-')
+        extra = cursor_column not in columns
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values(*columns, *([cursor_column] if extra else [])))
+        response = self.get_paginated_response(page)
+        if extra:
+            for row in page:
+                del row[cursor_column]
+        return response
+
+
+class FieldViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    """Fields, optionally of one venue (?venue=<id>)."""
+    serializer_class = FieldSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        qs = Field.objects.all()
+        venue = self.request.query_params.get('venue', '')
+        if venue.isdigit():
+            qs = qs.filter(venue_id=venue)
+        return qs
+
+
+class MatchViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Match.objects.all()
+    serializer_class = MatchSerializer
+    permission_classes = [permissions.AllowAny]
+
+
+class TeamViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Team.objects.all()
+    serializer_class = TeamSerializer
+    permission_classes = [permissions.AllowAny]
+
+
+class PickupGameViewSet(ValuesListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Open pickup games, soonest first. Filters: ?date=YYYY-MM-DD, ?field=<id>,
+    ?venue=<id>, ?spots=<minimum spots left>. POST .../join/ and .../leave/.
+    """
+    serializer_class = PickupGameSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = GameCursorPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        day = date_param(params)
+        ids = {name: int(params[name]) if params.get(name, '').isdigit() else None for name in ('field', 'venue', 'spots')}
+        return pickup.find_games(date=day, field_id=ids['field'], venue=ids['venue'], min_spots=ids['spots'] or 1)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def join(self, request, *args, **kwargs):
+        try:
+            pickup.join_game(kwargs['pk'], request.user)
+        except pickup.JoinRefused as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+        game = TeamBooking.objects.get(pk=kwargs['pk'])
+        return Response({
+            'id': game.id, 'member_count': game.member_count, 'spots_left': game.max_players - game.member_count,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def leave(self, request, *args, **kwargs):
+        if not pickup.leave_game(kwargs['pk'], request.user):
+            return Response({'detail': "You are not a player in this game."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def find_conflicts(bookings, user=None):
+    """
+    Indexes of `bookings` that overlap an approved booking or another user's
+    slot hold, checked with one query each for the whole batch.
+    """
+    approved = {}
+    rows = Booking.objects.filter(
+        status='approved',
+        field_id__in={b.field_id for b in bookings},
+        date__in={b.date for b in bookings},
+    ).values_list('field_id', 'date', 'start_time', 'end_time')
+    for field_id, date, start, end in rows:
+        approved.setdefault((field_id, date), []).append((start, end))
+
+    held = set(hold_conflicts(bookings, exclude_user=user))
+    return [
+        i for i, b in enumerate(bookings)
+        if i in held
+        or any(start < b.end_time and end > b.start_time for start, end in approved.get((b.field_id, b.date), ()))
+    ]
+
+
+class BookingViewSet(ValuesListMixin,
+                     mixins.ListModelMixin,
+                     mixins.RetrieveModelMixin,
+                     viewsets.GenericViewSet):
+    """
+    Bookings: users see their own, staff those of the venues they manage.
+    Filters: ?field=<id>, ?date=YYYY-MM-DD, ?status=<status>; a malformed
+    one is a 400.
+
+    POST bookings/bulk/ creates many bookings in one transaction (field and
+    team lookups, conflict check and INSERTs are all batched).
+    POST bookings/bulk-status/ (staff) sets the status of many bookings with
+    a single UPDATE; slots that stop being approved go to their waitlists.
+    """
+    serializer_class = BookingSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            qs = staff_bookings(self.request.user)
+        else:
+            qs = Booking.objects.filter(user=self.request.user)
+
+        params = self.request.query_params
+        if params.get('field'):
+            if not params['field'].isdigit():
+                raise ValidationError({'field': "Use a field id."})
+            qs = qs.filter(field_id=int(params['field']))
+        day = date_param(params)
+        if day is not None:
+            qs = qs.filter(date=day)
+        if params.get('status'):
+            if params['status'] not in dict(Booking.STATUS_CHOICES):
+                raise ValidationError({'status': f"Use one of: {', '.join(dict(Booking.STATUS_CHOICES))}."})
+            qs = qs.filter(status=params['status'])
+        return qs
+
+    def create(self, request, *args, **kwargs):
+        return self._create_bookings(request, [request.data])
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return Response({'detail': "Expected a list of bookings."}, status=status.HTTP_400_BAD_REQUEST)
+        return self._create_bookings(request, request.data)
+
+    def _create_bookings(self, request, items):
+        serializer = BookingWriteSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+
+        fields = Field.objects.in_bulk({row['field'] for row in rows})
+        team_ids = {row['team'] for row in rows if row.get('team')}
+        my_teams = set(
+            Team.objects.filter(id__in=team_ids, members=request.user).values_list('id', flat=True)
+        ) if team_ids else set()
+
+        errors = {}
+        for i, row in enumerate(rows):
+            if row['field'] not in fields:
+                errors[i] = {'field': ["Unknown field."]}
+            elif row.get('team') and row['team'] not in my_teams:
+                errors[i] = {'team': ["You are not a member of this team."]}
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        bookings = [
+            Booking(
+                user=request.user,
+                field_id=row['field'],
+                venue_id=fields[row['field']].venue_id,
+                team_id=row.get('team'),
+                date=row['date'],
+                start_time=row['start_time'],
+                end_time=row['end_time'],
+                status='pending',
+                amount=booking_amount(fields[row['field']].price_per_hour,
+                                      row['date'], row['start_time'], row['end_time']),
+                payment_status='unpaid',
+            )
+            for row in rows
+        ]
+
+        conflicts = find_conflicts(bookings, user=request.user)
+        if conflicts:
+            metrics.BOOKING_CONFLICTS.inc(source='api')
+            return Response(
+                {'detail': "Some bookings overlap approved bookings or held slots.", 'conflicts': conflicts},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        with transaction.atomic():
+            Booking.objects.bulk_create(bookings, batch_size=500)
+            events.log_created(bookings, actor=request.user)
+
+        data = BookingSerializer(bookings, many=True, context=self.get_serializer_context()).data
+        return Response(data if self.action == 'bulk_create' else data[0], status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='bulk-status',
+            permission_classes=[permissions.IsAdminUser])
+    def bulk_status(self, request, *args, **kwargs):
+        serializer = BulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        new_status = serializer.validated_data['status']
+        selected = staff_bookings(request.user, Booking.objects.filter(id__in=serializer.validated_data['ids']))
+        changed = events.update_status(selected, new_status, actor=request.user)
+        freed = [b for b in changed if b.status == 'approved']
+
+        promoted = release_slots(freed)
+        return Response({'updated': len(changed), 'promoted': [b.id for b in promoted]})
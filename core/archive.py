@@ -0,0 +1,81 @@
+"""
+Hot/cold split of the booking history.
+
+Live bookings stay in Booking; finished bookings (rejected, or approved and
+paid or refunded) whose date is older than
+settings.BOOKING_ARCHIVE_HORIZON_DAYS are moved to ArchivedBooking by
+`manage.py archive_bookings`. Pending and approved-but-unpaid bookings stay
+live until staff settle them. Hot paths (conflict checks, calendar feeds,
+my_bookings) query Booking only. Reports, exports and receipts use the
+helpers below to read both tables.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Booking, ArchivedBooking
+
+
+def archive_cutoff(horizon_days=None):
+    if horizon_days is None:
+        horizon_days = settings.BOOKING_ARCHIVE_HORIZON_DAYS
+    return timezone.localdate() - timedelta(days=horizon_days)
+
+
+def archivable_bookings(cutoff):
+    # team bookings carry roster rows that cascade with the booking; keep them live
+    return Booking.objects.filter(
+        Q(status='rejected') | Q(status='approved', payment_status__in=('paid', 'refunded')),
+        date__lt=cutoff, team_booking__isnull=True,
+    )
+
+
+def archive_bookings(cutoff, batch_size=500):
+    """
+    Move bookings dated before `cutoff` into ArchivedBooking.
+
+    Each batch is copied and deleted in its own transaction, so the live
+    table is never locked for long and an interrupted run loses nothing.
+    Returns the number of bookings moved.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(archivable_bookings(cutoff).order_by('id')[:batch_size])
+            if not batch:
+                break
+            ArchivedBooking.objects.bulk_create([ArchivedBooking.from_booking(b) for b in batch])
+            Booking.objects.filter(id__in=[b.id for b in batch]).delete()
+        moved += len(batch)
+    return moved
+
+
+def booking_sources():
+    """Live and archived booking managers, for reads that must cover the full history."""
+    return [Booking.objects, ArchivedBooking.objects]
+
+
+def merged_bookings(*querysets, key, reverse=False):
+    """
+    Merge already-ordered live and archived querysets into one ordered stream
+    without loading either into memory.
+    """
+    return heapq.merge(*(qs.iterator(chunk_size=2000) for qs in querysets), key=key, reverse=reverse)
+
+
+def get_booking_or_404(sources=None, **lookup):
+    """
+    Look a booking up in the live table first, then in the archive.
+    `sources` replaces booking_sources(), e.g. with venue-scoped querysets.
+    """
+    for source in sources or booking_sources():
+        try:
+            return source.select_related('user', 'field').get(**lookup)
+        except source.model.DoesNotExist:
+            continue
+    raise Http404("No booking matches the given query.")
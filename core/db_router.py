@@ -0,0 +1,109 @@
+"""
+Read/write routing between the primary database and the reporting replica.
+
+Every write and every ordinary read goes to 'default', so booking and payment
+flows always see their own writes. Heavy reporting views opt in to the
+replica with @reporting_view; their reads go to the replica as long as the
+snapshot is younger than settings.REPLICA_MAX_STALENESS, and fall back to
+the primary otherwise.
+
+Locally the replica is a SQLite copy of the primary, refreshed with
+`python manage.py refresh_replica` (SQLite online backup API).
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = 'replica'
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_age():
+    """Seconds since the replica snapshot was taken, or None if there is none."""
+    db = settings.DATABASES.get(REPLICA_ALIAS)
+    if db is None:
+        return None
+    if db['ENGINE'] != SQLITE_ENGINE:
+        # a real streaming replica: the database server tracks lag, not us
+        return 0
+    try:
+        return time.time() - os.path.getmtime(db['NAME'])
+    except OSError:
+        return None
+
+
+def replica_is_fresh():
+    age = replica_age()
+    return age is not None and age <= settings.REPLICA_MAX_STALENESS
+
+
+@contextmanager
+def reporting_reads():
+    """Send reads inside the block to the replica if it is fresh enough."""
+    token = _use_replica.set(replica_is_fresh())
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def reporting_view(view_func):
+    """Run a read-only reporting view (queries and template rendering) on the replica."""
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        with reporting_reads():
+            return view_func(request, *args, **kwargs)
+    return _wrapped
+
+
+def refresh_replica():
+    """
+    Copy the primary SQLite database into the replica file.
+
+    The copy is written next to the replica and swapped in with os.replace,
+    so readers holding the old snapshot are never blocked by the refresh.
+    """
+    primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+    replica = settings.DATABASES[REPLICA_ALIAS]
+    if primary['ENGINE'] != SQLITE_ENGINE or replica['ENGINE'] != SQLITE_ENGINE:
+        raise ValueError("refresh_replica only supports SQLite primary and replica databases.")
+
+    target = str(replica['NAME'])
+    tmp = f"{target}.tmp"
+
+    src = sqlite3.connect(str(primary['NAME']))
+    dst = sqlite3.connect(tmp)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp, target)
+
+
+class ReplicaRouter:
+    """Route reporting reads to the replica; everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica is a copy of the primary and inherits its schema
+        return db != REPLICA_ALIAS
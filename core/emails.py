@@ -0,0 +1,75 @@
+from django.core.mail import send_mail
+from django.conf import settings
+
+from . import metrics
+
+
+def send_booking_email(booking, event_type):
+    """
+    event_type: 'created', 'approved', 'rejected', 'payment', 'waitlist_promoted'
+    """
+    user_email = booking.user.email
+    if not user_email:
+        return  # no email set, just skip
+
+    subject = ""
+    message = ""
+
+    if event_type == 'created':
+        subject = "Futsal Booking Request Received"
+        message = (
+            f"Hi {booking.user.username},\n\n"
+            f"We have received your booking request for {booking.field.name}.\n"
+            f"Date: {booking.date}\nTime: {booking.start_time} - {booking.end_time}\n"
+            f"Amount: Rs. {booking.amount}\n\n"
+            f"Status: Pending approval.\n\n"
+            "Thank you for using our Futsal Management System."
+        )
+    elif event_type == 'approved':
+        subject = "Futsal Booking Approved ✅"
+        message = (
+            f"Hi {booking.user.username},\n\n"
+            f"Your booking for {booking.field.name} has been APPROVED.\n"
+            f"Date: {booking.date}\nTime: {booking.start_time} - {booking.end_time}\n"
+            f"Amount: Rs. {booking.amount}\n\n"
+            "You can view your booking and receipt in your account.\n\n"
+            "Thank you!"
+        )
+    elif event_type == 'rejected':
+        subject = "Futsal Booking Rejected ❌"
+        message = (
+            f"Hi {booking.user.username},\n\n"
+            f"Unfortunately, your booking for {booking.field.name} on {booking.date} "
+            f"({booking.start_time} - {booking.end_time}) was REJECTED.\n\n"
+            "You may try another time slot.\n\n"
+            "Thank you."
+        )
+    elif event_type == 'payment':
+        subject = "Payment Status Updated"
+        message = (
+            f"Hi {booking.user.username},\n\n"
+            f"Payment status for your booking ({booking.field.name}, {booking.date} "
+            f"{booking.start_time}-{booking.end_time}) is now: {booking.payment_status.upper()}.\n\n"
+            "Thank you."
+        )
+
+    elif event_type == 'waitlist_promoted':
+        subject = "A Slot Opened Up For You ✅"
+        message = (
+            f"Hi {booking.user.username},\n\n"
+            f"The slot you were waiting for at {booking.field.name} became free and is now yours.\n"
+            f"Date: {booking.date}\nTime: {booking.start_time} - {booking.end_time}\n"
+            f"Amount: Rs. {booking.amount}\n\n"
+            "Your booking is APPROVED. You can view it in your account.\n\n"
+            "Thank you!"
+        )
+
+    if subject and message:
+        sent = send_mail(
+            subject,
+            message,
+            settings.DEFAULT_FROM_EMAIL,
+            [user_email],
+            fail_silently=True,  # avoid crashing if email fails
+        )
+        metrics.EMAILS.inc(kind=event_type, outcome='sent' if sent else 'failed')
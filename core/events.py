@@ -0,0 +1,179 @@
+"""
+Booking event log and incremental consumers.
+
+Every place that creates a booking or changes its status or payment status
+also appends a BookingEvent, in the same transaction. The log helpers below
+refuse to run outside one. Event ids only grow, so they double as sequence
+numbers.
+
+A consumer is a function that takes a list of events. consume() feeds it
+every event after its stored EventCheckpoint, in batches, and advances the
+checkpoint in the same transaction as the batch. Database work done by the
+handler therefore happens exactly once. Side effects outside the database
+(emails, cache deletes) happen at least once. Consumers are registered in
+settings.BOOKING_EVENT_CONSUMERS and run by `manage.py consume_events`.
+
+A gap in the ids younger than settings.BOOKING_EVENT_GAP_GRACE_SECONDS may
+belong to a transaction that has not committed yet. consume() stops in
+front of such a gap instead of skipping past it for good.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import ics, metrics
+from .models import Booking, BookingEvent, EventCheckpoint
+
+
+def _require_transaction():
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("Booking events must be written in the transaction that changes the booking.")
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _snapshot(booking):
+    return {
+        'field_id': booking.field_id,
+        'venue_id': booking.venue_id,
+        'user_id': booking.user_id,
+        'team_id': booking.team_id,
+        'date': _iso(booking.date),
+        'start_time': _iso(booking.start_time),
+        'end_time': _iso(booking.end_time),
+        'amount': str(booking.amount),
+    }
+
+
+def _actor_id(actor):
+    return actor.pk if actor is not None and actor.is_authenticated else None
+
+
+def _count_after_commit(events):
+    """Bump the booking counters once the logged changes are committed."""
+    counts = {}
+    for event in events:
+        if event.kind == 'created' or (event.kind == 'status' and event.new_value in ('approved', 'rejected')):
+            name = event.kind if event.kind == 'created' else event.new_value
+            counts[name] = counts.get(name, 0) + 1
+
+    def record():
+        for name, count in counts.items():
+            metrics.BOOKINGS.inc(count, event=name)
+
+    if counts:
+        transaction.on_commit(record)
+
+
+def log_created(bookings, actor=None):
+    _require_transaction()
+    events = BookingEvent.objects.bulk_create([
+        BookingEvent(booking_id=b.pk, kind='created', new_value=b.status,
+                     data=_snapshot(b), actor_id=_actor_id(actor))
+        for b in bookings
+    ])
+    _count_after_commit(events)
+    ics.bookings_changed(bookings)
+
+
+def log_changes(booking, old_status=None, old_payment_status=None, actor=None):
+    """Log the status and/or payment transitions `booking` went through since the old values."""
+    log_many_changes([(booking, old_status, old_payment_status)], actor=actor)
+
+
+def log_many_changes(changes, actor=None):
+    """log_changes() for a list of (booking, old_status, old_payment_status), with one insert."""
+    _require_transaction()
+    events, changed = [], []
+    for booking, old_status, old_payment_status in changes:
+        transitions = []
+        if old_status is not None and old_status != booking.status:
+            transitions.append(('status', old_status, booking.status))
+        if old_payment_status is not None and old_payment_status != booking.payment_status:
+            transitions.append(('payment', old_payment_status, booking.payment_status))
+        events += [
+            BookingEvent(booking_id=booking.pk, kind=kind, old_value=old, new_value=new,
+                         data=_snapshot(booking), actor_id=_actor_id(actor))
+            for kind, old, new in transitions
+        ]
+        if transitions:
+            changed.append(booking)
+    _count_after_commit(BookingEvent.objects.bulk_create(events))
+    if changed:
+        ics.bookings_changed(changed)
+
+
+def update_status(queryset, status, actor=None):
+    """
+    Set `status` on every booking in `queryset` that does not have it yet,
+    with one UPDATE, and log one event per booking.
+    Returns the changed bookings, still carrying their old status.
+    """
+    with transaction.atomic():
+        changed = list(queryset.exclude(status=status).select_for_update())
+        if changed:
+            Booking.objects.filter(id__in=[b.id for b in changed]).update(
+                status=status, updated_at=timezone.now(),
+            )
+            _count_after_commit(BookingEvent.objects.bulk_create([
+                BookingEvent(booking_id=b.pk, kind='status', old_value=b.status, new_value=status,
+                             data=_snapshot(b), actor_id=_actor_id(actor))
+                for b in changed
+            ]))
+            ics.bookings_changed(changed)
+    return changed
+
+
+# ------------------------------------------------------------
+# consumers
+# ------------------------------------------------------------
+
+def _settled(events, after):
+    """Cut the batch at the first gap that a still-running transaction may fill."""
+    cutoff = timezone.now() - timedelta(seconds=settings.BOOKING_EVENT_GAP_GRACE_SECONDS)
+    expected = after + 1
+    for i, event in enumerate(events):
+        if event.id != expected and event.created_at > cutoff:
+            return events[:i]
+        expected = event.id + 1
+    return events
+
+
+def consume(consumer, handler, batch_size=500):
+    """
+    Run `handler` over every event after the consumer's checkpoint, one
+    batch per transaction. Returns the number of events processed.
+    """
+    processed = 0
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = EventCheckpoint.objects.select_for_update().get_or_create(consumer=consumer)
+            batch = list(BookingEvent.objects.filter(id__gt=checkpoint.position).order_by('id')[:batch_size])
+            events = _settled(batch, checkpoint.position)
+            if events:
+                handler(events)
+                checkpoint.position = events[-1].id
+                checkpoint.save(update_fields=['position', 'updated_at'])
+        processed += len(events)
+        if len(events) < batch_size:
+            return processed
+
+
+def registered_consumers():
+    """{name: handler} from settings.BOOKING_EVENT_CONSUMERS."""
+    return {name: import_string(path) for name, path in settings.BOOKING_EVENT_CONSUMERS.items()}
+
+
+def consumer_lag():
+    """{name: (checkpoint position, events not yet processed)} for every registered consumer."""
+    latest = BookingEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    positions = dict(EventCheckpoint.objects.values_list('consumer', 'position'))
+    return {
+        name: (positions.get(name, 0), latest - positions.get(name, 0))
+        for name in settings.BOOKING_EVENT_CONSUMERS
+    }
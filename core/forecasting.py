@@ -0,0 +1,202 @@
+"""
+Per-field, per-hour demand forecasts for the coming week.
+
+Demand is booked hours per field and hour of day, from approved and pending
+bookings in both the live and the archived table. Pending bookings count
+because a request that was never approved still shows someone wanted the
+court then.
+
+The model is seasonal (one level per field x weekday x hour) with a linear
+trend across weeks. It is fitted by weighted least squares, with weights
+halving every settings.FORECAST_HALF_LIFE_WEEKS so recent weeks count most.
+The closed-form fit runs on a (fields, weeks, 7, 24) NumPy array in one
+pass, with no per-field or per-cell Python loop.
+
+`manage.py refresh_forecasts` fits the model and stores the next seven days
+in DemandForecast; the staff dashboard only reads that table.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import metrics
+from .archive import booking_sources
+from .models import Field, DemandForecast
+from .venues import cache_part
+
+
+def history_window(weeks=None, today=None):
+    """(first, last) day of the last `weeks` full weeks of history, ending yesterday."""
+    if weeks is None:
+        weeks = settings.FORECAST_HISTORY_WEEKS
+    last = (today or timezone.localdate()) - timedelta(days=1)
+    return last - timedelta(days=7 * weeks - 1), last
+
+
+def demand_series(np, field_ids, first_day, last_day):
+    """
+    Booked hours per field, day and hour of day between the dates (inclusive),
+    as a (len(field_ids), days, 24) array.
+    """
+    index = {field_id: i for i, field_id in enumerate(field_ids)}
+    days = (last_day - first_day).days + 1
+    series = np.zeros(len(field_ids) * days * 24)
+
+    rows = []
+    for bookings in booking_sources():
+        rows += (
+            bookings.filter(status__in=['approved', 'pending'], date__gte=first_day, date__lte=last_day,
+                            field_id__in=field_ids)
+            .values_list('field_id', 'date', 'start_time', 'end_time')
+        )
+    if not rows:
+        return series.reshape(len(field_ids), days, 24)
+
+    field_col, date_col, start_col, end_col = zip(*rows)
+    field_idx = np.fromiter((index[f] for f in field_col), dtype=np.int64, count=len(rows))
+    day_idx = (np.array(date_col, dtype='datetime64[D]') - np.datetime64(first_day)).astype(np.int64)
+    starts = np.fromiter((t.hour * 60 + t.minute for t in start_col), dtype=np.int64, count=len(rows))
+    ends = np.fromiter((t.hour * 60 + t.minute for t in end_col), dtype=np.int64, count=len(rows))
+
+    # spread every booking over the hours it covers, one hour of day at a time
+    cell = (field_idx * days + day_idx) * 24
+    for hour in range(24):
+        minutes = np.minimum(ends, hour * 60 + 60) - np.maximum(starts, hour * 60)
+        hit = minutes > 0
+        if hit.any():
+            series += np.bincount(cell[hit] + hour, weights=minutes[hit] / 60, minlength=series.size)
+    return series.reshape(len(field_ids), days, 24)
+
+
+def fit_forecast(np, series, half_life_weeks):
+    """
+    Fit level + trend per (field, weekday position, hour) on a
+    (fields, weeks * 7, 24) series and forecast the following week.
+    Returns a (fields, 7, 24) array of expected booked hours.
+    """
+    fields, days, hours = series.shape
+    weeks = days // 7
+    y = series.reshape(fields, weeks, 7, hours)
+
+    t = np.arange(weeks, dtype=float)
+    w = 0.5 ** ((weeks - 1 - t) / half_life_weeks)
+    w_sum = w.sum()
+    t_mean = (w * t).sum() / w_sum
+    t_dev = t - t_mean
+    t_var = (w * t_dev ** 2).sum()
+
+    # weighted means and slopes over the weeks axis, for every cell at once
+    wb = w[None, :, None, None]
+    y_mean = (wb * y).sum(axis=1) / w_sum
+    slope = (wb * t_dev[None, :, None, None] * y).sum(axis=1) / t_var if t_var else 0
+    return np.clip(y_mean + slope * (weeks - t_mean), 0, None)
+
+
+def backtest(np, series, half_life_weeks):
+    """
+    Mean absolute error of the model when the last week is held out, next to
+    the error of simply repeating the week before (seasonal naive).
+    """
+    held_out = series[:, -7:, :]
+    model_mae = float(np.abs(fit_forecast(np, series[:, :-7, :], half_life_weeks) - held_out).mean())
+    naive_mae = float(np.abs(series[:, -14:-7, :] - held_out).mean())
+    return model_mae, naive_mae
+
+
+def refresh_forecasts(weeks=None, half_life_weeks=None, today=None):
+    """
+    Fit the model on the recent history and replace the stored forecasts for
+    the next seven days. Returns a summary dict for the caller to report.
+    """
+    import numpy as np
+
+    if half_life_weeks is None:
+        half_life_weeks = settings.FORECAST_HALF_LIFE_WEEKS
+    today = today or timezone.localdate()
+    first_day, last_day = history_window(weeks, today)
+
+    field_ids = list(Field.objects.order_by('id').values_list('id', flat=True))
+    series = demand_series(np, field_ids, first_day, last_day)
+    forecast = fit_forecast(np, series, half_life_weeks)
+    model_mae, naive_mae = backtest(np, series, half_life_weeks) if series.shape[1] >= 14 else (None, None)
+
+    # history starts on first_day, so position p is the weekday of first_day + p;
+    # the forecast week starts today, which has the same position as first_day
+    generated_at = timezone.now()
+    rows = [
+        DemandForecast(
+            field_id=field_id, date=today + timedelta(days=p), hour=hour,
+            expected_hours=round(float(forecast[i, p, hour]), 3), generated_at=generated_at,
+        )
+        for i, field_id in enumerate(field_ids)
+        for p in range(7)
+        for hour in range(24)
+        if forecast[i, p, hour] > 0
+    ]
+    with transaction.atomic():
+        DemandForecast.objects.filter(date__gte=today).delete()
+        DemandForecast.objects.filter(date__lt=today - timedelta(days=settings.FORECAST_KEEP_DAYS)).delete()
+        DemandForecast.objects.bulk_create(rows, batch_size=1000)
+
+    return {
+        'fields': len(field_ids),
+        'history': (first_day, last_day),
+        'booked_hours': float(series.sum()),
+        'forecast_hours': float(forecast.sum()),
+        'rows': len(rows),
+        'model_mae': model_mae,
+        'naive_mae': naive_mae,
+    }
+
+
+def forecast_table(start_day, days=7, venue_id=None):
+    """
+    Stored forecasts from start_day on, shaped for the dashboard: per field
+    (of one venue, or all), one row per day with the expected hours in each
+    hour of day that has any demand.
+    """
+    end_day = start_day + timedelta(days=days - 1)
+    forecasts = DemandForecast.objects.filter(date__gte=start_day, date__lte=end_day)
+    venue_fields = Field.objects.all()
+    if venue_id is not None:
+        forecasts = forecasts.filter(field__venue_id=venue_id)
+        venue_fields = venue_fields.filter(venue_id=venue_id)
+    rows = list(
+        forecasts
+        .values_list('field_id', 'date', 'hour', 'expected_hours', 'generated_at')
+    )
+    hours = sorted({hour for _, _, hour, _, _ in rows})
+    generated_at = max((g for *_, g in rows), default=None)
+
+    grid = {}
+    for field_id, day, hour, expected, _ in rows:
+        grid[(field_id, day, hour)] = expected
+
+    dates = [start_day + timedelta(days=d) for d in range(days)]
+    fields = []
+    for field_id, name in venue_fields.order_by('name').values_list('id', 'name'):
+        day_rows = []
+        for day in dates:
+            values = [grid.get((field_id, day, hour), 0) for hour in hours]
+            cells = [{'hours': round(v, 1), 'alpha': f"{min(v, 1):.2f}"} for v in values]
+            day_rows.append({'date': day, 'cells': cells, 'total': round(sum(values), 1)})
+        total = sum(r['total'] for r in day_rows)
+        if total:
+            fields.append({'name': name, 'rows': day_rows, 'total': round(total, 1)})
+    return {'hours': hours, 'fields': fields, 'generated_at': generated_at}
+
+
+def cached_forecast_table(start_day, venue_id=None):
+    """forecast_table() cached until the next refresh_forecasts run."""
+    latest = DemandForecast.objects.aggregate(latest=Max('generated_at'))['latest']
+    key = (f"forecast_table:{cache_part(venue_id)}:{start_day.isoformat()}:"
+           f"{latest.timestamp() if latest else 0}")
+    table = metrics.cache_lookup('forecast_table', cache.get(key))
+    if table is None:
+        table = forecast_table(start_day, venue_id=venue_id)
+        cache.set(key, table, settings.FORECAST_CACHE_SECONDS)
+    return table
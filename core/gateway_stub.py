@@ -0,0 +1,125 @@
+"""
+A local stand-in for the Khalti merchant API (`manage.py stub_gateway`), to
+run reconcile_payments against without touching the real gateway.
+
+It serves merchant-transaction/<idx>/ and merchant-transaction/?product_identity=
+from an in-memory table built from the bookings: every payment_ref is a
+completed payment, and chosen shares of the bookings get a payment whose
+callback never arrived, a refund, or a wrong amount. Every response is
+delayed by a random latency. A share of requests fails as a 503, a dropped
+connection, or a hang longer than the client's read timeout.
+"""
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.utils import timezone
+
+from .models import Booking
+
+FAILURES = ('error', 'drop', 'hang')
+
+
+def transactions_from_db(missed_rate=0.0, refund_rate=0.0, mismatch_rate=0.0, seed=None):
+    """{idx: transaction} for the bookings, as the gateway would have them."""
+    rng = random.Random(seed)
+    now = timezone.now().isoformat()
+    table = {}
+    rows = Booking.objects.exclude(payment_status='refunded').values_list(
+        'id', 'payment_status', 'payment_ref', 'amount',
+    ).iterator()
+    for booking_id, payment_status, payment_ref, amount in rows:
+        paisa = int(Decimal(amount) * 100)
+        if payment_ref:
+            idx = payment_ref
+        elif payment_status == 'unpaid' and rng.random() < missed_rate:
+            idx = f"stub{booking_id}"
+        else:
+            continue
+        refunded = payment_status == 'paid' and rng.random() < refund_rate
+        if rng.random() < mismatch_rate:
+            paisa += 100
+        table[idx] = {
+            'idx': idx, 'amount': paisa, 'product_identity': str(booking_id), 'created_on': now,
+            'state': {'name': 'Refunded' if refunded else 'Completed'}, 'refunded': refunded,
+        }
+    return table
+
+
+class StubGateway:
+    def __init__(self, transactions, latency=(0.01, 0.2), failure_rate=0.0, hang_seconds=30.0, seed=None):
+        self.transactions = transactions
+        self.by_product = {}
+        for txn in transactions.values():
+            self.by_product.setdefault(txn['product_identity'], []).append(txn)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.hang_seconds = hang_seconds
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = dict.fromkeys(FAILURES, 0)
+
+    def _draw(self):
+        with self.lock:
+            self.requests += 1
+            delay = self.rng.uniform(*self.latency)
+            failure = self.rng.choice(FAILURES) if self.rng.random() < self.failure_rate else None
+            if failure:
+                self.failures[failure] += 1
+        return delay, failure
+
+    def respond(self, path, query):
+        """(status, payload) for a GET."""
+        parts = [p for p in path.split('/') if p]
+        if 'merchant-transaction' not in parts:
+            return 404, {'detail': "Not found."}
+        tail = parts[parts.index('merchant-transaction') + 1:]
+        if tail:
+            txn = self.transactions.get(tail[0])
+            return (200, txn) if txn else (404, {'detail': "Not found."})
+        product = query.get('product_identity', [''])[0]
+        return 200, {'records': self.by_product.get(product, [])}
+
+    def server(self, host='127.0.0.1', port=8765):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                delay, failure = gateway._draw()
+                time.sleep(delay)
+                if failure == 'drop':
+                    self.close_connection = True
+                    return
+                if failure == 'hang':
+                    time.sleep(gateway.hang_seconds)
+                if failure == 'error':
+                    status, payload = 503, {'detail': "Service unavailable."}
+                elif not self.headers.get('Authorization', '').startswith('Key '):
+                    status, payload = 401, {'detail': "Authentication credentials were not provided."}
+                else:
+                    url = urlsplit(self.path)
+                    status, payload = gateway.respond(url.path, parse_qs(url.query))
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                pass  # clients hanging up on a hang or a timeout are expected
+
+        return Server((host, port), Handler)
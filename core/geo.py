@@ -0,0 +1,141 @@
+"""
+"Fields near me": radius and nearest-N search over Field coordinates.
+
+The globe is cut into GRID_DEGREES x GRID_DEGREES cells. Each field stores
+the number of its cell (Field.geo_cell, set in Field.save()) under a
+B-tree index. Cells are numbered row by row, so the cells a search
+rectangle covers in one grid row form a contiguous range. A radius search
+is therefore one indexed range scan per row, a handful of them. Exact
+great-circle distances are then computed only for the fields in those
+cells, never for the whole table.
+
+Changing GRID_DEGREES requires re-saving every field with coordinates.
+"""
+import math
+
+from django.db.models import Exists, OuterRef, Q
+
+# about 5.5 km north-south per cell
+GRID_DEGREES = 0.05
+GRID_COLUMNS = round(360 / GRID_DEGREES)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def grid_cell(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    row = math.floor((latitude + 90) / GRID_DEGREES)
+    column = math.floor((longitude + 180) / GRID_DEGREES) % GRID_COLUMNS
+    return row * GRID_COLUMNS + column
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    """Q matching every grid cell that a circle of radius_km around the point touches."""
+    lat_span = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(latitude - lat_span, -90.0), min(latitude + lat_span, 90.0)
+
+    # widest longitude span of the circle, at the latitude closest to a pole
+    widest = max(abs(min_lat), abs(max_lat))
+    cos_lat = math.cos(math.radians(min(widest, 89.9)))
+    lng_span = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+
+    first_row = math.floor((min_lat + 90) / GRID_DEGREES)
+    last_row = math.floor((max_lat + 90) / GRID_DEGREES)
+    if lng_span >= 180:
+        columns = [(0, GRID_COLUMNS - 1)]
+    else:
+        first_col = math.floor((longitude - lng_span + 180) / GRID_DEGREES)
+        last_col = math.floor((longitude + lng_span + 180) / GRID_DEGREES)
+        if first_col < 0:  # crosses the antimeridian
+            columns = [(first_col % GRID_COLUMNS, GRID_COLUMNS - 1), (0, last_col)]
+        elif last_col >= GRID_COLUMNS:
+            columns = [(first_col, GRID_COLUMNS - 1), (0, last_col % GRID_COLUMNS)]
+        else:
+            columns = [(first_col, last_col)]
+
+    q = Q()
+    for row in range(first_row, last_row + 1):
+        for first_col, last_col in columns:
+            q |= Q(geo_cell__range=(row * GRID_COLUMNS + first_col, row * GRID_COLUMNS + last_col))
+    return q
+
+
+def _open_for(start_time, end_time):
+    """Q for fields whose TimeSlot hours cover the slot, or that have no hours set."""
+    from .models import TimeSlot
+
+    hours = {}
+    for field_id, s, e in TimeSlot.objects.filter(start_time__lt=end_time, end_time__gt=start_time).values_list(
+        'field_id', 'start_time', 'end_time',
+    ):
+        hours.setdefault(field_id, []).append((s, e))
+    covered = []
+    for field_id, ranges in hours.items():
+        # back-to-back TimeSlots cover the slot together
+        reached = start_time
+        for s, e in sorted(ranges):
+            if s > reached:
+                break
+            reached = max(reached, e)
+        if reached >= end_time:
+            covered.append(field_id)
+    return Q(pk__in=covered) | ~Exists(TimeSlot.objects.filter(field=OuterRef('pk')))
+
+
+def available_between(queryset, date, start_time, end_time, user=None):
+    """
+    Fields of `queryset` that are open for booking and free for the whole
+    slot: within their TimeSlot hours, with no approved booking and no
+    active hold other than `user`'s on it (core/holds.py).
+    """
+    from .holds import active_holds
+    from .models import Booking
+
+    overlapping = {'field': OuterRef('pk'), 'date': date, 'start_time__lt': end_time, 'end_time__gt': start_time}
+    taken = Booking.objects.filter(status='approved', **overlapping)
+    held = active_holds().filter(**overlapping)
+    if user is not None and user.is_authenticated:
+        held = held.exclude(user=user)
+    return (
+        queryset.filter(is_available=True).filter(_open_for(start_time, end_time))
+        .exclude(Exists(taken)).exclude(Exists(held))
+    )
+
+
+def fields_within(latitude, longitude, radius_km, queryset=None):
+    """[(field, distance_km)] within radius_km of the point, nearest first."""
+    from .models import Field
+
+    if queryset is None:
+        queryset = Field.objects.all()
+    candidates = queryset.filter(cell_ranges(latitude, longitude, radius_km))
+
+    found = []
+    for field in candidates:
+        distance = haversine_km(latitude, longitude, field.latitude, field.longitude)
+        if distance <= radius_km:
+            found.append((field, distance))
+    found.sort(key=lambda pair: pair[1])
+    return found
+
+
+def nearest_fields(latitude, longitude, limit=5, queryset=None, start_km=5.0, max_km=200.0):
+    """
+    The `limit` nearest fields (with distances) within max_km. The search
+    radius starts at start_km and doubles until enough fields are found, so
+    a dense city only touches nearby cells.
+    """
+    radius = start_km
+    while True:
+        found = fields_within(latitude, longitude, radius, queryset)
+        if len(found) >= limit or radius >= max_km:
+            return found[:limit]
+        radius = min(radius * 2, max_km)
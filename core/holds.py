@@ -0,0 +1,192 @@
+"""
+Short-lived slot holds for Khalti checkout.
+
+"Hold & pay" on the booking form places a SlotHold on the slot for
+settings.SLOT_HOLD_MINUTES. While it is active, the slot is taken for
+everyone else: book_field, Booking.clean(), the bookings API and new holds
+treat it like an approved booking. khalti_callback turns the verified
+payment into a paid, approved booking and deletes the hold.
+
+Holds are placed under a lock on the field row, so two checkouts for the
+same slot cannot both succeed. Expired holds stop counting at once (every
+check filters on expires_at) and are released by sweep_expired(), which
+reads them oldest first from hold_expiry_idx, a range scan over the
+unreleased expired rows only. The sweeper leaves them alone for
+SWEEP_GRACE first, so a payment that completes just after expiry can still
+be converted. Swept slots then go to their waitlists (core/waitlist.py),
+which skip held slots.
+
+A hold that never became a booking (expired, replaced, or lost to another
+booking) is released rather than deleted: its checkout may still have been
+paid, and reconcile_payments looks it up at the gateway by its "hold-<id>"
+product identity. Released holds are deleted settings.SLOT_HOLD_RETENTION_DAYS
+after release.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from . import events, ics, metrics
+from .models import Booking, Field, SlotHold, booking_amount
+
+
+SWEEP_GRACE = timedelta(minutes=5)
+
+
+class SlotTaken(Exception):
+    pass
+
+
+def active_holds(now=None):
+    return SlotHold.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def overlapping_holds(field_id, date, start_time, end_time, exclude_user=None):
+    """Active holds on field/date that overlap [start_time, end_time), other than `exclude_user`'s."""
+    holds = active_holds().filter(
+        field_id=field_id, date=date, start_time__lt=end_time, end_time__gt=start_time,
+    )
+    if exclude_user is not None:
+        holds = holds.exclude(user_id=getattr(exclude_user, 'pk', exclude_user))
+    return holds
+
+
+def _overlaps_approved(field_id, date, start_time, end_time):
+    return Booking.objects.filter(
+        field_id=field_id, date=date, status='approved',
+        start_time__lt=end_time, end_time__gt=start_time,
+    ).exists()
+
+
+def _release(holds, now):
+    """Release `holds`, keeping the rows for reconciliation; an active one expires at once."""
+    return holds.filter(released_at__isnull=True).update(
+        released_at=now, expires_at=Least('expires_at', Value(now)),
+    )
+
+
+def slot_taken(field_id, date, start_time, end_time, user):
+    """Whether an approved booking or someone other than `user` holds part of the range."""
+    return (
+        _overlaps_approved(field_id, date, start_time, end_time)
+        or overlapping_holds(field_id, date, start_time, end_time, exclude_user=user).exists()
+    )
+
+
+def place_hold(user, field, date, start_time, end_time, team=None):
+    """
+    Hold the slot for `user`, replacing their own overlapping holds.
+    Raises SlotTaken if an approved booking or someone else's hold is in the way.
+    """
+    with transaction.atomic():
+        # serializes hold placement per field
+        Field.objects.select_for_update().filter(pk=field.pk).first()
+        if slot_taken(field.pk, date, start_time, end_time, user):
+            metrics.SLOT_HOLDS.inc(outcome='refused')
+            raise SlotTaken("This slot is already booked or being paid for by another player.")
+        _release(SlotHold.objects.filter(
+            user=user, field=field, date=date, start_time__lt=end_time, end_time__gt=start_time,
+        ), timezone.now())
+        hold = SlotHold.objects.create(
+            user=user, field=field, team=team, date=date, start_time=start_time, end_time=end_time,
+            amount=booking_amount(field.price_per_hour, date, start_time, end_time),
+            expires_at=timezone.now() + timedelta(minutes=settings.SLOT_HOLD_MINUTES),
+        )
+        ics.bookings_changed([hold])
+    metrics.SLOT_HOLDS.inc(outcome='placed')
+    return hold
+
+
+def convert_hold(hold_id, user, payment_ref=''):
+    """
+    Turn a paid hold into an approved, paid booking. A hold that expired
+    during payment is still honoured if nobody has taken the slot since.
+    Returns the booking, or None if the slot was lost (the payment must be
+    refunded): the hold was released, an approved booking overlaps it
+    (staff approval, a waitlist promotion), or it expired and someone else
+    holds the slot now. A lost hold is released, so reconcile_payments
+    reports its payment.
+    """
+    with transaction.atomic():
+        hold = (
+            SlotHold.objects.select_for_update().select_related('field')
+            .filter(pk=hold_id, user=user, released_at__isnull=True).first()
+        )
+        if hold is None:
+            return None
+        Field.objects.select_for_update().filter(pk=hold.field_id).first()
+        expired = hold.expires_at <= timezone.now()
+        if _overlaps_approved(hold.field_id, hold.date, hold.start_time, hold.end_time) or (
+            expired and overlapping_holds(
+                hold.field_id, hold.date, hold.start_time, hold.end_time, exclude_user=user,
+            ).exists()
+        ):
+            _release(SlotHold.objects.filter(pk=hold.pk), timezone.now())
+            metrics.SLOT_HOLDS.inc(outcome='lost')
+            return None
+
+        booking = Booking.objects.create(
+            user=hold.user, field=hold.field, team=hold.team, date=hold.date,
+            start_time=hold.start_time, end_time=hold.end_time,
+            status='approved', amount=hold.amount,
+            payment_status='paid', payment_date=timezone.now(), payment_ref=payment_ref[:64],
+        )
+        events.log_created([booking], actor=user)
+        hold.delete()
+    metrics.SLOT_HOLDS.inc(outcome='converted')
+    return booking
+
+
+def sweep_expired(batch_size=500, now=None):
+    """
+    Release holds that expired SWEEP_GRACE before `now`, oldest first, one
+    batch per transaction, and offer their slots to the waitlists. Then
+    delete the holds released more than SLOT_HOLD_RETENTION_DAYS ago.
+    """
+    from .waitlist import promote_next
+
+    now = now or timezone.now()
+    cutoff = now - SWEEP_GRACE
+    swept = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                SlotHold.objects.filter(released_at__isnull=True, expires_at__lte=cutoff).order_by('expires_at')
+                .values_list('id', 'user_id', 'field_id', 'date', 'start_time', 'end_time')[:batch_size]
+            )
+            if not batch:
+                break
+            _release(SlotHold.objects.filter(id__in=[row[0] for row in batch]), now)
+            ics.bump(
+                key for _, user_id, field_id, *_ in batch for key in (('user', user_id), ('field', field_id))
+            )
+        for slot in dict.fromkeys(row[2:] for row in batch):
+            promote_next(*slot)
+        swept += len(batch)
+        metrics.SLOT_HOLDS.inc(len(batch), outcome='expired')
+        if len(batch) < batch_size:
+            break
+    SlotHold.objects.filter(released_at__lte=now - timedelta(days=settings.SLOT_HOLD_RETENTION_DAYS)).delete()
+    return swept
+
+
+def hold_conflicts(bookings, exclude_user=None):
+    """Indexes of `bookings` overlapping an active hold, with one query for the batch."""
+    held = {}
+    rows = active_holds().filter(
+        field_id__in={b.field_id for b in bookings},
+        date__in={b.date for b in bookings},
+    )
+    if exclude_user is not None:
+        rows = rows.exclude(user_id=exclude_user.pk)
+    for field_id, date, start, end in rows.values_list('field_id', 'date', 'start_time', 'end_time'):
+        held.setdefault((field_id, date), []).append((start, end))
+    return [
+        i for i, b in enumerate(bookings)
+        if any(start < b.end_time and end > b.start_time for start, end in held.get((b.field_id, b.date), ()))
+    ]
+
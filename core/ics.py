@@ -0,0 +1,283 @@
+"""
+iCalendar (.ics) feeds for calendar apps to subscribe to.
+
+Three feeds exist: one user's bookings, one team's match fixtures, and one
+field's approved schedule. Each is addressed by a signed token, so a feed
+URL can be pasted into a calendar app that has no session. A feed covers
+settings.ICS_PAST_DAYS before today to settings.ICS_FUTURE_DAYS after it.
+
+Every change to a booking or match bumps the FeedVersion row of the feeds it
+appears in, in the same transaction (see bump()). So does renaming a field
+or team, for the feeds that show its name. A request costs one query
+for that row. The rendered payload is cached under (feed, version, today)
+and rebuilt only when one of those changes. The version also serves as the
+feed's ETag and Last-Modified, so polling clients mostly get a 304.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import metrics
+from .models import Booking, FeedVersion, Field, Match, SlotHold, Team
+
+KINDS = ('user', 'team', 'field')
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+# version of feeds that have never changed since FeedVersion was introduced
+NEVER_CHANGED = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+_signer = signing.Signer(salt='core.ics')
+
+
+# ------------------------------------------------------------
+# tokens
+# ------------------------------------------------------------
+
+def feed_token(kind, object_id):
+    return _signer.sign(f"{kind}.{object_id}")
+
+
+def read_token(token):
+    """(kind, object id) for a valid token, else None."""
+    try:
+        kind, _, object_id = _signer.unsign(token).partition('.')
+    except signing.BadSignature:
+        return None
+    if kind not in KINDS or not object_id.isdigit():
+        return None
+    return kind, int(object_id)
+
+
+# ------------------------------------------------------------
+# versions
+# ------------------------------------------------------------
+
+def window(today=None):
+    today = today or timezone.localdate()
+    return today - timedelta(days=settings.ICS_PAST_DAYS), today + timedelta(days=settings.ICS_FUTURE_DAYS)
+
+
+def bump(keys):
+    """Mark the feeds in `keys`, an iterable of (kind, object id), as changed now."""
+    keys = {(kind, object_id) for kind, object_id in keys if object_id is not None}
+    if not keys:
+        return
+    now = timezone.now()
+    FeedVersion.objects.bulk_create(
+        [FeedVersion(kind=kind, object_id=object_id, changed_at=now) for kind, object_id in sorted(keys)],
+        update_conflicts=True, unique_fields=['kind', 'object_id'], update_fields=['changed_at'],
+    )
+
+
+def _as_date(value):
+    # bookings built straight from form input still carry the posted string
+    return parse_date(value) if isinstance(value, str) else value
+
+
+def bookings_changed(bookings):
+    """
+    Bump the user and field feeds of changed bookings. Bookings dated outside
+    today's window are skipped: no feed shows them, and feeds are rebuilt
+    daily anyway as the window moves.
+    """
+    start, end = window()
+    bump(
+        key
+        for b in bookings if start <= _as_date(b.date) <= end
+        for key in (('user', b.user_id), ('field', b.field_id))
+    )
+
+
+def match_changed(match):
+    bump([('team', match.team_a_id), ('team', match.team_b_id)])
+
+
+def field_changed(field):
+    """Bump every feed showing the field's name or location: its own, its bookers' and the teams playing on it."""
+    start, end = window()
+    in_window = {'field_id': field.pk, 'date__range': (start, end)}
+    bump([
+        ('field', field.pk),
+        *(('user', user_id) for user_id in Booking.objects.filter(**in_window).values_list('user_id', flat=True).distinct()),
+        *(('user', user_id) for user_id in SlotHold.objects.filter(**in_window, released_at__isnull=True).values_list('user_id', flat=True).distinct()),
+        *(('team', team_id) for pair in Match.objects.filter(**in_window).values_list('team_a_id', 'team_b_id')
+          for team_id in pair),
+    ])
+
+
+def team_changed(team):
+    """Bump every feed showing the team's name: its own, its opponents' and its bookers'."""
+    start, end = window()
+    matches = Match.objects.filter(Q(team_a_id=team.pk) | Q(team_b_id=team.pk), date__range=(start, end))
+    bump([
+        ('team', team.pk),
+        *(('team', team_id) for pair in matches.values_list('team_a_id', 'team_b_id') for team_id in pair),
+        *(('user', user_id) for user_id in Booking.objects.filter(team_id=team.pk, date__range=(start, end))
+          .values_list('user_id', flat=True).distinct()),
+    ])
+
+
+def version(kind, object_id):
+    changed_at = (
+        FeedVersion.objects.filter(kind=kind, object_id=object_id)
+        .values_list('changed_at', flat=True).first()
+    )
+    return changed_at or NEVER_CHANGED
+
+
+def last_modified(changed_at, today=None):
+    """A feed's Last-Modified: its version, or midnight today once the window has moved past it."""
+    today = today or timezone.localdate()
+    midnight = timezone.make_aware(datetime.combine(today, time.min))
+    return max(changed_at, midnight)
+
+
+# ------------------------------------------------------------
+# rendering
+# ------------------------------------------------------------
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces (RFC 5545, 3.1)."""
+    data = line.encode()
+    if len(data) <= 75:
+        return line
+    pieces, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            end -= 1
+        pieces.append(data[start:end].decode())
+        start, limit = end, 74  # continuation lines start with a space
+    return '\r\n '.join(pieces)
+
+
+def _utc(day, at):
+    moment = timezone.make_aware(datetime.combine(day, at))
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(uid, stamp, day, start, end, summary, status, location='', description=''):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{_utc(day, start)}',
+        f'DTEND:{_utc(day, end)}',
+        f'SUMMARY:{_escape(summary)}',
+        f'STATUS:{status}',
+    ]
+    if location:
+        lines.append(f'LOCATION:{_escape(location)}')
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def _uid(name, pk):
+    return f"{name}-{pk}@{settings.DEFAULT_FROM_EMAIL.rpartition('@')[2]}"
+
+
+BOOKING_STATUS = {'pending': 'TENTATIVE', 'approved': 'CONFIRMED'}
+MATCH_STATUS = {'scheduled': 'CONFIRMED', 'completed': 'CONFIRMED', 'cancelled': 'CANCELLED'}
+
+
+def _hold_events(holds, stamp, summary):
+    # holds expire within minutes; each expiry is swept and bumps the feed
+    for h in holds.filter(expires_at__gt=timezone.now()).order_by('date', 'start_time'):
+        yield _event(_uid('hold', h.id), stamp, h.date, h.start_time, h.end_time, summary(h), 'TENTATIVE')
+
+
+def _user_events(user_id, start, end, stamp):
+    bookings = (
+        Booking.objects.filter(user_id=user_id, date__range=(start, end), status__in=BOOKING_STATUS)
+        .select_related('field', 'team').order_by('date', 'start_time')
+    )
+    for b in bookings:
+        summary = f"Futsal at {b.field.name}" + (f" ({b.team.name})" if b.team else "")
+        description = f"Booking #{b.id}, {b.get_status_display()}, payment {b.get_payment_status_display()}"
+        yield _event(_uid('booking', b.id), stamp, b.date, b.start_time, b.end_time,
+                     summary, BOOKING_STATUS[b.status], b.field.location, description)
+    yield from _hold_events(
+        SlotHold.objects.filter(user_id=user_id, date__range=(start, end), released_at__isnull=True)
+        .select_related('field'),
+        stamp, lambda h: f"Futsal at {h.field.name} (held, awaiting payment)",
+    )
+
+
+def _field_events(field_id, start, end, stamp):
+    # the public schedule: approved slots only, nothing about who booked them
+    bookings = (
+        Booking.objects.filter(field_id=field_id, date__range=(start, end), status='approved')
+        .only('id', 'date', 'start_time', 'end_time').order_by('date', 'start_time')
+    )
+    for b in bookings:
+        yield _event(_uid('booking', b.id), stamp, b.date, b.start_time, b.end_time, "Booked", 'CONFIRMED')
+    yield from _hold_events(
+        SlotHold.objects.filter(field_id=field_id, date__range=(start, end), released_at__isnull=True), stamp, lambda h: "Held",
+    )
+
+
+def _team_events(team_id, start, end, stamp):
+    matches = (
+        Match.objects.filter(Q(team_a_id=team_id) | Q(team_b_id=team_id), date__range=(start, end))
+        .select_related('team_a', 'team_b', 'field').order_by('date', 'start_time')
+    )
+    for m in matches:
+        summary = f"{m.team_a.name} vs {m.team_b.name}"
+        if m.status == 'completed':
+            summary += f" ({m.score_a}-{m.score_b})"
+        yield _event(_uid('match', m.id), stamp, m.date, m.start_time, m.end_time, summary,
+                     MATCH_STATUS.get(m.status, 'CONFIRMED'), m.field.location,
+                     f"{m.field.name}, {m.get_status_display()}")
+
+
+FEEDS = {'user': _user_events, 'team': _team_events, 'field': _field_events}
+
+
+def feed_title(kind, object_id):
+    if kind == 'user':
+        return "My futsal bookings"
+    model = Team if kind == 'team' else Field
+    name = model.objects.filter(pk=object_id).values_list('name', flat=True).first() or f"{kind} {object_id}"
+    return f"{name} fixtures" if kind == 'team' else f"{name} schedule"
+
+
+def render_feed(kind, object_id, changed_at, today=None):
+    """The feed as bytes (CRLF line endings, folded lines)."""
+    start, end = window(today)
+    stamp = changed_at.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Futsal Booking System//Feeds//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(feed_title(kind, object_id))}',
+    ]
+    for event in FEEDS[kind](object_id, start, end, stamp):
+        lines.extend(event)
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(_fold(line) for line in lines) + '\r\n').encode()
+
+
+def cached_feed(kind, object_id, changed_at, today=None):
+    """The rendered feed, from the cache unless its version or day is new."""
+    today = today or timezone.localdate()
+    key = f"ics:{kind}:{object_id}:{changed_at.timestamp():.6f}:{today.isoformat()}"
+    payload = metrics.cache_lookup('ics', cache.get(key))
+    if payload is None:
+        payload = render_feed(kind, object_id, changed_at, today)
+        cache.set(key, payload, settings.ICS_CACHE_SECONDS)
+    return payload
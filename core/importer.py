@@ -0,0 +1,459 @@
+"""
+Bulk import of fields, time slots and historical bookings from CSV or XLSX
+(`manage.py import_data`).
+
+Rows are streamed from the file (csv.reader, or openpyxl in read-only mode)
+and handled in chunks:
+
+1. each row is parsed against lookup maps (users, fields and prices) that
+   are loaded once before the import, so parsing costs no queries;
+2. the chunk is validated as a batch. Overlaps are found by grouping the
+   rows per field (and day, for bookings), sorting by start time, and
+   comparing against the existing rows for those keys, fetched in one query;
+3. the accepted rows are written with bulk_create in one transaction per
+   chunk.
+
+Memory stays bounded by the chunk size plus the lookup maps. Rows that fail
+are written, with their line number and the reason, to a reject file in the
+same columns as the input, ready to fix and re-import. A chunk that was
+committed stays imported if a later chunk fails.
+"""
+import csv
+from collections import defaultdict
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import events, ics, search
+from .geo import grid_cell
+from .models import Booking, Field, TimeSlot, Venue, booking_amount
+
+# values per IN (...) list, under SQLite's bound-parameter limit
+IN_BATCH = 500
+
+
+class RowError(Exception):
+    pass
+
+
+# ------------------------------------------------------------
+# reading
+# ------------------------------------------------------------
+
+def read_rows(path):
+    """Yield (line number, {column: value}) from a CSV or XLSX file, one row at a time."""
+    if Path(path).suffix.lower() in ('.xlsx', '.xlsm'):
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(cell or '').strip().lower() for cell in next(rows, ())]
+            for number, values in enumerate(rows, start=2):
+                if any(value not in (None, '') for value in values):
+                    yield number, dict(zip(header, values))
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = [column.strip().lower() for column in next(reader, [])]
+            for number, values in enumerate(reader, start=2):
+                if any(value.strip() for value in values):
+                    yield number, dict(zip(header, values))
+
+
+class RejectWriter:
+    """CSV of rejected rows: line, error, then the row's own columns."""
+
+    def __init__(self, f):
+        self.f = f
+        self.writer = None
+        self.count = 0
+
+    def write(self, number, row, error):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.f, ['line', 'error', *row], extrasaction='ignore')
+            self.writer.writeheader()
+        self.writer.writerow({**row, 'line': number, 'error': error})
+        self.count += 1
+
+
+# ------------------------------------------------------------
+# cell parsing
+# ------------------------------------------------------------
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _text(row, column, required=True, max_length=None):
+    value = row.get(column)
+    if _blank(value):
+        if required:
+            raise RowError(f"{column} is required")
+        return ''
+    if isinstance(value, float) and value.is_integer():  # spreadsheet ids
+        value = int(value)
+    value = str(value).strip()
+    if max_length and len(value) > max_length:
+        raise RowError(f"{column}: longer than {max_length} characters")
+    return value
+
+
+def _time(row, column):
+    value = row.get(column)
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    try:
+        return time.fromisoformat(_text(row, column))
+    except ValueError:
+        raise RowError(f"{column}: not a time (HH:MM)")
+
+
+def _date(row, column):
+    value = row.get(column)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(_text(row, column))
+    except ValueError:
+        raise RowError(f"{column}: not a date (YYYY-MM-DD)")
+
+
+def _datetime(row, column):
+    value = row.get(column)
+    if _blank(value):
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(_text(row, column))
+        except ValueError:
+            raise RowError(f"{column}: not a date and time (YYYY-MM-DD HH:MM)")
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def _decimal(row, column, required=True):
+    if _blank(row.get(column)) and not required:
+        return None
+    try:
+        value = Decimal(_text(row, column))
+    except InvalidOperation:
+        value = None
+    if value is None or not value.is_finite():
+        raise RowError(f"{column}: not a number")
+    return value
+
+
+def _float(row, column):
+    if _blank(row.get(column)):
+        return None
+    try:
+        return float(row[column])
+    except (TypeError, ValueError):
+        raise RowError(f"{column}: not a number")
+
+
+def _bool(row, column, default):
+    value = row.get(column)
+    if _blank(value):
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', 'y'):
+        return True
+    if text in ('0', 'false', 'no', 'n'):
+        return False
+    raise RowError(f"{column}: expected yes/no")
+
+
+def _choice(row, column, choices, default):
+    value = _text(row, column, required=False).lower() or default
+    if value not in dict(choices):
+        raise RowError(f"{column}: must be one of {', '.join(dict(choices))}")
+    return value
+
+
+def _first_clash(taken, start, end):
+    return next(((s, e) for s, e in taken if s < end and e > start), None)
+
+
+def _clash_message(what, clash):
+    return f"overlaps {what} {clash[0]:%H:%M}-{clash[1]:%H:%M}"
+
+
+# ------------------------------------------------------------
+# importers
+# ------------------------------------------------------------
+
+class FieldLookup:
+    """Field id, price and venue by id or by (case-insensitive) name, loaded once."""
+
+    def __init__(self):
+        self.prices, self.venues, self.by_name, ambiguous = {}, {}, {}, set()
+        for field_id, name, price, venue_id in Field.objects.values_list('id', 'name', 'price_per_hour', 'venue_id'):
+            self.prices[field_id] = price
+            self.venues[field_id] = venue_id
+            key = name.strip().lower()
+            if key in self.by_name:
+                ambiguous.add(key)
+            self.by_name[key] = field_id
+        for key in ambiguous:
+            self.by_name[key] = None
+
+    def resolve(self, row, column='field'):
+        value = _text(row, column)
+        if value.isdigit() and int(value) in self.prices:
+            return int(value)
+        field_id = self.by_name.get(value.lower(), 0)
+        if field_id is None:
+            raise RowError(f"{column}: several fields are named '{value}', use the id")
+        if not field_id:
+            raise RowError(f"{column}: unknown field '{value}'")
+        return field_id
+
+
+class FieldImporter:
+    """
+    Columns: name, location, price_per_hour, optional venue (id or name),
+    is_available, latitude, longitude.
+    """
+
+    def prepare(self):
+        self.venue_ids = set(Venue.objects.values_list('id', flat=True))
+        self.venues_by_name = {name.lower(): venue_id for venue_id, name in Venue.objects.values_list('id', 'name')}
+        self.seen = {
+            (name.strip().lower(), location.strip().lower())
+            for name, location in Field.objects.values_list('name', 'location')
+        }
+
+    def parse(self, row):
+        field = Field(
+            name=_text(row, 'name', max_length=100),
+            location=_text(row, 'location', max_length=150),
+            price_per_hour=_decimal(row, 'price_per_hour'),
+            is_available=_bool(row, 'is_available', True),
+            latitude=_float(row, 'latitude'),
+            longitude=_float(row, 'longitude'),
+            venue_id=self._venue(row),
+        )
+        if field.price_per_hour < 0:
+            raise RowError("price_per_hour: must not be negative")
+        if (field.latitude is None) != (field.longitude is None):
+            raise RowError("latitude and longitude go together")
+        # bulk_create skips Field.save()
+        field.geo_cell = grid_cell(field.latitude, field.longitude)
+        return field
+
+    def _venue(self, row):
+        value = _text(row, 'venue', required=False)
+        if not value:
+            return None
+        if value.isdigit() and int(value) in self.venue_ids:
+            return int(value)
+        if value.lower() not in self.venues_by_name:
+            raise RowError(f"venue: unknown venue '{value}'")
+        return self.venues_by_name[value.lower()]
+
+    def check(self, parsed):
+        accepted, rejected = [], []
+        for number, row, field in parsed:
+            key = (field.name.lower(), field.location.lower())
+            if key in self.seen:
+                rejected.append((number, row, "a field with this name and location already exists"))
+            else:
+                self.seen.add(key)
+                accepted.append(field)
+        return accepted, rejected
+
+    def write(self, fields):
+        Field.objects.bulk_create(fields, batch_size=1000)
+
+    def finish(self):
+        # bulk_create sends no post_save, so the search index misses the new rows
+        search.rebuild_index()
+
+
+class TimeSlotImporter:
+    """Columns: field (id or name), start_time, end_time."""
+
+    def prepare(self):
+        self.fields = FieldLookup()
+        self.slots = defaultdict(list)
+        for field_id, start, end in TimeSlot.objects.values_list('field_id', 'start_time', 'end_time'):
+            self.slots[field_id].append((start, end))
+
+    def parse(self, row):
+        slot = TimeSlot(
+            field_id=self.fields.resolve(row),
+            start_time=_time(row, 'start_time'),
+            end_time=_time(row, 'end_time'),
+        )
+        if slot.end_time <= slot.start_time:
+            raise RowError("end_time must be after start_time")
+        return slot
+
+    def check(self, parsed):
+        accepted, rejected = [], []
+        for number, row, slot in sorted(parsed, key=lambda p: (p[2].field_id, p[2].start_time, p[0])):
+            taken = self.slots[slot.field_id]
+            clash = _first_clash(taken, slot.start_time, slot.end_time)
+            if clash:
+                rejected.append((number, row, _clash_message("time slot", clash)))
+            else:
+                taken.append((slot.start_time, slot.end_time))
+                accepted.append(slot)
+        return accepted, rejected
+
+    def write(self, slots):
+        TimeSlot.objects.bulk_create(slots, batch_size=1000)
+
+    def finish(self):
+        pass
+
+
+class BookingImporter:
+    """
+    Columns: user (username or email), field (id or name), date, start_time,
+    end_time, optional status, amount, payment_status, payment_ref,
+    created_at. Approved bookings may not overlap other approved bookings,
+    as in Booking.clean(). Earlier start times win within the file.
+
+    The rows are history, so no BookingEvents are logged for them unless
+    `log_events` is set; each chunk bumps the calendar feeds it touches once.
+    created_at keeps the source system's value when the file has one.
+    """
+
+    def __init__(self, log_events=False):
+        self.log_events = log_events
+
+    def prepare(self):
+        from django.contrib.auth.models import User
+
+        self.fields = FieldLookup()
+        self.users, emails = {}, defaultdict(list)
+        for user_id, username, email in User.objects.values_list('id', 'username', 'email'):
+            self.users[username.lower()] = user_id
+            if email:
+                emails[email.lower()].append(user_id)
+        self.user_emails = {email: ids[0] for email, ids in emails.items() if len(ids) == 1}
+
+    def parse(self, row):
+        user_key = _text(row, 'user').lower()
+        user_id = self.user_emails.get(user_key) if '@' in user_key else None
+        user_id = user_id or self.users.get(user_key)
+        if user_id is None:
+            raise RowError(f"user: unknown user '{row.get('user')}'")
+
+        field_id = self.fields.resolve(row)
+        day = _date(row, 'date')
+        start, end = _time(row, 'start_time'), _time(row, 'end_time')
+        if end <= start:
+            raise RowError("end_time must be after start_time")
+
+        amount = _decimal(row, 'amount', required=False)
+        if amount is None:
+            amount = booking_amount(self.fields.prices[field_id], day, start, end)
+        booking = Booking(
+            user_id=user_id, field_id=field_id, venue_id=self.fields.venues[field_id], date=day, start_time=start, end_time=end,
+            status=_choice(row, 'status', Booking.STATUS_CHOICES, 'approved'),
+            amount=amount,
+            payment_status=_choice(row, 'payment_status', Booking.PAYMENT_CHOICES, 'unpaid'),
+            payment_ref=_text(row, 'payment_ref', required=False, max_length=64),
+        )
+        # auto_now_add overwrites created_at on insert; write() puts it back
+        booking.source_created_at = _datetime(row, 'created_at')
+        return booking
+
+    def _approved_intervals(self, keys):
+        """{(field_id, date): [(start, end)]} of approved bookings already stored for `keys`."""
+        taken = defaultdict(list)
+        field_ids = {field_id for field_id, _ in keys}
+        days = sorted({day for _, day in keys})
+        for i in range(0, len(days), IN_BATCH):
+            rows = Booking.objects.filter(
+                status='approved', field_id__in=field_ids, date__in=days[i:i + IN_BATCH],
+            ).values_list('field_id', 'date', 'start_time', 'end_time')
+            for field_id, day, start, end in rows:
+                if (field_id, day) in keys:
+                    taken[(field_id, day)].append((start, end))
+        return taken
+
+    def check(self, parsed):
+        accepted = [b for _, _, b in parsed if b.status != 'approved']
+        rejected = []
+        approved = [p for p in parsed if p[2].status == 'approved']
+        taken = self._approved_intervals({(b.field_id, b.date) for _, _, b in approved})
+        for number, row, b in sorted(approved, key=lambda p: (p[2].field_id, p[2].date, p[2].start_time, p[0])):
+            key = (b.field_id, b.date)
+            clash = _first_clash(taken[key], b.start_time, b.end_time)
+            if clash:
+                rejected.append((number, row, _clash_message("approved booking", clash)))
+            else:
+                taken[key].append((b.start_time, b.end_time))
+                accepted.append(b)
+        return accepted, rejected
+
+    def write(self, bookings):
+        Booking.objects.bulk_create(bookings, batch_size=1000)
+        dated = [b for b in bookings if b.source_created_at is not None]
+        for b in dated:
+            b.created_at = b.source_created_at
+        if dated:
+            Booking.objects.bulk_update(dated, ['created_at'], batch_size=1000)
+        if self.log_events:
+            events.log_created(bookings)  # bumps the feeds too
+        else:
+            ics.bookings_changed(bookings)
+
+    def finish(self):
+        pass
+
+
+IMPORTERS = {
+    'fields': FieldImporter,
+    'timeslots': TimeSlotImporter,
+    'bookings': BookingImporter,
+}
+
+
+def import_rows(importer, rows, rejects, chunk_size=5000, dry_run=False, progress=None):
+    """
+    Run `importer` over (line number, row) pairs, chunk by chunk, writing
+    failures to `rejects` (a RejectWriter). Returns the number of rows imported.
+    """
+    importer.prepare()
+    imported = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        parsed = []
+        for number, row in chunk:
+            try:
+                parsed.append((number, row, importer.parse(row)))
+            except RowError as exc:
+                rejects.write(number, row, str(exc))
+
+        with transaction.atomic():
+            accepted, rejected = importer.check(parsed)
+            if accepted and not dry_run:
+                importer.write(accepted)
+        for number, row, error in sorted(rejected, key=lambda r: r[0]):
+            rejects.write(number, row, error)
+        imported += len(accepted)
+        if progress:
+            progress(imported, rejects.count)
+    if imported and not dry_run:
+        importer.finish()
+    return imported
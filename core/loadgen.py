@@ -0,0 +1,391 @@
+"""
+Open-loop load generator for a running server (`manage.py load_test`).
+
+Virtual users run scripted journeys over the real HTML and JSON endpoints:
+logging in, browsing fields, polling the calendar APIs, booking the Friday
+evening rush, viewing receipts, and staff approving bookings and exporting
+Excel. Journeys start at a Poisson arrival rate that does not slow down when
+the server does. Queueing therefore shows up as latency and dropped
+arrivals, not as a quietly lower request rate.
+
+The HTTP client is a minimal HTTP/1.1 keep-alive client on asyncio streams,
+one connection and cookie jar per virtual user, so the tool needs nothing
+beyond the standard library.
+"""
+import asyncio
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+JOURNEYS = ('browse', 'book', 'calendar', 'newcomer', 'admin')
+DEFAULT_MIX = {'browse': 40, 'book': 25, 'calendar': 20, 'newcomer': 5, 'admin': 10}
+
+FIELD_LINK = re.compile(r'/field/(\d+)/')
+RECEIPT_LINK = re.compile(r'/receipt/(\d+)/')
+APPROVE_FORM = re.compile(r'/update-booking/(\d+)/approved/')
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', 'replace')
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reconnects once if a reused socket was closed."""
+
+    def __init__(self, host, port, use_ssl):
+        self.host, self.port, self.use_ssl = host, port, use_ssl
+        self.reader = self.writer = None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers, body=b''):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+        for attempt in range(2):
+            reused = self.writer is not None
+            if not reused:
+                self.reader, self.writer = await asyncio.open_connection(
+                    self.host, self.port, ssl=self.use_ssl or None,
+                )
+            try:
+                self.writer.write(payload)
+                await self.writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if not reused or attempt:
+                    raise
+
+    async def _read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("server closed the connection")
+        version, status = status_line.split(b' ', 2)[:2]
+        headers = []
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers.append((name.strip().lower(), value.strip()))
+        lookup = {name: value for name, value in headers}
+        status = int(status)
+
+        if lookup.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if not size:
+                    await self.reader.readline()
+                    break
+                body += await self.reader.readexactly(size)
+                await self.reader.readline()
+            body = bytes(body)
+        elif 'content-length' in lookup:
+            body = await self.reader.readexactly(int(lookup['content-length']))
+        elif status in (204, 304):
+            body = b''
+        else:
+            body = await self.reader.read()
+            lookup['connection'] = 'close'
+
+        if lookup.get('connection', '').lower() == 'close' or version == b'HTTP/1.0':
+            self.close()
+        return Response(status, headers, body)
+
+
+class Stats:
+    """Request latencies and outcome counts for one load step."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)  # endpoint -> [ms]
+        self.outcomes = Counter()           # ok / error / throttled
+        self.errors = Counter()             # "endpoint status" -> count
+        self.bookings = Counter()           # booked / conflict
+        self.journeys = Counter()           # started / completed / failed / dropped
+
+    def record(self, endpoint, ms, outcome, detail=None):
+        self.latencies[endpoint].append(ms)
+        self.outcomes[outcome] += 1
+        if outcome == 'error':
+            self.errors[f"{endpoint} {detail}"] += 1
+
+    def all_latencies(self):
+        return sorted(ms for samples in self.latencies.values() for ms in samples)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class VirtualUser:
+    def __init__(self, target, stats, rng, think_ms, timeout):
+        self.connection = Connection(*target)
+        self.cookies = {}
+        self.stats = stats
+        self.rng = rng
+        self.think_ms = think_ms
+        self.timeout = timeout
+
+    async def think(self):
+        if self.think_ms:
+            await asyncio.sleep(self.rng.expovariate(1000 / self.think_ms))
+
+    async def call(self, endpoint, method, path, data=None, expect=(200,)):
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{k}={v}" for k, v in self.cookies.items())
+        body = b''
+        if method == 'POST':
+            body = urlencode(data or {}).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                self.connection.request(method, path, headers, body), self.timeout,
+            )
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+            self.connection.close()
+            self.stats.record(endpoint, (time.perf_counter() - started) * 1000, 'error', type(exc).__name__)
+            raise JourneyFailed(endpoint)
+        ms = (time.perf_counter() - started) * 1000
+
+        for name, value in response.headers:
+            if name == 'set-cookie':
+                for morsel in SimpleCookie(value).values():
+                    if morsel.value:
+                        self.cookies[morsel.key] = morsel.value
+                    else:
+                        self.cookies.pop(morsel.key, None)
+
+        if response.status == 429:
+            self.stats.record(endpoint, ms, 'throttled')
+        elif response.status in expect:
+            self.stats.record(endpoint, ms, 'ok')
+        else:
+            self.stats.record(endpoint, ms, 'error', response.status)
+            raise JourneyFailed(endpoint)
+        return response
+
+    async def get(self, endpoint, path, expect=(200,)):
+        return await self.call(endpoint, 'GET', path, expect=expect)
+
+    async def post(self, endpoint, path, data, expect=(302,)):
+        return await self.call(endpoint, 'POST', path, data, expect=expect)
+
+    async def login(self, username, password):
+        await self.get('login', '/login/')
+        await self.post('login', '/login/', {'username': username, 'password': password})
+
+    async def field_ids(self):
+        ids = sorted({int(i) for i in FIELD_LINK.findall((await self.get('field_list', '/fields/')).text)})
+        if not ids:
+            raise JourneyFailed('field_list: no fields')
+        return ids
+
+
+# ------------------------------------------------------------
+# journeys
+# ------------------------------------------------------------
+
+def peak_slot(rng):
+    """A Friday-evening slot in the next four weeks, skewed towards 18:00-20:00."""
+    today = date.today()
+    friday = today + timedelta(days=(4 - today.weekday()) % 7 or 7)
+    day = friday + timedelta(weeks=rng.randrange(4))
+    hour = rng.choices([17, 18, 19, 20, 21], weights=[2, 5, 5, 3, 1])[0]
+    return day.isoformat(), f"{hour:02d}:00", f"{hour + 1:02d}:00"
+
+
+async def browse(user, plan):
+    await user.login(*plan.player(user.rng))
+    await user.think()
+    ids = await user.field_ids()
+    for field_id in user.rng.sample(ids, min(2, len(ids))):
+        await user.think()
+        await user.get('field_detail', f'/field/{field_id}/')
+        await user.get('availability_api', f'/api/availability/{field_id}/')
+
+
+async def book(user, plan):
+    await user.login(*plan.player(user.rng))
+    ids = await user.field_ids()
+    field_id = user.rng.choice(ids)
+    await user.think()
+    await user.get('book_field', f'/book/{field_id}/')
+    day, start, end = peak_slot(user.rng)
+    await user.think()
+    # 302 to my_bookings when booked, 200 with a waitlist offer when the slot is taken
+    response = await user.post('book_field_post', f'/book/{field_id}/',
+                               {'date': day, 'start_time': start, 'end_time': end}, expect=(200, 302))
+    user.stats.bookings['booked' if response.status == 302 else 'conflict'] += 1
+    receipts = RECEIPT_LINK.findall((await user.get('my_bookings', '/my-bookings/')).text)
+    if receipts:
+        await user.think()
+        await user.get('booking_receipt', f'/receipt/{user.rng.choice(receipts)}/')
+
+
+async def calendar(user, plan):
+    await user.login(*plan.player(user.rng))
+    await user.get('all_fields_api', '/api/calendar-all/')
+    ids = await user.field_ids()
+    for _ in range(3):
+        await user.think()
+        await user.get('availability_api', f'/api/availability/{user.rng.choice(ids)}/')
+
+
+async def newcomer(user, plan):
+    await user.get('register', '/register/')
+    password = plan.password
+    await user.think()
+    await user.post('register', '/register/', {
+        'username': plan.new_username(), 'password1': password, 'password2': password,
+    })
+    await user.think()
+    await user.field_ids()
+
+
+async def admin(user, plan):
+    await user.login(plan.staff_username, plan.password)
+    dashboard = (await user.get('admin_dashboard', '/admin-dashboard/')).text
+    pending = APPROVE_FORM.findall(dashboard)
+    for booking_id in user.rng.sample(pending, min(3, len(pending))):
+        await user.think()
+        await user.post('approve_booking', f'/update-booking/{booking_id}/approved/', {})
+    await user.think()
+    await user.get('export_excel', '/export-excel/')
+
+
+JOURNEY_FUNCTIONS = {
+    'browse': browse, 'book': book, 'calendar': calendar, 'newcomer': newcomer, 'admin': admin,
+}
+
+
+class Plan:
+    """Accounts the journeys log in with (see `load_test --prepare`)."""
+
+    def __init__(self, players, staff_username, password, run_id):
+        self.players = players
+        self.staff_username = staff_username
+        self.password = password
+        self.run_id = run_id
+        self.registered = 0
+
+    def player(self, rng):
+        return rng.choice(self.players), self.password
+
+    def new_username(self):
+        self.registered += 1
+        return f"lt{self.run_id}n{self.registered}"
+
+
+# ------------------------------------------------------------
+# runner
+# ------------------------------------------------------------
+
+def parse_target(base_url):
+    parts = urlsplit(base_url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f"Not an http(s) URL: {base_url}")
+    use_ssl = parts.scheme == 'https'
+    return parts.hostname, parts.port or (443 if use_ssl else 80), use_ssl
+
+
+async def run_journey(name, target, plan, stats, rng, think_ms, timeout):
+    user = VirtualUser(target, stats, rng, think_ms, timeout)
+    stats.journeys['started'] += 1
+    try:
+        await JOURNEY_FUNCTIONS[name](user, plan)
+        stats.journeys['completed'] += 1
+    except JourneyFailed:
+        stats.journeys['failed'] += 1
+    finally:
+        user.connection.close()
+
+
+async def run_step(rate, seconds, mix, target, plan, rng, think_ms=300, timeout=30.0, max_in_flight=500):
+    """
+    Start journeys at `rate` per second (Poisson arrivals) for `seconds`,
+    then wait for the ones in flight. Returns (Stats, wall seconds).
+    """
+    stats = Stats()
+    names, weights = zip(*mix.items())
+    in_flight = set()
+    started = time.perf_counter()
+    next_arrival = started
+    while True:
+        next_arrival += rng.expovariate(rate)
+        if next_arrival - started >= seconds:
+            break
+        await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        if len(in_flight) >= max_in_flight:
+            stats.journeys['dropped'] += 1
+            continue
+        name = rng.choices(names, weights)[0]
+        task = asyncio.create_task(run_journey(
+            name, target, plan, stats, random.Random(rng.random()), think_ms, timeout,
+        ))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.wait(in_flight)
+    return stats, time.perf_counter() - started
+
+
+def summarize(rate, seconds, stats, elapsed):
+    """One report row. Journeys/s counts the step's completed journeys over its nominal length."""
+    latencies = stats.all_latencies()
+    requests = len(latencies)
+    attempts = stats.bookings['booked'] + stats.bookings['conflict']
+    return {
+        'offered': rate,
+        'journeys_per_s': stats.journeys['completed'] / seconds,
+        'requests_per_s': requests / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'error_rate': stats.outcomes['error'] / requests if requests else 0.0,
+        'throttled_rate': stats.outcomes['throttled'] / requests if requests else 0.0,
+        'conflict_rate': stats.bookings['conflict'] / attempts if attempts else 0.0,
+        'dropped': stats.journeys['dropped'],
+    }
+
+
+def saturation_reason(row, slo_ms, max_error_rate):
+    """Why a step counts as past saturation, or None when the server kept up."""
+    if row['dropped']:
+        return f"{row['dropped']} arrivals dropped at the in-flight cap"
+    if row['error_rate'] > max_error_rate:
+        return f"error rate {row['error_rate']:.1%}"
+    if row['p95'] > slo_ms:
+        return f"p95 {row['p95']:.0f} ms over the {slo_ms:.0f} ms target"
+    # Poisson arrivals wobble around the offered rate, so allow some slack
+    if row['journeys_per_s'] < 0.8 * row['offered']:
+        return f"completed {row['journeys_per_s']:.1f}/s of {row['offered']:g}/s offered"
+    return None
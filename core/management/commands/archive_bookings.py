@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.archive import archive_cutoff, archivable_bookings, archive_bookings
+
+
+class Command(BaseCommand):
+    help = "Move bookings older than the archive horizon from Booking to ArchivedBooking."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.BOOKING_ARCHIVE_HORIZON_DAYS,
+            help="Archive bookings dated more than N days ago (default: BOOKING_ARCHIVE_HORIZON_DAYS).",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many bookings would move.")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['older_than_days'])
+
+        if options['dry_run']:
+            count = archivable_bookings(cutoff).count()
+            self.stdout.write(f"{count} bookings dated before {cutoff} would be archived.")
+            return
+
+        moved = archive_bookings(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} bookings dated before {cutoff}."))
@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+from datetime import time as dt_time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.api.renderers import FastJSONRenderer
+from core.api.serializers import BookingSerializer
+from core.models import Field, Booking
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark REST API serialization throughput on a large bookings page: "
+        "DRF ModelSerializer + stdlib JSON vs. the values() + orjson path the API uses. "
+        "Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(options['rows'], options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, rows, repeat):
+        rng = random.Random(42)
+        today = timezone.localdate()
+        staff = User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+        fields = Field.objects.bulk_create([
+            Field(name=f"Court {i}", location="Bench", price_per_hour=1000) for i in range(10)
+        ])
+        Booking.objects.bulk_create([
+            Booking(
+                user=staff, field=rng.choice(fields),
+                date=today + timedelta(days=rng.randrange(60)),
+                start_time=dt_time(h := rng.randint(6, 22)), end_time=dt_time(h + 1),
+                amount=1000, status='approved',
+            )
+            for _ in range(rows)
+        ], batch_size=5000)
+
+        queryset = Booking.objects.order_by('-id')
+        columns = BookingSerializer.Meta.fields
+
+        def drf_serializer():
+            return JSONRenderer().render(BookingSerializer(queryset, many=True).data)
+
+        def values_orjson():
+            return FastJSONRenderer().render(list(queryset.values(*columns)))
+
+        client = APIClient()
+        client.force_authenticate(staff)
+
+        def end_to_end():
+            response = client.get('/api/v1/bookings/', {'page_size': rows})
+            assert response.status_code == 200, response.status_code
+            return response.content
+
+        def end_to_end_sparse():
+            response = client.get('/api/v1/bookings/', {'page_size': rows, 'fields': 'id,date,start_time,status'})
+            assert response.status_code == 200, response.status_code
+            return response.content
+
+        cases = [
+            ("ModelSerializer + json", drf_serializer),
+            ("values() + orjson", values_orjson),
+            ("GET /api/v1/bookings/", end_to_end),
+            ("  ...?fields=4 columns", end_to_end_sparse),
+        ]
+
+        self.stdout.write(f"{rows} rows, median of {repeat} runs")
+        self.stdout.write(f"{'case':<26} {'ms':>9} {'rows/s':>11} {'bytes':>10}")
+        for name, case in cases:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                body = case()
+                timings.append(time.perf_counter() - started)
+            median = statistics.median(timings)
+            self.stdout.write(f"{name:<26} {median * 1000:>9.1f} {rows / median:>11,.0f} {len(body):>10,}")
@@ -0,0 +1,118 @@
+import random
+import statistics
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.archive import archive_cutoff, archive_bookings
+from core.models import Field, Booking
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark hot-path booking queries (conflict check, calendar feed, my_bookings) "
+        "as booking history grows, with and without archiving. Runs against a throwaway "
+        "test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='0,20000,100000,300000',
+                            help="Comma-separated history sizes (past bookings) to measure at.")
+        parser.add_argument('--live', type=int, default=2000, help="Live bookings in the next four weeks.")
+        parser.add_argument('--fields', type=int, default=10)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=50, help="Repetitions per query (median is reported).")
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options['sizes'].split(','))
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(sizes, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, sizes, options):
+        rng = random.Random(42)
+        today = timezone.localdate()
+        horizon = settings.BOOKING_ARCHIVE_HORIZON_DAYS
+
+        users = User.objects.bulk_create([User(username=f"bench{i}") for i in range(options['users'])])
+        fields = Field.objects.bulk_create([
+            Field(name=f"Court {i}", location="Bench", price_per_hour=1000) for i in range(options['fields'])
+        ])
+
+        def make_bookings(count, first_day, days, statuses=('approved', 'approved', 'pending', 'rejected')):
+            for _ in range(count):
+                hour = rng.randint(6, 22)
+                yield Booking(
+                    user=rng.choice(users), field=rng.choice(fields),
+                    date=first_day + timedelta(days=rng.randrange(days)),
+                    start_time=dt_time(hour), end_time=dt_time(hour + 1),
+                    status=rng.choice(statuses),
+                    amount=1000, payment_status='paid',
+                )
+
+        Booking.objects.bulk_create(make_bookings(options['live'], today, 28), batch_size=5000)
+
+        field, user = fields[0], users[0]
+        probe_date = today + timedelta(days=7)
+        probe_start, probe_end = dt_time(18), dt_time(19)
+
+        def conflict_check():
+            return Booking.objects.filter(
+                field=field, date=probe_date,
+                start_time__lt=probe_end, end_time__gt=probe_start,
+                status='approved',
+            ).exists()
+
+        def calendar_feed():
+            return list(Booking.objects.filter(field=field, status='approved')
+                        .values_list('id', 'date', 'start_time', 'end_time'))
+
+        def my_bookings():
+            return list(Booking.objects.filter(user=user).order_by('-date', '-start_time'))
+
+        queries = [('conflict check', conflict_check), ('calendar feed', calendar_feed), ('my_bookings', my_bookings)]
+
+        def measure():
+            results = []
+            for _, query in queries:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    query()
+                    timings.append((time.perf_counter() - started) * 1000)
+                results.append(statistics.median(timings))
+            return results
+
+        header = f"{'history':>9} {'mode':>10} " + " ".join(f"{name:>15}" for name, _ in queries)
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        history = 0
+        for size in sizes:
+            # history is spread over the two years before the archive horizon, all of it settled
+            Booking.objects.bulk_create(
+                make_bookings(size - history, today - timedelta(days=horizon + 730), 730, ('approved', 'rejected')),
+                batch_size=5000,
+            )
+            history = size
+
+            for mode in ('live table', 'archived'):
+                if mode == 'archived':
+                    archive_bookings(archive_cutoff(), batch_size=5000)
+                row = measure()
+                self.stdout.write(
+                    f"{size:>9} {mode:>10} " + " ".join(f"{ms:>12.3f} ms" for ms in row)
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            "With archiving, hot-path latency should stay flat as history grows; "
+            "'live table' shows the same queries with history left in Booking."
+        ))
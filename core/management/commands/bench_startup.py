@@ -0,0 +1,105 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Libraries that only receipts, exports and analytics need. None of them may
+# be imported while a worker boots. (requests is not listed: rest_framework
+# imports it at startup whenever it is installed.)
+DEFERRED_MODULES = ('pdfkit', 'openpyxl', 'qrcode', 'numpy')
+
+# Runs in a fresh interpreter: boot the WSGI app and serve one request to '/'.
+COLD_START_SCRIPT = """
+import json, os, time
+t0 = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', %(settings)r)
+from django.core.wsgi import get_wsgi_application
+from wsgiref.util import setup_testing_defaults
+app = get_wsgi_application()
+import %(urlconf)s
+t1 = time.perf_counter()
+environ = {'PATH_INFO': '/'}
+setup_testing_defaults(environ)
+status = []
+b''.join(app(environ, lambda s, h, exc_info=None: status.append(s)))
+t2 = time.perf_counter()
+print(json.dumps({'boot_ms': (t1 - t0) * 1000, 'first_response_ms': (t2 - t0) * 1000, 'status': status[0]}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output into ({module: cumulative_us}, {top_level_module: cumulative_us}).
+    Nested imports are indented under the module that triggered them.
+    """
+    modules, top_level = {}, {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative_us)
+        if not name[1:].startswith(' '):
+            top_level[name.strip()] = int(cumulative_us)
+    return modules, top_level
+
+
+class Command(BaseCommand):
+    help = "Measure worker import time and cold-start-to-first-response, and fail on regressions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts to measure (median is reported).")
+        parser.add_argument('--max-boot-ms', type=float, default=None,
+                            help="Fail if the median boot time exceeds this.")
+        parser.add_argument('--max-first-response-ms', type=float, default=None,
+                            help="Fail if the median cold-start-to-first-response time exceeds this.")
+        parser.add_argument('--top', type=int, default=10, help="Slowest imports to list.")
+
+    def handle(self, *args, **options):
+        script = COLD_START_SCRIPT % {
+            'settings': os.environ.get('DJANGO_SETTINGS_MODULE', 'futsal_project.settings'),
+            'urlconf': settings.ROOT_URLCONF,
+        }
+
+        boots, firsts, imports, top_level = [], [], {}, {}
+        for _ in range(options['runs']):
+            proc = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', script],
+                capture_output=True, text=True, cwd=settings.BASE_DIR,
+            )
+            if proc.returncode != 0:
+                raise CommandError(f"Cold start failed:\n{proc.stderr[-2000:]}")
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            if not result['status'].startswith('200'):
+                raise CommandError(f"First request to '/' returned {result['status']}")
+            boots.append(result['boot_ms'])
+            firsts.append(result['first_response_ms'])
+            imports, top_level = parse_importtime(proc.stderr)
+
+        eager = sorted(m for m in DEFERRED_MODULES if m in imports)
+        boot_ms = statistics.median(boots)
+        first_ms = statistics.median(firsts)
+
+        self.stdout.write(f"Runs:                 {options['runs']}")
+        self.stdout.write(f"Modules imported:     {len(imports)}")
+        self.stdout.write(f"Boot (median):        {boot_ms:.1f} ms")
+        self.stdout.write(f"First response (med): {first_ms:.1f} ms")
+        self.stdout.write("Slowest imports (cumulative):")
+        for name, us in sorted(top_level.items(), key=lambda kv: kv[1], reverse=True)[:options['top']]:
+            self.stdout.write(f"  {us / 1000:8.1f} ms  {name}")
+
+        failures = []
+        if eager:
+            failures.append(f"deferred modules imported at startup: {', '.join(eager)}")
+        if options['max_boot_ms'] is not None and boot_ms > options['max_boot_ms']:
+            failures.append(f"boot {boot_ms:.1f} ms > {options['max_boot_ms']} ms")
+        if options['max_first_response_ms'] is not None and first_ms > options['max_first_response_ms']:
+            failures.append(f"first response {first_ms:.1f} ms > {options['max_first_response_ms']} ms")
+
+        if failures:
+            raise CommandError("Startup regression: " + "; ".join(failures))
+        self.stdout.write(self.style.SUCCESS("Startup benchmark OK"))
@@ -0,0 +1,83 @@
+import random
+import time
+from datetime import time as dt_time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.models import Field, Booking, TimeSlot
+from core.utilization import compute_utilization, utilization
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the field x weekday x hour utilization heatmap over a large booking "
+        "history: cold, with per-month totals cached, and fully cached. "
+        "Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--approved', type=float, default=0.6,
+                            help="Share of bookings that are approved.")
+        parser.add_argument('--fields', type=int, default=10)
+        parser.add_argument('--days', type=int, default=365, help="Date range the bookings are spread over.")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        rng = random.Random(42)
+        end = timezone.localdate()
+        start = end - timedelta(days=options['days'] - 1)
+
+        user = User.objects.create_user('bench')
+        fields = Field.objects.bulk_create([
+            Field(name=f"Court {i}", location="Bench", price_per_hour=1000) for i in range(options['fields'])
+        ])
+        TimeSlot.objects.bulk_create([
+            TimeSlot(field=field, start_time=dt_time(h), end_time=dt_time(h + 1))
+            for field in fields for h in range(6, 23)
+        ])
+
+        self.stdout.write(f"Creating {options['rows']:,} bookings...")
+        batch = []
+        for _ in range(options['rows']):
+            hour = rng.randint(6, 21)
+            batch.append(Booking(
+                user=user, field=rng.choice(fields),
+                date=start + timedelta(days=rng.randrange(options['days'])),
+                start_time=dt_time(hour, rng.choice([0, 30])), end_time=dt_time(hour + 1, rng.choice([0, 30])),
+                status='approved' if rng.random() < options['approved'] else 'rejected', amount=1000,
+            ))
+            if len(batch) == 50000:
+                Booking.objects.bulk_create(batch)
+                batch = []
+        Booking.objects.bulk_create(batch)
+
+        started = time.perf_counter()
+        result = compute_utilization(start, end, refresh=True)
+        cold = time.perf_counter() - started
+
+        # a different range over the same months: whole months come from the month cache
+        started = time.perf_counter()
+        compute_utilization(start + timedelta(days=10), end - timedelta(days=3))
+        warm = time.perf_counter() - started
+
+        utilization(start, end)
+        started = time.perf_counter()
+        utilization(start, end)
+        cached = time.perf_counter() - started
+
+        self.stdout.write(f"cold, {options['days']} days:           {cold * 1000:>9.1f} ms")
+        self.stdout.write(f"new range, months cached:  {warm * 1000:>9.1f} ms")
+        self.stdout.write(f"same range again:          {cached * 1000:>9.2f} ms")
+        self.stdout.write(
+            "field occupancy: " + ", ".join(f"{o:.0%}" for o in result['field_occupancy'])
+        )
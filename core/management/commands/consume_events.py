@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.events import consume, consumer_lag, registered_consumers
+from core.models import EventCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Feed new booking events to the consumers in settings.BOOKING_EVENT_CONSUMERS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('consumers', nargs='*', help="Consumer names (default: all registered).")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and poll for new events every N seconds (default: catch up once and exit).",
+        )
+        parser.add_argument('--reset', action='store_true',
+                            help="Move the consumers back to the first event and replay the whole log.")
+        parser.add_argument('--status', action='store_true',
+                            help="Only print each consumer's checkpoint and backlog.")
+
+    def handle(self, *args, **options):
+        handlers = registered_consumers()
+        unknown = set(options['consumers']) - set(handlers)
+        if unknown:
+            raise CommandError(f"Unknown consumers: {', '.join(sorted(unknown))}")
+        if options['consumers']:
+            handlers = {name: handlers[name] for name in options['consumers']}
+
+        if options['status']:
+            lag = consumer_lag()
+            for name in handlers:
+                position, behind = lag[name]
+                self.stdout.write(f"{name}: at event {position}, {behind} behind")
+            return
+
+        if options['reset']:
+            EventCheckpoint.objects.filter(consumer__in=handlers).update(position=0)
+
+        while True:
+            for name, handler in handlers.items():
+                processed = consume(name, handler, options['batch_size'])
+                if processed or not options['interval']:
+                    self.stdout.write(f"{name}: processed {processed} events.")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
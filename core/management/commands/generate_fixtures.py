@@ -0,0 +1,61 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Field, Team, Tournament
+from core.tournaments import FixtureError, advance_knockout, create_tournament
+
+
+def _ids(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a tournament's fixtures on the fields' time slots, around approved bookings "
+        "and existing matches, or add the next knockout round of a group tournament (--advance)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', help="Tournament name.")
+        parser.add_argument('--teams', type=_ids, help="Comma-separated team ids in seeding order (default: all teams).")
+        parser.add_argument('--fields', type=_ids, help="Comma-separated field ids (default: all fields).")
+        parser.add_argument('--start', type=date.fromisoformat, help="First day, YYYY-MM-DD.")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day, YYYY-MM-DD.")
+        parser.add_argument('--format', choices=[f for f, _ in Tournament.FORMAT_CHOICES], default='league')
+        parser.add_argument('--groups', type=int, default=4, help="Groups for --format groups (a power of two).")
+        parser.add_argument('--double', action='store_true', help="Play every pairing home and away.")
+        parser.add_argument('--rest-days', type=int, default=1, help="Days off a team gets between matches.")
+        parser.add_argument('--advance', type=int, metavar='TOURNAMENT_ID',
+                            help="Schedule the next knockout round of this tournament.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            if options['advance']:
+                tournament = Tournament.objects.filter(pk=options['advance']).first()
+                if tournament is None:
+                    raise CommandError(f"No tournament {options['advance']}.")
+                matches = advance_knockout(
+                    tournament, options['fields'], options['start'], options['end'], options['rest_days'],
+                )
+                count = len(matches)
+            else:
+                if not (options['name'] and options['start'] and options['end']):
+                    raise CommandError("--name, --start and --end are required.")
+                tournament = create_tournament(
+                    options['name'],
+                    options['teams'] or list(Team.objects.order_by('id').values_list('id', flat=True)),
+                    options['fields'] or list(Field.objects.order_by('id').values_list('id', flat=True)),
+                    options['start'], options['end'],
+                    format=options['format'], double=options['double'],
+                    groups=options['groups'], rest_days=options['rest_days'],
+                )
+                count = tournament.matches.count()
+        except FixtureError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{tournament.name} (#{tournament.id}): scheduled {count} matches in {time.perf_counter() - started:.2f}s."
+        ))
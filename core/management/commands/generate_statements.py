@@ -0,0 +1,67 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.statements import paid_bookings_for_month, statement_jobs, build_statement_zip
+
+
+class Command(BaseCommand):
+    help = (
+        "Render PDF receipts for every paid booking in a month, plus per-user "
+        "and/or per-field monthly statements, across all CPU cores into one ZIP."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="Month as YYYY-MM (default: previous month).")
+        parser.add_argument('--by', choices=['user', 'field', 'both'], default='both',
+                            help="Which monthly statements to produce.")
+        parser.add_argument('--no-receipts', action='store_true',
+                            help="Only produce statements, not one receipt per booking.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes (default: number of CPU cores).")
+        parser.add_argument('--output', help="ZIP file to write (default: statements_YYYY-MM.zip).")
+
+    def handle(self, *args, **options):
+        year, month = self.parse_month(options['month'])
+        output = options['output'] or f"statements_{year:04d}-{month:02d}.zip"
+        group_by = ('user', 'field') if options['by'] == 'both' else (options['by'],)
+
+        bookings = list(paid_bookings_for_month(year, month))
+        if not bookings:
+            self.stdout.write(f"No paid bookings in {year:04d}-{month:02d}.")
+            return
+
+        started = time.monotonic()
+        jobs = list(statement_jobs(bookings, year, month, group_by, receipts=not options['no_receipts']))
+        self.stdout.write(f"Rendering {len(jobs)} documents for {len(bookings)} paid bookings to PDF...")
+
+        step = max(1, len(jobs) // 100)
+
+        def progress(done, total, zip_path, error):
+            if error:
+                self.stderr.write(f"  failed: {zip_path}: {error}")
+            if done % step == 0 or done == total:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"  [{done}/{total}] {done * 100 // total}% ({done / elapsed:.1f} docs/s)")
+
+        failures = build_statement_zip(jobs, output, workers=options['workers'], progress=progress)
+
+        written = len(jobs) - len(failures)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} PDFs to {output} in {time.monotonic() - started:.1f}s"
+        ))
+        if failures:
+            raise CommandError(f"{len(failures)} documents failed to render.")
+
+    def parse_month(self, value):
+        if not value:
+            first_of_this_month = date.today().replace(day=1)
+            previous = date.fromordinal(first_of_this_month.toordinal() - 1)
+            return previous.year, previous.month
+        try:
+            year, month = (int(part) for part in value.split('-'))
+            date(year, month, 1)
+        except ValueError:
+            raise CommandError("--month must look like YYYY-MM.")
+        return year, month
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import IMPORTERS, BookingImporter, RejectWriter, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import fields, time slots or historical bookings from a CSV or XLSX file. "
+        "Rows that fail validation go to a reject file with the reason."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--rejects', help="Reject file (default: <path>.rejects.csv).")
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Rows validated and written per transaction.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Validate only. Overlaps between chunks are not detected without writing.")
+        parser.add_argument('--log-events', action='store_true',
+                            help="bookings: log a 'created' BookingEvent per row, for event consumers to "
+                                 "process (off by default, the rows are history).")
+
+    def handle(self, *args, **options):
+        if options['log_events'] and options['kind'] != 'bookings':
+            raise CommandError("--log-events only applies to bookings.")
+        importer = BookingImporter(log_events=True) if options['log_events'] else IMPORTERS[options['kind']]()
+        path = options['path']
+        rejects_path = options['rejects'] or f"{path}.rejects.csv"
+        started = time.perf_counter()
+
+        def progress(imported, rejected):
+            self.stdout.write(f"  {imported:,} imported, {rejected:,} rejected", ending='\r')
+            self.stdout.flush()
+
+        try:
+            with open(rejects_path, 'w', newline='', encoding='utf-8') as f:
+                rejects = RejectWriter(f)
+                imported = import_rows(
+                    importer, read_rows(path), rejects,
+                    chunk_size=options['chunk_size'], dry_run=options['dry_run'], progress=progress,
+                )
+        except FileNotFoundError as exc:
+            raise CommandError(exc)
+
+        elapsed = time.perf_counter() - started
+        verb = "would import" if options['dry_run'] else "imported"
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['kind']}: {verb} {imported:,} rows in {elapsed:.1f}s "
+            f"({(imported + rejects.count) / elapsed if elapsed else 0:,.0f} rows/s)."
+        ))
+        if rejects.count:
+            self.stdout.write(self.style.WARNING(f"{rejects.count:,} rows rejected, see {rejects_path}"))
@@ -0,0 +1,152 @@
+import asyncio
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadgen import (
+    DEFAULT_MIX, JOURNEYS, Plan, parse_target, percentile, run_step, saturation_reason, summarize,
+)
+from core.models import Field, Venue
+
+PLAYER_PREFIX = 'loadtest_player_'
+STAFF_USERNAME = 'loadtest_staff'
+VENUE_NAME = 'Load Test Venue'
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay peak booking traffic against a running server and report throughput, "
+        "latency percentiles, error/conflict rates and the arrival rate at which it saturates. "
+        "Start the server first (e.g. gunicorn or runserver); --prepare creates the test "
+        "accounts in the database this project is configured with, which must be the server's."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--rates', default='2,4,8,16,32',
+                            help="Comma-separated journey arrival rates (per second), one step each.")
+        parser.add_argument('--step-seconds', type=float, default=30)
+        parser.add_argument('--mix', default=','.join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                            help=f"Journey weights, e.g. browse=40,book=25. Journeys: {', '.join(JOURNEYS)}.")
+        parser.add_argument('--think-ms', type=float, default=300,
+                            help="Mean pause between the pages of a journey.")
+        parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout (seconds).")
+        parser.add_argument('--max-in-flight', type=int, default=500,
+                            help="Arrivals beyond this many running journeys are dropped and reported.")
+        parser.add_argument('--slo-ms', type=float, default=500,
+                            help="p95 latency above this marks a step as saturated.")
+        parser.add_argument('--max-error-rate', type=float, default=0.01)
+        parser.add_argument('--users', type=int, default=200, help="Player accounts to log in as.")
+        parser.add_argument('--password', default='futsal-load-test')
+        parser.add_argument('--prepare', action='store_true',
+                            help="Create the player and staff accounts, and a venue with a few fields for the staff account.")
+        parser.add_argument('--keep-going', action='store_true',
+                            help="Run every step even after saturation is reached.")
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            target = parse_target(options['base_url'])
+            rates = [float(r) for r in options['rates'].split(',') if r.strip()]
+            mix = self.parse_mix(options['mix'])
+            if not rates:
+                raise ValueError("--rates needs at least one rate.")
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        if options['prepare']:
+            self.prepare(options['users'], options['password'])
+
+        plan = Plan(
+            players=[f"{PLAYER_PREFIX}{i}" for i in range(options['users'])],
+            staff_username=STAFF_USERNAME,
+            password=options['password'],
+            run_id=int(time.time()),
+        )
+        rng = random.Random(options['seed'])
+        asyncio.run(self.run(rates, mix, target, plan, rng, options))
+
+    def parse_mix(self, spec):
+        mix = {}
+        for part in spec.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in JOURNEYS:
+                raise ValueError(f"Unknown journey '{name}' (choose from {', '.join(JOURNEYS)})")
+            mix[name] = float(weight or 1)
+        if not any(mix.values()):
+            raise ValueError("The journey mix has no weight.")
+        return {name: weight for name, weight in mix.items() if weight > 0}
+
+    def prepare(self, users, password):
+        hashed = make_password(password)
+        existing = set(User.objects.filter(username__startswith=PLAYER_PREFIX).values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=f"{PLAYER_PREFIX}{i}", password=hashed)
+            for i in range(users) if f"{PLAYER_PREFIX}{i}" not in existing
+        ], batch_size=1000)
+        User.objects.filter(username__startswith=PLAYER_PREFIX).update(password=hashed)
+        staff, _ = User.objects.update_or_create(
+            username=STAFF_USERNAME, defaults={'password': hashed, 'is_staff': True},
+        )
+        # staff pages are venue-scoped: the admin journeys need a venue to manage
+        venue, _ = Venue.objects.get_or_create(name=VENUE_NAME, defaults={'address': "Load test"})
+        venue.staff.add(staff)
+        if not venue.fields.exists():
+            Field.objects.bulk_create([
+                Field(venue=venue, name=f"Load Test Court {i}", location="Load test", price_per_hour=1500)
+                for i in range(1, 7)
+            ])
+        self.stdout.write(f"Prepared {users} players and '{STAFF_USERNAME}', managing '{VENUE_NAME}'.")
+
+    async def run(self, rates, mix, target, plan, rng, options):
+        self.stdout.write(
+            f"{'rate/s':>7} {'jrny/s':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'errors':>7} {'429s':>6} {'conflict':>8} {'dropped':>7}"
+        )
+        saturated_at = last_good = None
+        endpoints = {}
+        errors = {}
+        for rate in rates:
+            stats, elapsed = await run_step(
+                rate, options['step_seconds'], mix, target, plan, rng,
+                think_ms=options['think_ms'], timeout=options['timeout'],
+                max_in_flight=options['max_in_flight'],
+            )
+            row = summarize(rate, options['step_seconds'], stats, elapsed)
+            self.stdout.write(
+                f"{rate:>7g} {row['journeys_per_s']:>7.1f} {row['requests_per_s']:>8.1f} "
+                f"{row['p50']:>8.0f} {row['p95']:>8.0f} {row['p99']:>8.0f} "
+                f"{row['error_rate']:>7.1%} {row['throttled_rate']:>6.1%} "
+                f"{row['conflict_rate']:>8.1%} {row['dropped']:>7}"
+            )
+            endpoints, errors = stats.latencies, stats.errors
+            reason = saturation_reason(row, options['slo_ms'], options['max_error_rate'])
+            if reason is None:
+                last_good = row
+            elif saturated_at is None:
+                saturated_at = (rate, reason)
+                if not options['keep_going']:
+                    break
+
+        self.stdout.write("\nLast step by endpoint:")
+        self.stdout.write(f"{'endpoint':<18} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for name, samples in sorted(endpoints.items()):
+            samples = sorted(samples)
+            self.stdout.write(
+                f"{name:<18} {len(samples):>7} {percentile(samples, 50):>8.0f} "
+                f"{percentile(samples, 95):>8.0f} {samples[-1]:>8.0f}"
+            )
+        for detail, count in errors.most_common(10):
+            self.stdout.write(self.style.WARNING(f"  error: {detail} x{count}"))
+
+        self.stdout.write("")
+        if saturated_at:
+            rate, reason = saturated_at
+            capacity = f"; last healthy step {last_good['offered']:g} journeys/s" if last_good else ""
+            self.stdout.write(self.style.WARNING(f"Saturated at {rate:g} journeys/s ({reason}){capacity}."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No saturation up to {rates[-1]:g} journeys/s."))
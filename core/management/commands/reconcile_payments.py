@@ -0,0 +1,63 @@
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.reconcile import FINDINGS, KhaltiClient, Report, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Check unpaid and paid bookings, and released slot holds, against the Khalti gateway, "
+        "fix missed callbacks and refunds, "
+        "and write a CSV report of every discrepancy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat,
+                            help="First booking date, YYYY-MM-DD (default: 30 days ago).")
+        parser.add_argument('--to', dest='end', type=date.fromisoformat,
+                            help="Last booking date, YYYY-MM-DD (default: 90 days ahead).")
+        parser.add_argument('--report', help="Report file (default: reconcile-<today>.csv).")
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Bookings looked up, then written, per transaction.")
+        parser.add_argument('--concurrency', type=int, default=settings.RECONCILE_CONCURRENCY,
+                            help="Gateway requests in flight at once (default: RECONCILE_CONCURRENCY).")
+        parser.add_argument('--gateway', help="Gateway API base URL (default: KHALTI_API_URL).")
+        parser.add_argument('--dry-run', action='store_true', help="Report only; change no bookings.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = options['start'] or today - timedelta(days=30)
+        end = options['end'] or today + timedelta(days=90)
+        report_path = options['report'] or f"reconcile-{today.isoformat()}.csv"
+        started = time.perf_counter()
+
+        def progress(counts):
+            self.stdout.write(f"  {sum(counts.values()):,} bookings and holds checked", ending='\r')
+            self.stdout.flush()
+
+        client = KhaltiClient(base_url=options['gateway'], pool_size=options['concurrency'])
+        try:
+            with open(report_path, 'w', newline='', encoding='utf-8') as f:
+                counts = reconcile(
+                    start, end, client, Report(f), batch_size=options['batch_size'],
+                    concurrency=options['concurrency'], dry_run=options['dry_run'], progress=progress,
+                )
+        finally:
+            client.close()
+
+        elapsed = time.perf_counter() - started
+        checked = sum(counts.values())
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked:,} bookings and holds dated {start} .. {end} in {elapsed:.1f}s "
+            f"({checked / elapsed if elapsed else 0:,.0f}/s)."
+        ))
+        for finding, count in counts.items():
+            if count and finding != 'ok':
+                self.stdout.write(f"  {finding}: {count:,} ({FINDINGS[finding]})")
+        if checked - counts['ok']:
+            self.stdout.write(self.style.WARNING(f"Discrepancies written to {report_path}"))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db_router import refresh_replica
+
+
+class Command(BaseCommand):
+    help = "Refresh the read-only reporting replica from the primary database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and refresh every N seconds (default: refresh once).",
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            started = time.monotonic()
+            try:
+                refresh_replica()
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(
+                f"Replica refreshed in {time.monotonic() - started:.2f}s"
+            ))
+
+            if not interval:
+                break
+            time.sleep(interval)
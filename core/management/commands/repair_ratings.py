@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.ratings import recompute_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute every field's rating sum, count and histogram from its reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report fields whose aggregates are wrong.")
+
+    def handle(self, *args, **options):
+        drifted = recompute_ratings(dry_run=options['dry_run'])
+        for field in drifted:
+            self.stdout.write(f"  {field.name} (#{field.id}): {field.rating_count} reviews, sum {field.rating_sum}")
+
+        if options['dry_run']:
+            self.stdout.write(f"{len(drifted)} fields have stale rating aggregates.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired rating aggregates on {len(drifted)} fields."))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.emails import send_booking_email
+from core.models import Notification
+
+
+class Command(BaseCommand):
+    help = "Send queued user notifications (e.g. waitlist promotions) and mark them sent."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and check the queue every N seconds (default: drain once and exit).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = self.drain(options['batch_size'])
+            self.stdout.write(f"Sent {sent} notifications.")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def drain(self, batch_size):
+        sent = 0
+        while True:
+            batch = list(
+                Notification.objects.filter(sent_at__isnull=True)
+                .select_related('user', 'booking__user', 'booking__field')
+                .order_by('id')[:batch_size]
+            )
+            if not batch:
+                return sent
+            for notification in batch:
+                if notification.booking is not None:
+                    send_booking_email(notification.booking, notification.kind)
+            Notification.objects.filter(id__in=[n.id for n in batch]).update(sent_at=timezone.now())
+            sent += len(batch)
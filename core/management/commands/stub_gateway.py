@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.gateway_stub import StubGateway, transactions_from_db
+
+
+def _latency(value):
+    low, _, high = value.partition(':')
+    return float(low) / 1000, float(high or low) / 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a fake Khalti merchant API built from the bookings, with latency and failures, "
+        "for trying reconcile_payments (--gateway http://127.0.0.1:8765/)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=_latency, default=(0.01, 0.2), metavar='MIN[:MAX]',
+                            help="Random delay per response (default: 10:200).")
+        parser.add_argument('--failure-rate', type=float, default=0.05,
+                            help="Share of requests answered with a 503, a dropped connection or a hang.")
+        parser.add_argument('--hang-seconds', type=float, default=30.0)
+        parser.add_argument('--missed-rate', type=float, default=0.1,
+                            help="Share of unpaid bookings that were paid but never called back.")
+        parser.add_argument('--refund-rate', type=float, default=0.02,
+                            help="Share of paid bookings refunded at the gateway.")
+        parser.add_argument('--mismatch-rate', type=float, default=0.01,
+                            help="Share of payments with a different amount than the booking.")
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        transactions = transactions_from_db(
+            options['missed_rate'], options['refund_rate'], options['mismatch_rate'], seed=options['seed'],
+        )
+        gateway = StubGateway(
+            transactions, latency=options['latency_ms'], failure_rate=options['failure_rate'],
+            hang_seconds=options['hang_seconds'], seed=options['seed'],
+        )
+        try:
+            server = gateway.server(options['host'], options['port'])
+        except OSError as exc:
+            raise CommandError(exc)
+        self.stdout.write(
+            f"Stub gateway with {len(transactions):,} transactions on "
+            f"http://{options['host']}:{options['port']}/ (Ctrl+C to stop)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {gateway.requests:,} requests; injected failures: {gateway.failures}")
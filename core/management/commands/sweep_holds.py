@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.holds import sweep_expired
+
+
+class Command(BaseCommand):
+    help = "Release expired checkout slot holds and delete old released ones (core/holds.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and sweep every N seconds (default: sweep once and exit).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            swept = sweep_expired(batch_size=options['batch_size'])
+            if swept or not options['interval']:
+                self.stdout.write(f"Released {swept} expired holds.")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,321 @@
+"""
+Prometheus metrics aggregated across worker processes.
+
+Every process adds to its own memory-mapped file, settings.METRICS_DIR/<pid>.bin.
+The file holds a list of (series key, float) entries. Recording a sample is a
+dict lookup plus an in-place float update under a thread lock. There is no
+cross-process locking and no I/O beyond the shared page, because no other
+process ever writes that file. The /metrics view reads every file in the
+directory, sums identical series and renders the Prometheus text format.
+
+When a worker exits, its file is merged into merged.bin at the next scrape
+and then removed. Counters therefore never go backwards, and the directory
+holds one file per live worker plus one. Merging and reading happen under
+an exclusive lock on METRICS_DIR/.lock, so concurrent scrapes neither merge
+a file twice nor see it counted twice. Workers never take that lock.
+
+Metrics are declared once, below, and recorded with .inc() / .observe():
+
+    metrics.BOOKINGS.inc(event='created')
+    metrics.KHALTI_SECONDS.observe(0.42)
+"""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+HEADER = struct.Struct('<I4x')     # bytes used
+KEY_LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+INITIAL_SIZE = 64 * 1024
+SEP = '\x1f'  # between name, sample suffix, labels and le in a series key
+MERGED = 'merged.bin'  # totals of exited processes
+# request methods recorded as themselves; anything else is 'other', so
+# clients cannot grow the label set at will
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+class ProcessFile:
+    """This process's file of (key, value) entries, appended to and updated in place."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = max(os.fstat(self.fd).st_size, INITIAL_SIZE)
+        os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        self.used = HEADER.unpack_from(self.map, 0)[0] or HEADER.size
+        self.positions = {key: pos for key, pos, _ in read_entries(self.map, self.used)}
+
+    def add(self, key, amount):
+        with self.lock:
+            pos = self.positions.get(key)
+            if pos is None:
+                pos = self._append(key)
+            VALUE.pack_into(self.map, pos, VALUE.unpack_from(self.map, pos)[0] + amount)
+
+    def _append(self, key):
+        data = key.encode()
+        padding = -(KEY_LENGTH.size + len(data)) % 8  # keep values 8-byte aligned
+        needed = KEY_LENGTH.size + len(data) + padding + VALUE.size
+        if self.used + needed > len(self.map):
+            size = len(self.map)
+            while self.used + needed > size:
+                size *= 2
+            os.ftruncate(self.fd, size)
+            self.map.close()
+            self.map = mmap.mmap(self.fd, size)
+
+        start = self.used
+        KEY_LENGTH.pack_into(self.map, start, len(data))
+        self.map[start + KEY_LENGTH.size:start + KEY_LENGTH.size + len(data)] = data
+        pos = start + KEY_LENGTH.size + len(data) + padding
+        VALUE.pack_into(self.map, pos, 0.0)
+        # publish the entry only once it is complete, for concurrent readers
+        self.used += needed
+        HEADER.pack_into(self.map, 0, self.used)
+        self.positions[key] = pos
+        return pos
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+
+
+def read_entries(buffer, used=None):
+    """(key, value offset, value) for every complete entry in a process file's bytes."""
+    if used is None:
+        used = HEADER.unpack_from(buffer, 0)[0] if len(buffer) >= HEADER.size else 0
+    pos = HEADER.size
+    while pos < used:
+        length = KEY_LENGTH.unpack_from(buffer, pos)[0]
+        key = bytes(buffer[pos + KEY_LENGTH.size:pos + KEY_LENGTH.size + length]).decode()
+        value_pos = pos + KEY_LENGTH.size + length + (-(KEY_LENGTH.size + length) % 8)
+        yield key, value_pos, VALUE.unpack_from(buffer, value_pos)[0]
+        pos = value_pos + VALUE.size
+
+
+_file = None
+_file_pid = None
+
+
+def process_file():
+    """This process's file, reopened after a fork."""
+    global _file, _file_pid
+    if _file is None or _file_pid != os.getpid():
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        _file = ProcessFile(directory / f"{os.getpid()}.bin")
+        _file_pid = os.getpid()
+    return _file
+
+
+# ------------------------------------------------------------
+# metric types
+# ------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+REGISTRY = []
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._labels = {}  # label values tuple -> rendered label string
+        REGISTRY.append(self)
+
+    def _label_string(self, labels):
+        values = tuple(labels[name] for name in self.labelnames)
+        rendered = self._labels.get(values)
+        if rendered is None:
+            rendered = self._labels[values] = ','.join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)
+            )
+        return rendered
+
+    def _add(self, suffix, label_string, amount, le=''):
+        if settings.METRICS_ENABLED:
+            process_file().add(SEP.join((self.name, suffix, label_string, le)), amount)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self._add('total', self._label_string(labels), amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_labels = [repr(float(b)) for b in self.buckets] + ['+Inf']
+
+    def observe(self, value, **labels):
+        label_string = self._label_string(labels)
+        # buckets are stored per bucket and made cumulative when exported
+        self._add('bucket', label_string, 1, self.bucket_labels[bisect_left(self.buckets, value)])
+        self._add('sum', label_string, value)
+        self._add('count', label_string, 1)
+
+
+# ------------------------------------------------------------
+# metrics
+# ------------------------------------------------------------
+
+REQUEST_SECONDS = Histogram(
+    'futsal_request_duration_seconds', "Request latency by view.", ['view', 'method'],
+)
+RESPONSES = Counter('futsal_http_responses', "Responses by view and status class.", ['view', 'status'])
+DB_QUERIES = Counter('futsal_db_queries', "Database queries executed, by view.", ['view'])
+BOOKINGS = Counter('futsal_bookings', "Booking lifecycle events.", ['event'])
+BOOKING_CONFLICTS = Counter(
+    'futsal_booking_conflicts', "Booking attempts refused for overlapping an approved booking.", ['source'],
+)
+KHALTI_VERIFICATIONS = Counter('futsal_khalti_verifications', "Khalti payment verifications.", ['outcome'])
+KHALTI_SECONDS = Histogram(
+    'futsal_khalti_verify_duration_seconds', "Khalti verification call latency.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+PAYMENT_RECONCILIATIONS = Counter(
+    'futsal_payment_reconciliations', "Bookings and holds checked by reconcile_payments, by finding.", ['finding'],
+)
+SLOT_HOLDS = Counter('futsal_slot_holds', "Checkout slot holds by outcome.", ['outcome'])
+EMAILS = Counter('futsal_emails', "Booking emails by kind and outcome.", ['kind', 'outcome'])
+CACHE_LOOKUPS = Counter('futsal_cache_lookups', "Application cache lookups.", ['cache', 'result'])
+
+
+def cache_lookup(name, value):
+    """Count a hit (value is not None) or miss for the named cache; returns value."""
+    CACHE_LOOKUPS.inc(cache=name, result='miss' if value is None else 'hit')
+    return value
+
+
+# ------------------------------------------------------------
+# export
+# ------------------------------------------------------------
+
+def request_method(method):
+    """`method` as a label value: one of METHODS, or 'other'."""
+    return method if method in METHODS else 'other'
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, but belongs to another user
+        return True
+    return True
+
+
+def _read_totals(paths):
+    totals = defaultdict(float)
+    for path in paths:
+        try:
+            data = path.read_bytes()
+        except OSError:  # a file removed between listing and reading
+            continue
+        for key, _, value in read_entries(data):
+            totals[key] += value
+    return totals
+
+
+def merge_dead(directory):
+    """
+    Fold the files of exited processes into merged.bin and remove them.
+    The caller holds the directory lock. Returns the number of files merged.
+    """
+    dead = [
+        path for path in directory.glob('*.bin')
+        if path.stem.isdigit() and int(path.stem) != os.getpid() and not _alive(int(path.stem))
+    ]
+    if not dead:
+        return 0
+    totals = _read_totals([directory / MERGED, *dead])
+    partial = directory / f"{MERGED}.tmp"
+    partial.unlink(missing_ok=True)
+    merged = ProcessFile(partial)
+    for key, value in totals.items():
+        merged.add(key, value)
+    merged.map.flush()
+    merged.close()
+    os.replace(partial, directory / MERGED)
+    for path in dead:
+        path.unlink(missing_ok=True)
+    return len(dead)
+
+
+def collect():
+    """{series key: value} summed over every process file, after merging those of exited processes."""
+    directory = Path(settings.METRICS_DIR)
+    if not directory.is_dir():
+        return defaultdict(float)
+    lock = os.open(directory / '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merge_dead(directory)
+        return _read_totals(directory.glob('*.bin'))
+    finally:
+        os.close(lock)
+
+
+def _number(value):
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def _series(name, labels):
+    return f"{name}{{{labels}}}" if labels else name
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    samples = defaultdict(list)  # metric name -> [(suffix, labels, le, value)]
+    for key, value in collect().items():
+        name, suffix, labels, le = key.split(SEP)
+        samples[name].append((suffix, labels, le, value))
+
+    lines = []
+    for metric in REGISTRY:
+        rows = samples.get(metric.name, [])
+        if metric.kind == 'counter':
+            name = f"{metric.name}_total"
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} counter")
+            for _, labels, _, value in sorted(rows):
+                lines.append(f"{_series(name, labels)} {_number(value)}")
+            continue
+
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        buckets = defaultdict(dict)
+        for suffix, labels, le, value in rows:
+            if suffix == 'bucket':
+                buckets[labels][le] = value
+        for labels in sorted({labels for _, labels, _, _ in rows}):
+            prefix = f"{labels}," if labels else ''
+            running = 0.0
+            for le in metric.bucket_labels:
+                running += buckets[labels].get(le, 0.0)
+                lines.append(f'{metric.name}_bucket{{{prefix}le="{le}"}} {_number(running)}')
+            for suffix in ('sum', 'count'):
+                value = next((v for s, l, _, v in rows if s == suffix and l == labels), 0.0)
+                lines.append(f"{_series(f'{metric.name}_{suffix}', labels)} {_number(value)}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,223 @@
+import json
+import mimetypes
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack
+from email.utils import formatdate
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# unhashed names can change on the next deploy, so keep them short-lived
+REVALIDATE_CACHE_CONTROL = 'public, max-age=60'
+
+# preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+class StaticAsset:
+    __slots__ = ('path', 'content_type', 'last_modified', 'cache_control', 'variants')
+
+    def __init__(self, path, immutable):
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.last_modified = formatdate(os.path.getmtime(path), usegmt=True)
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        self.variants = [
+            (encoding, path + suffix)
+            for encoding, suffix in ENCODINGS
+            if os.path.exists(path + suffix)
+        ]
+
+
+@lru_cache(maxsize=256)
+def accepted_encodings(header):
+    """
+    {coding: q} from an Accept-Encoding header value. A coding with q=0 is
+    refused; '*' stands for every coding not listed.
+    """
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def pick_variant(variants, header):
+    """The (encoding, path) of `variants` the client weights highest (ties: our order), or None."""
+    weights = accepted_encodings(header)
+    best, best_q = None, 0.0
+    for encoding, path in variants:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = (encoding, path), q
+    return best
+
+
+def build_static_index(static_root, static_url):
+    """Map every collected URL path to its StaticAsset, scanning STATIC_ROOT once."""
+    index = {}
+    if not static_root or not os.path.isdir(static_root):
+        return index
+
+    hashed_names = set()
+    manifest = os.path.join(static_root, 'staticfiles.json')
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            hashed_names = set(json.load(f).get('paths', {}).values())
+
+    compressed_suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    for root, _, files in os.walk(static_root):
+        for filename in files:
+            if filename.endswith(compressed_suffixes) or filename == 'staticfiles.json':
+                continue
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, static_root).replace(os.sep, '/')
+            index[static_url + name] = StaticAsset(path, immutable=name in hashed_names)
+    return index
+
+
+class StaticFilesMiddleware:
+    """
+    Serve collected static files straight from the app server.
+
+    Hashed names are sent with a one-year immutable Cache-Control, and the
+    precompressed variant the client weights highest in Accept-Encoding
+    (brotli before gzip on a tie; q=0 refuses a coding) is sent with the
+    matching Content-Encoding. STATIC_ROOT is indexed once per
+    process, so requests never touch the filesystem to find a file. Anything
+    not in the index falls through to the rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.static_url = '/' + settings.STATIC_URL.lstrip('/')
+        self.index = build_static_index(settings.STATIC_ROOT, self.static_url)
+
+    def __call__(self, request):
+        if self.index and request.path_info.startswith(self.static_url):
+            asset = self.index.get(request.path_info)
+            if asset is not None and request.method in ('GET', 'HEAD'):
+                return self.serve(request, asset)
+        return self.get_response(request)
+
+    def serve(self, request, asset):
+        if request.headers.get('If-Modified-Since') == asset.last_modified:
+            response = HttpResponseNotModified()
+        else:
+            path, encoding = asset.path, None
+            variant = pick_variant(asset.variants, request.headers.get('Accept-Encoding', ''))
+            if variant is not None:
+                encoding, path = variant
+
+            response = FileResponse(open(path, 'rb'), content_type=asset.content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+
+        response['Cache-Control'] = asset.cache_control
+        response['Last-Modified'] = asset.last_modified
+        if asset.variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Sample the stacks of selected requests with core.profiling.
+
+    A request is profiled when its URL name is in settings.PROFILING_VIEWS,
+    by chance at settings.PROFILING_SAMPLE_RATE, or when a staff user sends
+    "X-Profile: 1". With settings.PROFILING_ENABLED off the middleware
+    removes itself from the stack at startup, so it costs nothing.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        from . import profiling
+
+        self.profiling = profiling
+        self.get_response = get_response
+        self.views = set(settings.PROFILING_VIEWS)
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            view_name = getattr(request, '_profiled_view', None)
+            if view_name is not None:
+                samples = self.profiling.sampler().stop(threading.get_ident())
+                self.profiling.save_samples(view_name, samples)
+        if view_name is not None:
+            response['X-Profiled-Samples'] = str(sum(samples.values()))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        view_name = match.view_name if match else f"{view_func.__module__}.{view_func.__name__}"
+        if (
+            view_name in self.views
+            or (self.sample_rate and random.random() < self.sample_rate)
+            or (request.headers.get('X-Profile') == '1' and request.user.is_staff)
+        ):
+            request._profiled_view = view_name
+            # leave the server and outer middleware frames out of the stacks
+            self.profiling.sampler().start(threading.get_ident(), stop_code=ProfilingMiddleware.__call__.__code__)
+        return None
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status and database query count of every request in
+    core.metrics, labelled by URL name. Put it first in MIDDLEWARE so the
+    latency covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        from . import metrics
+
+        self.metrics = metrics
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in settings.DATABASES:
+                stack.enter_context(connections[alias].execute_wrapper(count_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = (match.view_name or 'unnamed') if match else 'unmatched'
+        self.metrics.REQUEST_SECONDS.observe(elapsed, view=view, method=self.metrics.request_method(request.method))
+        self.metrics.RESPONSES.inc(view=view, status=f"{response.status_code // 100}xx")
+        if queries[0]:
+            self.metrics.DB_QUERIES.inc(queries[0], view=view)
+        return response
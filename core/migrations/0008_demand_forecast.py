@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('expected_hours', models.FloatField()),
+                ('generated_at', models.DateTimeField()),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='core.field')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('field', 'date', 'hour'), name='demand_forecast_unique')],
+            },
+        ),
+    ]
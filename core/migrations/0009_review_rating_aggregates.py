@@ -0,0 +1,85 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Q, Sum
+
+
+def drop_duplicate_reviews(apps, schema_editor):
+    # keep each user's first review of a field so the unique constraint can be added
+    Review = apps.get_model('core', 'Review')
+    dupes = (
+        Review.objects.values('field_id', 'user_id')
+        .annotate(n=Count('id'), first=Min('id'))
+        .filter(n__gt=1)
+    )
+    for row in dupes:
+        Review.objects.filter(field_id=row['field_id'], user_id=row['user_id']).exclude(id=row['first']).delete()
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Field = apps.get_model('core', 'Field')
+    Review = apps.get_model('core', 'Review')
+    rows = Review.objects.values('field_id').annotate(
+        rating_sum=Sum('rating'),
+        rating_count=Count('id'),
+        **{f'rating_{stars}_count': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)},
+    ).order_by()
+    for row in rows:
+        Field.objects.filter(pk=row.pop('field_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_demand_forecast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='field',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(drop_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['field', '-id'], name='review_field_feed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('field', 'user'), name='review_one_per_user_per_field'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
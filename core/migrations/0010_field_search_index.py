@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:40
+
+from django.db import migrations
+
+# the schema as of this migration, written out rather than imported from
+# core.search so later edits there cannot change what this migration does
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_field_fts USING fts5("
+    "name, location, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_field_trigram USING fts5("
+    "name, location, tokenize='trigram')",
+]
+DROP_SQL = [
+    "DROP TABLE IF EXISTS core_field_fts",
+    "DROP TABLE IF EXISTS core_field_trigram",
+]
+INSERT_SQL = [
+    "INSERT INTO core_field_fts (rowid, name, location) VALUES (%s, %s, %s)",
+    "INSERT INTO core_field_trigram (rowid, name, location) VALUES (%s, %s, %s)",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # SQLite FTS5 tables; other databases search with icontains instead
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    Field = apps.get_model('core', 'Field')
+    rows = list(Field.objects.using(connection.alias).values_list('id', 'name', 'location'))
+    with connection.cursor() as cursor:
+        for sql in DROP_SQL + CREATE_SQL:
+            cursor.execute(sql)
+        for sql in INSERT_SQL:
+            cursor.executemany(sql, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_review_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
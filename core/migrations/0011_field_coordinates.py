@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_field_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='field',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def create_main_venue(apps, schema_editor):
+    # existing deployments are one venue: put every field, booking and staff member in it
+    Venue = apps.get_model('core', 'Venue')
+    Field = apps.get_model('core', 'Field')
+    Booking = apps.get_model('core', 'Booking')
+    ArchivedBooking = apps.get_model('core', 'ArchivedBooking')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    if not Field.objects.exists():
+        return
+    venue = Venue.objects.create(name='Main venue')
+    Field.objects.filter(venue__isnull=True).update(venue=venue)
+    field_venue = Subquery(Field.objects.filter(pk=OuterRef('field_id')).values('venue_id')[:1])
+    Booking.objects.update(venue_id=field_venue)
+    ArchivedBooking.objects.update(venue_id=field_venue)
+    venue.staff.set(User.objects.filter(is_staff=True, is_superuser=False))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_feed_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Venue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('address', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('staff', models.ManyToManyField(blank=True, related_name='managed_venues', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='venue',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.venue'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='venue',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.venue'),
+        ),
+        migrations.AddField(
+            model_name='field',
+            name='venue',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='fields', to='core.venue'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['venue', 'status', 'date'], name='archived_venue_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['venue', 'date', 'start_time'], name='booking_venue_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['venue', 'status', 'date'], name='booking_venue_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(fields=['venue', 'name'], name='field_venue_name_idx'),
+        ),
+        migrations.RunPython(create_main_venue, migrations.RunPython.noop),
+    ]
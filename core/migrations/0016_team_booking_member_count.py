@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:51
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def count_members(apps, schema_editor):
+    TeamBooking = apps.get_model('core', 'TeamBooking')
+    TeamMember = apps.get_model('core', 'TeamMember')
+    counts = (
+        TeamMember.objects.filter(team_id=OuterRef('pk')).order_by()
+        .values('team_id').annotate(n=Count('id')).values('n')
+    )
+    TeamBooking.objects.update(member_count=Coalesce(Subquery(counts), 0))
+    # teams filled past max_players through the admin keep everyone who joined
+    TeamBooking.objects.filter(member_count__gt=F('max_players')).update(
+        max_players=Greatest(F('member_count'), 2),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_slot_holds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teambooking',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='teambooking',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['booking'], name='team_booking_public_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='teambooking',
+            constraint=models.CheckConstraint(condition=models.Q(('member_count__lte', models.F('max_players'))), name='team_booking_not_overfull'),
+        ),
+    ]
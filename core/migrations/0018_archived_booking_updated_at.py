@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # the last change before archiving is unknown; it was no later than archived_at
+    ArchivedBooking = apps.get_model('core', 'ArchivedBooking')
+    ArchivedBooking.objects.update(updated_at=F('archived_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_tournaments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='notification',
+            name='booking',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='core.booking'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_archived_booking_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='slothold',
+            name='hold_expiry_idx',
+        ),
+        migrations.AddField(
+            model_name='slothold',
+            name='released_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='slothold',
+            index=models.Index(condition=models.Q(('released_at__isnull', True)), fields=['expires_at'], name='hold_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='slothold',
+            index=models.Index(fields=['released_at'], name='hold_released_idx'),
+        ),
+    ]
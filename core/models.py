@@ -2,73 +2,124 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from datetime import datetime, timedelta
+from decimal import Decimal
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+
+class Venue(models.Model):
+    """
+    One site of the company, holding several fields. Staff see and manage
+    only the venues they are listed on; superusers see every venue
+    (core/venues.py). Booking carries its field's venue so venue-scoped
+    queries lead with it.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    address = models.CharField(max_length=200, blank=True)
+    staff = models.ManyToManyField(User, related_name='managed_venues', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
 
-
-class TeamBooking(models.Model):
-    booking = models.OneToOneField(
-        Booking,
-        on_delete=models.CASCADE,
-        related_name='team'
-    )
-    max_players = models.PositiveIntegerField(default=10, validators=[MinValueValidator(2)])
-    is_public = models.BooleanField(default=True)
+    class Meta:
+        ordering = ['name']
 
     def __str__(self):
-        return f"Team for {self.booking.field.name} on {self.booking.date}"
-   @property
-    def current_players(self):
-        return self.members.count()
-    @property
-    def is_full(self):
-        return self.current_players >= self.max_players
+        return self.name
 
-class Team(models.Model):
+
+# Field's review aggregates (core/ratings.py)
+RATING_FIELDS = ['rating_sum', 'rating_count'] + [f'rating_{stars}_count' for stars in range(1, 6)]
+
+
+class Field(models.Model):
+    venue = models.ForeignKey(Venue, null=True, blank=True, on_delete=models.PROTECT, related_name='fields')
     name = models.CharField(max_length=100)
-    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_teams')
-    members = models.ManyToManyField(User, related_name='teams', blank=True)
-    is_public = models.BooleanField(default=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    location = models.CharField(max_length=150)
+    price_per_hour = models.DecimalField(max_digits=7, decimal_places=2)
+    is_available = models.BooleanField(default=True)
+    photo = models.ImageField(
+        upload_to='field_photos/',
+        blank=True,
+        null=True
+    )
+
+    # WGS84 coordinates; geo_cell is the grid bucket core/geo.py searches by,
+    # derived from them on save()
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True)
+
+    # Review aggregates, kept up to date by core/ratings.py in the same
+    # transaction as the review change; `manage.py repair_ratings` recomputes them.
+    # save() leaves them out of the UPDATE, so an edit made from a stale copy
+    # of the field cannot undo the reviews added meanwhile.
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # venue field lists and per-venue reports
+            models.Index(fields=['venue', 'name'], name='field_venue_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
-    
-    def points(self):
-    matches = Match.objects.filter(status="completed").filter(
-        models.Q(team_a=self) | models.Q(team_b=self)
-    )
-
-    pts = 0
-    for m in matches:
-        if m.winner() == self:
-            pts += 3
-        elif m.score_a == m.score_b:
-            pts += 1
 
-    return pts
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so moving a field to another venue also moves its bookings
+        instance._venue_id = instance.__dict__.get('venue_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .geo import grid_cell
+        self.geo_cell = grid_cell(self.latitude, self.longitude)
+        if kwargs.get('update_fields') is not None and {'latitude', 'longitude'} & set(kwargs['update_fields']):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'geo_cell'}
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skip = {*RATING_FIELDS, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.attname not in skip
+            ]
+        moved = self.pk is not None and getattr(self, '_venue_id', self.venue_id) != self.venue_id
+        super().save(*args, **kwargs)
+        if moved:
+            Booking.objects.filter(field=self).update(venue_id=self.venue_id)
+            ArchivedBooking.objects.filter(field=self).update(venue_id=self.venue_id)
+        self._venue_id = self.venue_id
 
-    
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
 
+    @property
+    def rating_histogram(self):
+        """[(stars, count, percent)] from 5 stars down to 1."""
+        rows = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f'rating_{stars}_count')
+            rows.append((stars, count, round(100 * count / self.rating_count) if self.rating_count else 0))
+        return rows
 
-class TeamMember(models.Model):
-    team = models.ForeignKey(
-        TeamBooking,
+class FieldImage(models.Model):
+    field = models.ForeignKey(
+        Field,
         on_delete=models.CASCADE,
-        related_name='members'
+        related_name='images'
     )
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    is_captain = models.BooleanField(default=False)
-    joined_at = models.DateTimeField(auto_now_add=True)
-
-    class Meta:
-        unique_together = ('team', 'user')
+    image = models.ImageField(upload_to='field_gallery/')
 
     def __str__(self):
-        return f"{self.user.username} in {self.team}"
+        return f"{self.field.name} Image"
+
 
-        
-    def __str__(self):
-        return f"{self.user.username} in {self.team.name}"
 class Review(models.Model):
     field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -78,45 +129,74 @@ class Review(models.Model):
     comment = models.TextField(max_length=500)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['field', 'user'], name='review_one_per_user_per_field'),
+        ]
+        indexes = [
+            # newest-first review feed on field_detail
+            models.Index(fields=['field', '-id'], name='review_field_feed_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so an edit can move the field's rating aggregates
+        instance._rated = (instance.__dict__.get('field_id'), instance.__dict__.get('rating'))
+        return instance
+
     def __str__(self):
         return f"{self.field.name} - {self.user.username} ({self.rating})"
-class Field(models.Model):
+
+
+class Team(models.Model):
     name = models.CharField(max_length=100)
-    location = models.CharField(max_length=150)
-    price_per_hour = models.DecimalField(max_digits=7, decimal_places=2)
-    is_available = models.BooleanField(default=True)
-    photo = models.ImageField(
-        upload_to='field_photos/',
-        blank=True,
-        null=True
-    ) 
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_teams')
+    members = models.ManyToManyField(User, related_name='teams', blank=True)
+    is_public = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.name
-    
-class FieldImage(models.Model):
-    field = models.ForeignKey(
-        Field,
-        on_delete=models.CASCADE,
-        related_name='images'
-    )
-    image = models.ImageField(upload_to='field_gallery/')
 
-    def __str__(self):
-        return f"{self.field.name} Image"
+    def points(self):
+        matches = Match.objects.filter(status="completed").filter(
+            models.Q(team_a=self) | models.Q(team_b=self)
+        )
+
+        pts = 0
+        for m in matches:
+            if m.winner() == self:
+                pts += 3
+            elif m.score_a == m.score_b:
+                pts += 1
+
+        return pts
+
+
+def booking_amount(price_per_hour, date, start_time, end_time):
+    # same rule as book_field
+    start_dt = datetime.combine(date, start_time)
+    end_dt = datetime.combine(date, end_time)
+    duration_hours = Decimal((end_dt - start_dt).seconds) / Decimal(3600)
+    return (duration_hours * Decimal(price_per_hour)).quantize(Decimal("0.01"))
 
 
 class Booking(models.Model):
     STATUS_CHOICES = [('pending','Pending'), ('approved','Approved'), ('rejected','Rejected')]
     PAYMENT_CHOICES = [('unpaid','Unpaid'), ('paid','Paid'), ('refunded','Refunded')]
-    team = models.ForeignKey(Team, on_delete=models.SET_NULL, null=True, blank=True)
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     field = models.ForeignKey(Field, on_delete=models.CASCADE)
+    # copy of field.venue, set on save(); bulk_create callers must set it themselves
+    venue = models.ForeignKey(Venue, null=True, blank=True, on_delete=models.PROTECT, related_name='+')
     date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # bumped on every save; queryset.update() callers must set it themselves.
+    # Keys the per-row template fragment caches.
+    updated_at = models.DateTimeField(auto_now=True)
 
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     amount = models.DecimalField(max_digits=9, decimal_places=2, default=0)
@@ -126,10 +206,25 @@ class Booking(models.Model):
 
     team = models.ForeignKey('Team', null=True, blank=True, on_delete=models.SET_NULL, related_name='bookings')  # 🆕
 
+    class Meta:
+        indexes = [
+            # conflict checks and calendar feeds look up one field's day
+            models.Index(fields=['field', 'date'], name='booking_field_date_idx'),
+            # one venue's admin dashboard, reports and heatmap
+            models.Index(fields=['venue', 'date', 'start_time'], name='booking_venue_date_idx'),
+            models.Index(fields=['venue', 'status', 'date'], name='booking_venue_status_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.field_id is not None:
+            self.venue_id = self.field.venue_id
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'venue'}
+        super().save(*args, **kwargs)
 
     def clean(self):
 
-        
+
         # time sanity
         if self.end_time <= self.start_time:
             raise ValidationError("End time must be after start time.")
@@ -141,10 +236,295 @@ class Booking(models.Model):
         ).exclude(pk=self.pk)
         if overlap.exists():
             raise ValidationError("This field is already booked for that time slot.")
+        # someone else is paying for it right now (core/holds.py)
+        held = SlotHold.objects.filter(
+            field=self.field, date=self.date,
+            start_time__lt=self.end_time, end_time__gt=self.start_time,
+            expires_at__gt=timezone.now(),
+        ).exclude(user_id=self.user_id)
+        if held.exists():
+            raise ValidationError("This time slot is being held for another player's payment.")
 
     def __str__(self):
         return f"{self.user.username} - {self.field.name} ({self.date})"
 
+
+class BookingEvent(models.Model):
+    """
+    Append-only log of booking lifecycle transitions, written in the same
+    transaction as the change (core/events.py). The id is the sequence
+    number consumers checkpoint against. Rows are never updated or deleted.
+    """
+    KIND_CHOICES = [('created', 'Created'), ('status', 'Status changed'), ('payment', 'Payment changed')]
+
+    id = models.BigAutoField(primary_key=True)
+    # no foreign key: the log outlives archived bookings
+    booking_id = models.BigIntegerField(db_index=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    old_value = models.CharField(max_length=10, blank=True)
+    new_value = models.CharField(max_length=10, blank=True)
+    # booking snapshot consumers usually need: field_id, user_id, date, amount
+    data = models.JSONField(default=dict)
+    actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.id} booking {self.booking_id} {self.kind} {self.old_value}->{self.new_value}"
+
+
+class EventCheckpoint(models.Model):
+    """Last BookingEvent id a named consumer has fully processed."""
+    consumer = models.CharField(max_length=64, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.position}"
+
+
+class FeedVersion(models.Model):
+    """
+    When the contents of one iCalendar feed last changed (core/ics.py).
+    Bumped in the transaction that changes a booking or match, so every
+    worker sees it, and used as the feed's ETag / Last-Modified and cache key.
+    """
+    KIND_CHOICES = [('user', 'User bookings'), ('team', 'Team fixtures'), ('field', 'Field schedule')]
+
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='feed_version_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} @ {self.changed_at}"
+
+
+class WaitlistEntry(models.Model):
+    """
+    A request for a slot that was already taken when it was made.
+
+    Entries for one (field, date) form a priority queue: higher priority
+    first, then first come first served. waitlist_queue_idx stores them in
+    exactly that order, so finding the head of the queue is a single index
+    seek rather than a scan. See core/waitlist.py.
+    """
+    STATUS_CHOICES = [('waiting', 'Waiting'), ('promoted', 'Promoted'), ('cancelled', 'Cancelled')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='waitlist_entries')
+    team = models.ForeignKey('Team', null=True, blank=True, on_delete=models.SET_NULL, related_name='waitlist_entries')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    # set by staff (e.g. members, league teams); higher goes first
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='waiting')
+    requested_at = models.DateTimeField(auto_now_add=True)
+    # the booking created when the entry was promoted
+    booking = models.OneToOneField(Booking, null=True, blank=True, on_delete=models.SET_NULL, related_name='waitlist_entry')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['field', 'date', 'status', '-priority', 'requested_at'], name='waitlist_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} waiting for {self.field.name} ({self.date} {self.start_time}-{self.end_time})"
+
+
+class SlotHold(models.Model):
+    """
+    A slot reserved for one user while they pay for it with Khalti.
+
+    Created when checkout starts, turned into a paid, approved booking by
+    khalti_callback, and released once it has expired (`manage.py
+    sweep_holds`, walking hold_expiry_idx oldest first). Until it expires it
+    blocks other bookings and holds on the slot. Released holds are kept a
+    while for reconcile_payments. See core/holds.py.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='slot_holds')
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='slot_holds')
+    team = models.ForeignKey('Team', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    amount = models.DecimalField(max_digits=9, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    # set when the hold stops counting without becoming a booking
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # conflict checks look up one field's day, like booking_field_date_idx
+            models.Index(fields=['field', 'date', 'expires_at'], name='hold_field_date_idx'),
+            # the sweeper reads unreleased expired holds oldest first
+            models.Index(fields=['expires_at'], name='hold_expiry_idx', condition=models.Q(released_at__isnull=True)),
+            # and deletes released ones past their retention
+            models.Index(fields=['released_at'], name='hold_released_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} holds {self.field.name} ({self.date} {self.start_time}-{self.end_time})"
+
+
+class Notification(models.Model):
+    """
+    Outbox for user emails that should not be sent inside the request that
+    triggered them. Drained by `manage.py send_notifications`.
+    """
+    KIND_CHOICES = [('waitlist_promoted', 'Waitlist promoted')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    # SET_NULL: archiving a booking must not delete its notification history
+    booking = models.ForeignKey(Booking, null=True, blank=True, on_delete=models.SET_NULL, related_name='notifications')
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sent_at', 'id'], name='notification_outbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.user.username}"
+
+
+class DemandForecast(models.Model):
+    """
+    Expected booked hours for one field and hour of a coming day, written by
+    `manage.py refresh_forecasts` (core/forecasting.py).
+    """
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='demand_forecasts')
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    expected_hours = models.FloatField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['field', 'date', 'hour'], name='demand_forecast_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.field.name} {self.date} {self.hour}:00 ~{self.expected_hours:.2f}h"
+
+
+class ArchivedBooking(models.Model):
+    """
+    Cold storage for bookings older than settings.BOOKING_ARCHIVE_HORIZON_DAYS.
+
+    Same columns (and primary key) as Booking, so reports, exports and receipts
+    can read both the same way, while conflict checks, calendars and
+    my_bookings only ever touch the small live Booking table.
+    See core/archive.py and `manage.py archive_bookings`.
+    """
+    id = models.BigIntegerField(primary_key=True)
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bookings')
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='archived_bookings')
+    venue = models.ForeignKey(Venue, null=True, blank=True, on_delete=models.PROTECT, related_name='+')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    amount = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    payment_status = models.CharField(max_length=10, choices=Booking.PAYMENT_CHOICES)
+    payment_date = models.DateTimeField(null=True, blank=True)
+    payment_ref = models.CharField(max_length=64, blank=True)
+
+    team = models.ForeignKey('Team', null=True, blank=True, on_delete=models.SET_NULL, related_name='archived_bookings')
+
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    ARCHIVED_FIELDS = [
+        'id', 'user_id', 'field_id', 'venue_id', 'date', 'start_time', 'end_time', 'created_at', 'updated_at',
+        'status', 'amount', 'payment_status', 'payment_date', 'payment_ref', 'team_id',
+    ]
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='archived_booking_date_idx'),
+            models.Index(fields=['venue', 'status', 'date'], name='archived_venue_status_date_idx'),
+        ]
+
+    @classmethod
+    def from_booking(cls, booking):
+        return cls(**{name: getattr(booking, name) for name in cls.ARCHIVED_FIELDS})
+
+    def __str__(self):
+        return f"{self.user.username} - {self.field.name} ({self.date}, archived)"
+
+
+class TeamBooking(models.Model):
+    booking = models.OneToOneField(
+        Booking,
+        on_delete=models.CASCADE,
+        related_name='team_booking'
+    )
+    max_players = models.PositiveIntegerField(default=10, validators=[MinValueValidator(2)])
+    is_public = models.BooleanField(default=True)
+    # number of TeamMember rows, kept up to date by core/pickup.py and signals
+    member_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # the pickup-game finder walks public games, then their bookings by id
+            models.Index(fields=['booking'], condition=models.Q(is_public=True), name='team_booking_public_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(member_count__lte=models.F('max_players')),
+                name='team_booking_not_overfull',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Team for {self.booking.field.name} on {self.booking.date}"
+
+    def clean(self):
+        if self.max_players is not None and self.max_players < self.member_count:
+            raise ValidationError(f"{self.member_count} players have already joined.")
+
+    @property
+    def current_players(self):
+        return self.member_count
+
+    @property
+    def is_full(self):
+        return self.current_players >= self.max_players
+
+
+class TeamMember(models.Model):
+    team = models.ForeignKey(
+        TeamBooking,
+        on_delete=models.CASCADE,
+        related_name='members'
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    is_captain = models.BooleanField(default=False)
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('team', 'user')
+
+    def __str__(self):
+        return f"{self.user.username} in {self.team}"
+
+    def clean(self):
+        if self._state.adding and self.team_id and self.team.member_count >= self.team.max_players:
+            raise ValidationError("This game is already full.")
+
+
 class TimeSlot(models.Model):
     field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='slots')
     start_time = models.TimeField()
@@ -153,12 +533,36 @@ class TimeSlot(models.Model):
     def __str__(self):
         return f"{self.field.name}: {self.start_time} - {self.end_time}"
 
+class Tournament(models.Model):
+    """A league or a group stage plus knockout, with fixtures generated by core/tournaments.py."""
+    FORMAT_CHOICES = [
+        ('league', 'Round robin'),
+        ('groups', 'Groups + knockout'),
+    ]
+
+    name = models.CharField(max_length=100)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='league')
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Match(models.Model):
     team_a = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='matches_as_team_a')
     team_b = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='matches_as_team_b')
 
     field = models.ForeignKey(Field, on_delete=models.CASCADE)
 
+    # generated fixtures: their tournament, round number and group ('' for a
+    # league or a knockout round)
+    tournament = models.ForeignKey(
+        Tournament, null=True, blank=True, on_delete=models.CASCADE, related_name='matches',
+    )
+    round = models.PositiveSmallIntegerField(null=True, blank=True)
+    group = models.CharField(max_length=2, blank=True)
+
     date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
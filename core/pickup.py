@@ -0,0 +1,82 @@
+"""
+Open pickup games: public TeamBookings that solo players can join.
+
+TeamBooking.member_count is kept equal to the number of TeamMember rows by
+the TeamMember signals, so listing games and their free spots needs no
+per-game COUNT. The check constraint team_booking_not_overfull
+(member_count <= max_players) makes the database refuse the increment that
+would overfill a game. When concurrent joins race for the last spot, the
+first to commit wins and the others roll back. The losers never see a
+count above max_players.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import TeamBooking, TeamMember
+
+
+class JoinRefused(Exception):
+    pass
+
+
+def open_games(now=None):
+    """Public games of approved bookings that have not started and still have spots left."""
+    now = timezone.localtime(now)
+    return TeamBooking.objects.filter(
+        Q(booking__date__gt=now.date()) | Q(booking__date=now.date(), booking__start_time__gt=now.time()),
+        is_public=True, booking__status='approved', member_count__lt=F('max_players'),
+    )
+
+
+def find_games(date=None, field_id=None, venue=None, min_spots=1, now=None):
+    """
+    Open games, soonest first, annotated with the columns the finder and
+    the API show: field, venue, date, start_time, end_time and spots_left.
+    """
+    games = open_games(now)
+    if date is not None:
+        games = games.filter(booking__date=date)
+    if field_id is not None:
+        games = games.filter(booking__field_id=field_id)
+    if venue is not None:
+        games = games.filter(booking__venue=venue)
+    games = games.annotate(
+        field=F('booking__field_id'), venue=F('booking__venue_id'), date=F('booking__date'),
+        start_time=F('booking__start_time'), end_time=F('booking__end_time'),
+        spots_left=F('max_players') - F('member_count'),
+    )
+    if min_spots > 1:
+        games = games.filter(spots_left__gte=min_spots)
+    return games.order_by('date', 'start_time', 'id')
+
+
+def join_game(game_id, user):
+    """Add `user` to an open game. Raises JoinRefused if that is not possible."""
+    game = open_games().filter(pk=game_id).first()
+    if game is None:
+        raise JoinRefused("This game is full, private, or has already started.")
+    if game.members.filter(user=user).exists():
+        raise JoinRefused("You are already in this game.")
+    try:
+        with transaction.atomic():
+            return TeamMember.objects.create(team=game, user=user)
+    except IntegrityError:
+        # someone took the last spot first, or this user's other request got in first
+        if game.members.filter(user=user).exists():
+            raise JoinRefused("You are already in this game.")
+        raise JoinRefused("This game just filled up.")
+
+
+def leave_game(game_id, user):
+    """Take `user` out of a game; the captain stays. Returns whether they were in it."""
+    deleted, _ = TeamMember.objects.filter(team_id=game_id, user=user, is_captain=False).delete()
+    return bool(deleted)
+
+
+def member_added(member):
+    TeamBooking.objects.filter(pk=member.team_id).update(member_count=F('member_count') + 1)
+
+
+def member_removed(member):
+    TeamBooking.objects.filter(pk=member.team_id, member_count__gt=0).update(member_count=F('member_count') - 1)
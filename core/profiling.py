@@ -0,0 +1,239 @@
+"""
+Opt-in sampling profiler for individual requests (core.middleware.ProfilingMiddleware).
+
+While a profiled request runs, one background thread per process reads that
+request thread's Python stack through sys._current_frames() every
+settings.PROFILING_INTERVAL_MS. Each sample is recorded as a collapsed stack
+("module:function;module:function ..."). The request thread itself runs
+untouched, with no trace hooks, so overhead is one stack walk per interval
+per profiled request. When no request is being profiled the sampler thread
+sleeps on an Event.
+
+At the end of the request its samples are appended to
+PROFILING_DIR/<view>.<pid>.folded as "stack count" lines. Reports merge all
+processes' files. The staff pages at /profiling/ serve them as collapsed
+stacks (for flamegraph.pl, speedscope, etc.) or as a ready-made SVG
+flamegraph.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from html import escape
+from pathlib import Path
+from zlib import crc32
+
+from django.conf import settings
+
+SUFFIX = '.folded'
+
+_labels = {}  # code object -> "module:function"
+
+
+def _frame_label(code, module):
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{module}:{code.co_name}"
+    return label
+
+
+def collapse(frame, stop_code=None):
+    """Root-first 'a;b;c' of the frames below stop_code (exclusive), or of the whole stack."""
+    labels = []
+    while frame is not None and frame.f_code is not stop_code:
+        labels.append(_frame_label(frame.f_code, frame.f_globals.get('__name__', '?')))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+class Sampler:
+    """Samples the stacks of registered threads from a single daemon thread."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.active = {}  # thread id -> (Counter, stop code)
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def start(self, thread_id, stop_code=None):
+        with self.lock:
+            self.active[thread_id] = (Counter(), stop_code)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def stop(self, thread_id):
+        with self.lock:
+            samples, _ = self.active.pop(thread_id, (Counter(), None))
+        return samples
+
+    def _run(self):
+        while True:
+            self.wake.clear()
+            if not self.active:
+                self.wake.wait()
+                continue
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, (samples, stop_code) in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse(frame, stop_code)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+_sampler = None
+
+
+def sampler():
+    global _sampler
+    if _sampler is None:
+        _sampler = Sampler(settings.PROFILING_INTERVAL_MS / 1000)
+    return _sampler
+
+
+# ------------------------------------------------------------
+# storage
+# ------------------------------------------------------------
+
+def _profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def safe_name(view_name):
+    return re.sub(r'[^\w.-]', '_', view_name)
+
+
+def save_samples(view_name, samples):
+    if not samples:
+        return
+    directory = _profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{safe_name(view_name)}.{os.getpid()}{SUFFIX}"
+    # one write per request; appends from a single process never interleave
+    with open(path, 'a') as f:
+        f.write(''.join(f"{stack} {count}\n" for stack, count in samples.items() if stack))
+
+
+def _view_of(path):
+    return path.name[:-len(SUFFIX)].rsplit('.', 1)[0]
+
+
+def _files(view_name=None):
+    directory = _profile_dir()
+    if not directory.is_dir():
+        return []
+    paths = sorted(directory.glob(f"*{SUFFIX}"))
+    if view_name is not None:
+        paths = [path for path in paths if _view_of(path) == safe_name(view_name)]
+    return paths
+
+
+def profiled_views():
+    """{view name: total samples} over every process's files."""
+    totals = Counter()
+    for path in _files():
+        totals[_view_of(path)] += sum(count for _, count in _read(path))
+    return dict(totals.most_common())
+
+
+def _read(path):
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                yield stack, int(count)
+
+
+def load_stacks(view_name):
+    """Merged collapsed stacks {stack: samples} for one view."""
+    stacks = Counter()
+    for path in _files(view_name):
+        for stack, count in _read(path):
+            stacks[stack] += count
+    return stacks
+
+
+def clear(view_name=None):
+    for path in _files(view_name):
+        path.unlink(missing_ok=True)
+
+
+def folded_text(stacks):
+    return ''.join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+# ------------------------------------------------------------
+# flamegraph
+# ------------------------------------------------------------
+
+FLAME_WIDTH = 1200
+FLAME_ROW = 16
+# frames narrower than this share of the total are not drawn
+FLAME_MIN_SHARE = 0.001
+
+
+def _tree(stacks):
+    root = {'value': 0, 'children': {}}
+    for stack, count in stacks.items():
+        root['value'] += count
+        node = root
+        for label in stack.split(';'):
+            node = node['children'].setdefault(label, {'value': 0, 'children': {}})
+            node['value'] += count
+    return root
+
+
+def _color(label):
+    h = crc32(label.encode())
+    return f"rgb({205 + h % 50},{80 + (h >> 8) % 120},{(h >> 16) % 60})"
+
+
+def flamegraph_svg(stacks, title):
+    """A static flamegraph (root at the bottom, hover for names and counts) as SVG text."""
+    root = _tree(stacks)
+    total = root['value'] or 1
+    rects, depth_max = [], 0
+
+    def walk(node, x, depth):
+        nonlocal depth_max
+        for label, child in sorted(node['children'].items()):
+            share = child['value'] / total
+            if share >= FLAME_MIN_SHARE:
+                depth_max = max(depth_max, depth)
+                rects.append((x, depth, share, label, child['value']))
+                walk(child, x, depth + 1)
+            x += share
+
+    walk(root, 0.0, 0)
+    height = (depth_max + 1) * FLAME_ROW + 40
+    interval_ms = settings.PROFILING_INTERVAL_MS
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAME_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">',
+        '<rect width="100%" height="100%" fill="#fafafa"/>',
+        f'<text x="6" y="18" font-size="14">{escape(title)}: {root["value"]} samples '
+        f'(~{root["value"] * interval_ms / 1000:.1f} s)</text>',
+    ]
+    for x, depth, share, label, count in rects:
+        px, width = x * FLAME_WIDTH, share * FLAME_WIDTH
+        y = height - (depth + 1) * FLAME_ROW
+        name = escape(label)
+        parts.append(
+            f'<g><title>{name} ({count} samples, {share:.1%})</title>'
+            f'<rect x="{px:.1f}" y="{y}" width="{max(width - 0.5, 0.1):.1f}" height="{FLAME_ROW - 1}" '
+            f'fill="{_color(label)}"/>'
+        )
+        chars = int(width / 7)
+        if chars >= 3:
+            text = label if len(label) <= chars else label[:chars - 2] + '..'
+            parts.append(f'<text x="{px + 3:.1f}" y="{y + 11}">{escape(text)}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
@@ -0,0 +1,70 @@
+"""
+Rating aggregates stored on Field (sum, count and per-star counts).
+
+Pages read field.average_rating and field.rating_histogram instead of
+scanning the field's reviews. The counters are changed with a single
+UPDATE ... SET x = x + 1 from the Review signal handlers in
+core/signals.py. That runs inside the transaction that saves or deletes the
+review, so concurrent reviews cannot lose increments. recompute_ratings()
+rebuilds them from the Review table (`manage.py repair_ratings`).
+Field.save() never writes them back.
+"""
+from django.db.models import Count, F, Q, Sum
+
+from .models import RATING_FIELDS, Field, Review
+
+
+def apply_rating_change(field_id, rating, sign):
+    """Add (sign=1) or remove (sign=-1) one review of `rating` stars on a field."""
+    Field.objects.filter(pk=field_id).update(**{
+        'rating_sum': F('rating_sum') + sign * rating,
+        'rating_count': F('rating_count') + sign,
+        f'rating_{rating}_count': F(f'rating_{rating}_count') + sign,
+    })
+
+
+def review_saved(review, created):
+    before = None if created else getattr(review, '_rated', None)
+    after = (review.field_id, review.rating)
+    if before == after:
+        return
+    if before is not None and before[0] is not None:
+        apply_rating_change(before[0], before[1], -1)
+    apply_rating_change(*after, 1)
+    review._rated = after
+
+
+def review_deleted(review):
+    field_id, rating = getattr(review, '_rated', None) or (review.field_id, review.rating)
+    apply_rating_change(field_id, rating, -1)
+
+
+def expected_ratings():
+    """{field_id: {column: value}} computed from the Review table in one query."""
+    rows = Review.objects.values('field_id').annotate(
+        rating_sum=Sum('rating'),
+        rating_count=Count('id'),
+        **{f'rating_{stars}_count': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)},
+    ).order_by()
+    return {row.pop('field_id'): row for row in rows}
+
+
+def recompute_ratings(dry_run=False):
+    """
+    Rebuild every field's aggregates from its reviews.
+    Returns the fields whose stored values were wrong.
+    """
+    expected = expected_ratings()
+    empty = dict.fromkeys(RATING_FIELDS, 0)
+
+    drifted = []
+    for field in Field.objects.only('id', 'name', *RATING_FIELDS):
+        want = expected.get(field.id, empty)
+        if any(getattr(field, name) != want[name] for name in RATING_FIELDS):
+            for name in RATING_FIELDS:
+                setattr(field, name, want[name])
+            drifted.append(field)
+
+    if drifted and not dry_run:
+        Field.objects.bulk_update(drifted, RATING_FIELDS, batch_size=500)
+    return drifted
@@ -0,0 +1,335 @@
+"""
+Payment reconciliation against Khalti (`manage.py reconcile_payments`).
+
+khalti_callback is the only place a payment is recorded. When the callback
+never arrives, the booking stays unpaid although the money moved. Refunds
+made in the Khalti dashboard never reach us at all. The nightly
+reconciliation looks up every unpaid or paid booking in a date range at the
+gateway. A booking with a payment_ref is looked up by that transaction id,
+and any other booking by its product identity (the booking id the checkout
+sends). Each booking then gets one finding (FINDINGS).
+
+"Hold & pay" checkouts are paid for a SlotHold, not a booking, and the
+booking only exists once khalti_callback converts the hold. Holds released
+without becoming a booking (core/holds.py) are looked up by their
+"hold-<id>" product identity too: a completed payment for one means the
+money moved but nobody got the slot, and is reported as 'paid_hold' for a
+refund. Holds are never booked from here; the slot may be long gone.
+
+Lookups run on a thread pool of settings.RECONCILE_CONCURRENCY workers
+over one requests session. The session's connection pool has the same size
+and blocks rather than opening more connections. Each request has a
+(connect, read) timeout and is retried with backoff on connection errors,
+timeouts, 429 and 5xx. Bookings are processed in batches. A batch is read
+with one keyset query, looked up concurrently, and then its fixes are
+written in one transaction. That transaction re-checks each row under a
+lock and skips the ones changed since the lookup, e.g. by a late callback,
+and logs one BookingEvent per change. Holds are checked the same way after
+the bookings. Every finding other than 'ok' goes into the discrepancy
+report.
+"""
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import events, metrics
+from .models import Booking, SlotHold
+from .waitlist import release_slots
+
+# finding -> what is done about it
+FINDINGS = {
+    'ok': "nothing to do",
+    'missed_callback': "marked paid: the gateway has a completed payment",
+    'ref_backfilled': "payment_ref filled in from the gateway's completed payment",
+    'refunded_at_gateway': "marked refunded (and rejected if it was approved)",
+    'amount_mismatch': "report only: the gateway amount differs from the booking",
+    'gateway_pending': "report only: the gateway payment is still pending, or failed for a paid booking",
+    'not_at_gateway': "report only: the recorded payment_ref is unknown to the gateway",
+    'no_gateway_record': "report only: paid, but not through the gateway (cash?)",
+    'paid_hold': "report only: paid for a hold that never became a booking; refund it",
+    'unverified': "report only: the gateway could not be reached",
+}
+REPORT_COLUMNS = [
+    'booking_id', 'hold_id', 'finding', 'action', 'status', 'payment_status', 'payment_ref', 'amount',
+    'gateway_idx', 'gateway_state', 'gateway_amount', 'detail',
+]
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+PENDING_STATES = ('pending', 'initiated')
+
+
+class GatewayError(Exception):
+    pass
+
+
+# ------------------------------------------------------------
+# gateway client
+# ------------------------------------------------------------
+
+def _transaction(data):
+    """A gateway transaction as {'idx', 'amount' (paisa), 'state', 'created'}."""
+    state = data.get('state')
+    state = (state.get('name') if isinstance(state, dict) else state) or ''
+    return {
+        'idx': str(data.get('idx', '')),
+        'amount': int(data.get('amount') or 0),
+        'state': 'refunded' if data.get('refunded') else state.lower(),
+        'created': parse_datetime(data['created_on']) if data.get('created_on') else None,
+    }
+
+
+class KhaltiClient:
+    """Khalti merchant transaction lookups, safe to call from many threads at once."""
+
+    def __init__(self, base_url=None, secret_key=None, pool_size=None, timeout=None, retries=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.requests = requests
+        self.base_url = base_url or settings.KHALTI_API_URL
+        self.timeout = timeout or settings.RECONCILE_TIMEOUT
+        retries = settings.RECONCILE_RETRIES if retries is None else retries
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size or settings.RECONCILE_CONCURRENCY, pool_block=True,
+            max_retries=Retry(
+                total=retries, backoff_factor=0.5, status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({'GET'}), raise_on_status=False,
+            ),
+        )
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f"Key {secret_key or settings.KHALTI_SECRET_KEY}"
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _get(self, path, params=None):
+        started = time.perf_counter()
+        try:
+            response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+        except self.requests.RequestException as exc:
+            raise GatewayError(f"{type(exc).__name__}: {exc}") from exc
+        finally:
+            metrics.KHALTI_SECONDS.observe(time.perf_counter() - started)
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise GatewayError(f"HTTP {response.status_code}")
+        try:
+            return response.json()
+        except ValueError as exc:
+            raise GatewayError("The gateway sent invalid JSON.") from exc
+
+    def lookup(self, payment_ref, product_identity):
+        """The booking's transaction at the gateway, or None if there is none."""
+        if payment_ref:
+            data = self._get(f"merchant-transaction/{payment_ref}/")
+            return _transaction(data) if data else None
+        data = self._get("merchant-transaction/", {'product_identity': product_identity}) or {}
+        records = [_transaction(r) for r in data.get('records', [])]
+        # a failed attempt followed by a successful one: the successful one counts
+        settled = [r for r in records if r['state'] in ('completed', 'refunded')]
+        return (settled or records or [None])[0]
+
+    def close(self):
+        self.session.close()
+
+
+# ------------------------------------------------------------
+# findings
+# ------------------------------------------------------------
+
+def _paisa(amount):
+    return int(Decimal(amount) * 100)
+
+
+def classify(booking, payment):
+    """(finding, changes to make to the booking or None) for a booking row and its gateway transaction."""
+    paid = booking['payment_status'] == 'paid'
+    if payment is None:
+        if not paid:
+            return 'ok', None
+        return ('not_at_gateway' if booking['payment_ref'] else 'no_gateway_record'), None
+
+    if payment['state'] == 'refunded':
+        if not paid:
+            return 'ok', None
+        fix = {'payment_status': 'refunded'}
+        if booking['status'] == 'approved':
+            fix['status'] = 'rejected'  # as a refund from the dashboard does
+        return 'refunded_at_gateway', fix
+    if payment['state'] != 'completed':
+        if not paid and payment['state'] not in PENDING_STATES:
+            return 'ok', None  # an abandoned or failed attempt
+        return 'gateway_pending', None
+    if payment['amount'] != _paisa(booking['amount']):
+        return 'amount_mismatch', None
+    if not paid:
+        return 'missed_callback', {
+            'payment_status': 'paid', 'payment_ref': payment['idx'][:64],
+            'payment_date': payment['created'] or timezone.now(),
+        }
+    if not booking['payment_ref']:
+        return 'ref_backfilled', {'payment_ref': payment['idx'][:64]}
+    return 'ok', None
+
+
+def classify_hold(payment):
+    """The finding for a released hold and its gateway transaction."""
+    if payment is None or payment['state'] == 'refunded':
+        return 'ok'
+    if payment['state'] == 'completed':
+        return 'paid_hold'
+    return 'gateway_pending' if payment['state'] in PENDING_STATES else 'ok'
+
+
+def _apply(fixes):
+    """
+    Write {booking id: (row as looked up, changes)} in one transaction.
+    Returns the ids written; rows changed since the lookup are left alone.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        locked = Booking.objects.select_for_update().filter(id__in=fixes)
+        changes = []
+        for booking in locked:
+            seen, fix = fixes[booking.id]
+            if (booking.status, booking.payment_status, booking.payment_ref) != (
+                seen['status'], seen['payment_status'], seen['payment_ref'],
+            ):
+                continue
+            old = (booking.status, booking.payment_status)
+            for name, value in fix.items():
+                setattr(booking, name, value)
+            booking.updated_at = now
+            changes.append((booking, *old))
+        if changes:
+            Booking.objects.bulk_update(
+                [b for b, _, _ in changes],
+                ['status', 'payment_status', 'payment_date', 'payment_ref', 'updated_at'],
+            )
+            events.log_many_changes(changes)
+    freed = [b for b, old_status, _ in changes if old_status == 'approved' and b.status != 'approved']
+    if freed:
+        release_slots(freed)
+    return {b.id for b, _, _ in changes}
+
+
+# ------------------------------------------------------------
+# reconciliation
+# ------------------------------------------------------------
+
+class Report:
+    """CSV of every finding other than 'ok'."""
+
+    def __init__(self, f):
+        self.writer = csv.DictWriter(f, REPORT_COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, booking, finding, action, payment=None, detail=''):
+        payment = payment or {}
+        self.writer.writerow({
+            'booking_id': booking['id'], 'hold_id': '', 'finding': finding, 'action': action,
+            'status': booking['status'], 'payment_status': booking['payment_status'],
+            'payment_ref': booking['payment_ref'], 'amount': booking['amount'],
+            'gateway_idx': payment.get('idx', ''), 'gateway_state': payment.get('state', ''),
+            'gateway_amount': payment.get('amount', ''), 'detail': detail,
+        })
+
+
+    def write_hold(self, hold, finding, payment=None, detail=''):
+        payment = payment or {}
+        self.writer.writerow({
+            'booking_id': '', 'hold_id': hold['id'], 'finding': finding, 'action': 'reported',
+            'status': 'released hold', 'payment_status': '', 'payment_ref': '', 'amount': hold['amount'],
+            'gateway_idx': payment.get('idx', ''), 'gateway_state': payment.get('state', ''),
+            'gateway_amount': payment.get('amount', ''), 'detail': detail,
+        })
+
+
+def candidates(start, end):
+    """Unpaid and paid bookings dated `start`..`end`; refunded ones are settled."""
+    return (
+        Booking.objects.filter(date__range=(start, end), payment_status__in=('unpaid', 'paid'))
+        .values('id', 'status', 'payment_status', 'payment_ref', 'amount')
+    )
+
+
+def hold_candidates(start, end):
+    """Released holds on slots dated `start`..`end`; converted holds are bookings now."""
+    return SlotHold.objects.filter(date__range=(start, end), released_at__isnull=False).values('id', 'amount')
+
+
+def _batches(queryset, batch_size):
+    """`queryset` (ordered by id) in keyset-paginated batches."""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        last_id = batch[-1]['id']
+        yield batch
+
+
+def reconcile(start, end, client, report, batch_size=200, concurrency=None, dry_run=False, progress=None):
+    """
+    Reconcile the bookings and released holds dated `start`..`end`,
+    writing discrepancies to `report`. Returns {finding: count}.
+    """
+    concurrency = concurrency or settings.RECONCILE_CONCURRENCY
+    queryset = candidates(start, end).order_by('id')
+    counts = dict.fromkeys(FINDINGS, 0)
+
+    def check(booking):
+        try:
+            return client.lookup(booking['payment_ref'], str(booking['id'])), None
+        except GatewayError as exc:
+            return None, str(exc)
+
+    def check_hold(hold):
+        try:
+            return client.lookup('', f"hold-{hold['id']}"), None
+        except GatewayError as exc:
+            return None, str(exc)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for batch in _batches(queryset, batch_size):
+            results = []
+            for booking, (payment, error) in zip(batch, pool.map(check, batch)):
+                finding, fix = ('unverified', None) if error else classify(booking, payment)
+                results.append((booking, payment, finding, fix, error or ''))
+
+            fixes = {b['id']: (b, fix) for b, _, _, fix, _ in results if fix}
+            written = set() if dry_run or not fixes else _apply(fixes)
+
+            for booking, payment, finding, fix, error in results:
+                counts[finding] += 1
+                metrics.PAYMENT_RECONCILIATIONS.inc(finding=finding)
+                if finding == 'ok':
+                    continue
+                if not fix:
+                    action = 'reported'
+                elif dry_run:
+                    action = 'would fix'
+                elif booking['id'] in written:
+                    action = 'fixed'
+                else:
+                    action = 'skipped: changed since the lookup'
+                report.write(booking, finding, action, payment, error or FINDINGS[finding])
+            if progress:
+                progress(counts)
+
+        for batch in _batches(hold_candidates(start, end).order_by('id'), batch_size):
+            for hold, (payment, error) in zip(batch, pool.map(check_hold, batch)):
+                finding = 'unverified' if error else classify_hold(payment)
+                counts[finding] += 1
+                metrics.PAYMENT_RECONCILIATIONS.inc(finding=finding)
+                if finding != 'ok':
+                    report.write_hold(hold, finding, payment, error or FINDINGS[finding])
+            if progress:
+                progress(counts)
+    return counts
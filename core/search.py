@@ -0,0 +1,177 @@
+"""
+Field search by name and location, backed by two SQLite FTS5 tables.
+
+- core_field_fts (unicode61 tokenizer with prefix indexes) answers
+  word-prefix queries: "nort fut" finds "North Futsal Arena". Results are
+  ranked by bm25, with the name weighted above the location.
+- core_field_trigram (trigram tokenizer) supplies typo-tolerant matches.
+  Candidates share at least one trigram with the query. They are kept when
+  every query word is close to some word of the field (difflib ratio of at
+  least TYPO_RATIO), so "futzal" still finds "futsal".
+
+Both are keyed by the field id (rowid). A search limited to one venue joins
+the matches to core_field on the rowid and filters on venue_id before the
+LIMIT, so fields of other venues never take its places. The tables are kept
+in sync by the Field signal handlers in core/signals.py, and `manage.py rebuild_search_index`
+rebuilds them from scratch. On databases other than SQLite search falls back
+to icontains filters.
+"""
+import re
+from difflib import SequenceMatcher
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Field
+
+FTS_TABLE = 'core_field_fts'
+TRIGRAM_TABLE = 'core_field_trigram'
+
+# trigram candidates looked at per query before typo filtering
+FUZZY_CANDIDATES = 200
+TYPO_RATIO = 0.75
+# typo matching only kicks in when prefix matching finds fewer fields than this
+FUZZY_BELOW = 5
+
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, location, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE} USING fts5("
+    f"name, location, tokenize='trigram')",
+]
+DROP_SQL = [f"DROP TABLE IF EXISTS {FTS_TABLE}", f"DROP TABLE IF EXISTS {TRIGRAM_TABLE}"]
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def words(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def index_field(field):
+    if not fts_enabled():
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in (FTS_TABLE, TRIGRAM_TABLE):
+            cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [field.pk])
+            cursor.execute(
+                f"INSERT INTO {table} (rowid, name, location) VALUES (%s, %s, %s)",
+                [field.pk, field.name, field.location],
+            )
+
+
+def unindex_field(field_id):
+    if not fts_enabled():
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in (FTS_TABLE, TRIGRAM_TABLE):
+            cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [field_id])
+
+
+def rebuild_index():
+    """Recreate both tables from the Field table. Returns the number of fields indexed."""
+    if not fts_enabled():
+        return 0
+    rows = list(Field.objects.values_list('id', 'name', 'location'))
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in DROP_SQL + CREATE_SQL:
+            cursor.execute(sql)
+        for table in (FTS_TABLE, TRIGRAM_TABLE):
+            cursor.executemany(f"INSERT INTO {table} (rowid, name, location) VALUES (%s, %s, %s)", rows)
+    return len(rows)
+
+
+def _venue_filter(table, venue_id):
+    """(JOIN, WHERE, params) limiting a query on `table` to one venue's fields."""
+    if venue_id is None:
+        return '', '', []
+    return (
+        f" JOIN {Field._meta.db_table} ON {Field._meta.db_table}.id = {table}.rowid",
+        f" AND {Field._meta.db_table}.venue_id = %s",
+        [venue_id],
+    )
+
+
+def _prefix_ids(cursor, tokens, limit, venue_id=None):
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    join, where, params = _venue_filter(FTS_TABLE, venue_id)
+    cursor.execute(
+        f"SELECT {FTS_TABLE}.rowid FROM {FTS_TABLE}{join} WHERE {FTS_TABLE} MATCH %s{where} "
+        f"ORDER BY bm25({FTS_TABLE}, 2.0, 1.0) LIMIT %s",
+        [match, *params, limit],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _similarity(token):
+    """word -> closeness to `token` (1.0 for a prefix), memoized per query word."""
+    matcher = SequenceMatcher(None, b=token)
+    cache = {}
+
+    def similarity(word):
+        if word not in cache:
+            if word.startswith(token):
+                cache[word] = 1.0
+            else:
+                matcher.set_seq1(word)
+                # cheap upper bounds first; most candidate words fail them
+                if matcher.real_quick_ratio() < TYPO_RATIO or matcher.quick_ratio() < TYPO_RATIO:
+                    cache[word] = 0.0
+                else:
+                    cache[word] = matcher.ratio()
+        return cache[word]
+    return similarity
+
+
+def _fuzzy_ids(cursor, tokens, limit, venue_id=None):
+    grams = {token[i:i + 3] for token in tokens if len(token) >= 3 for i in range(len(token) - 2)}
+    if not grams:
+        return []
+    join, where, params = _venue_filter(TRIGRAM_TABLE, venue_id)
+    cursor.execute(
+        f"SELECT {TRIGRAM_TABLE}.rowid, {TRIGRAM_TABLE}.name, {TRIGRAM_TABLE}.location "
+        f"FROM {TRIGRAM_TABLE}{join} WHERE {TRIGRAM_TABLE} MATCH %s{where} "
+        f"ORDER BY rank LIMIT %s",
+        [' OR '.join(f'"{gram}"' for gram in sorted(grams)), *params, FUZZY_CANDIDATES],
+    )
+    similarities = [_similarity(token) for token in tokens]
+    scored = []
+    for field_id, name, location in cursor.fetchall():
+        field_words = set(words(f"{name} {location}"))
+        best = [max(map(similarity, field_words)) for similarity in similarities]
+        # every query word must be close to some word of the field
+        if min(best) >= TYPO_RATIO:
+            scored.append((-sum(best), field_id))
+    return [field_id for _, field_id in sorted(scored)[:limit]]
+
+
+def search_field_ids(query, limit=50, venue_id=None):
+    """
+    Ids of fields matching `query` (in venue `venue_id`, if given), best
+    first: prefix matches, then (when there are few of those) typo matches.
+    """
+    tokens = words(query)
+    if not tokens:
+        return []
+
+    with connection.cursor() as cursor:
+        ids = _prefix_ids(cursor, tokens, limit, venue_id)
+        if len(ids) < FUZZY_BELOW:
+            seen = set(ids)
+            ids += [i for i in _fuzzy_ids(cursor, tokens, limit, venue_id) if i not in seen][:limit - len(ids)]
+    return ids
+
+
+def search_fields(query, limit=50, venue=None):
+    """Fields matching `query` (in `venue`, if given), in rank order."""
+    fields = Field.objects.all() if venue is None else Field.objects.filter(venue=venue)
+    if not fts_enabled():
+        for token in words(query):
+            fields = fields.filter(Q(name__icontains=token) | Q(location__icontains=token))
+        return list(fields[:limit])
+
+    ids = search_field_ids(query, limit, None if venue is None else getattr(venue, 'pk', venue))
+    by_id = fields.in_bulk(ids)
+    return [by_id[i] for i in ids if i in by_id]
@@ -0,0 +1,69 @@
+"""
+Model signal handlers, connected in CoreConfig.ready().
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import ics, pickup, ratings, search
+from .models import Booking, Field, Match, Review, Team, TeamMember
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:  # loaddata; run repair_ratings afterwards
+        return
+    ratings.review_saved(instance, created)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    ratings.review_deleted(instance)
+
+
+@receiver(post_save, sender=Field)
+def field_saved(sender, instance, raw=False, **kwargs):
+    if raw:  # loaddata; run rebuild_search_index afterwards
+        return
+    search.index_field(instance)
+    ics.field_changed(instance)
+
+
+@receiver(post_delete, sender=Field)
+def field_deleted(sender, instance, **kwargs):
+    search.unindex_field(instance.pk)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    ics.bookings_changed([instance])
+
+
+@receiver(post_save, sender=Match)
+def match_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ics.match_changed(instance)
+
+
+@receiver(post_delete, sender=Match)
+def match_deleted(sender, instance, **kwargs):
+    ics.match_changed(instance)
+
+
+@receiver(post_save, sender=Team)
+def team_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ics.team_changed(instance)
+
+
+@receiver(post_save, sender=TeamMember)
+def team_member_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    pickup.member_added(instance)
+
+
+@receiver(post_delete, sender=TeamMember)
+def team_member_deleted(sender, instance, **kwargs):
+    pickup.member_removed(instance)
@@ -0,0 +1,129 @@
+"""
+Batch PDF receipts and monthly statements.
+
+The parent process loads the month's bookings with their users and fields
+in one pass and describes each document as (zip path, template, context).
+Template rendering and the HTML -> PDF conversion (one wkhtmltopdf call per
+document) both run in a forked process pool; the contexts hold fully
+loaded model instances, so workers never touch the database. The results
+are streamed into a ZIP as they complete.
+"""
+import calendar
+import multiprocessing
+import os
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+from django.db import connections
+from django.template.loader import render_to_string
+
+from .archive import booking_sources, merged_bookings
+
+
+PDF_OPTIONS = {'quiet': '', 'encoding': 'UTF-8'}
+
+
+def month_bounds(year, month):
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def paid_bookings_for_month(year, month):
+    first, last = month_bounds(year, month)
+    return merged_bookings(
+        *(
+            source.filter(payment_status='paid', date__range=(first, last))
+            .select_related('user', 'field')
+            .order_by('date', 'start_time')
+            for source in booking_sources()
+        ),
+        key=lambda b: (b.date, b.start_time),
+    )
+
+
+def statement_context(title, bookings, year, month):
+    first, last = month_bounds(year, month)
+    return {
+        'title': title,
+        'bookings': bookings,
+        'period_start': first,
+        'period_end': last,
+        'total_amount': sum((b.amount for b in bookings), Decimal('0.00')),
+    }
+
+
+def statement_jobs(bookings, year, month, group_by=('user', 'field'), receipts=True):
+    """
+    Yield (zip_path, template, context) for every document to render.
+
+    group_by selects which statements are produced: one per user, one per
+    field, or both. receipts adds one receipt per paid booking.
+    """
+    prefix = f"{year:04d}-{month:02d}"
+    by_user, by_field = defaultdict(list), defaultdict(list)
+
+    for booking in bookings:
+        by_user[booking.user].append(booking)
+        by_field[booking.field].append(booking)
+        if receipts:
+            yield f"{prefix}/receipts/receipt_{booking.id}.pdf", 'booking_receipt.html', {'booking': booking}
+
+    if 'user' in group_by:
+        for user, rows in by_user.items():
+            yield (
+                f"{prefix}/users/statement_{user.username}.pdf", 'monthly_statement.html',
+                statement_context(f"Statement for {user.username}", rows, year, month),
+            )
+    if 'field' in group_by:
+        for field, rows in by_field.items():
+            yield (
+                f"{prefix}/fields/statement_field_{field.id}.pdf", 'monthly_statement.html',
+                statement_context(f"Statement for {field.name}", rows, year, month),
+            )
+
+
+def render_pdf(job):
+    """Worker entry point: (zip_path, template, context) -> (zip_path, pdf_bytes, error_message)."""
+    import pdfkit
+
+    zip_path, template, context = job
+    try:
+        html = render_to_string(template, context)
+        return zip_path, pdfkit.from_string(html, False, options=PDF_OPTIONS), None
+    except Exception as exc:  # reported per document, the batch keeps going
+        return zip_path, None, str(exc)
+
+
+def build_statement_zip(jobs, output, workers=None, progress=None):
+    """
+    Render every (zip_path, template, context) job to PDF across `workers`
+    processes (default: all CPU cores) and write the PDFs into the ZIP file
+    `output`.
+
+    progress(done, total, zip_path, error) is called after each document.
+    Returns the list of (zip_path, error) that failed.
+    """
+    jobs = list(jobs)
+    total = len(jobs)
+    workers = workers or os.cpu_count() or 1
+    # small chunks keep progress smooth, but amortise the IPC per document
+    chunksize = max(1, total // (workers * 8))
+    failures = []
+    # workers are forked with Django set up; they must not share the parent's connections
+    connections.close_all()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool, \
+            zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        results = pool.map(render_pdf, jobs, chunksize=chunksize)
+        for done, (zip_path, pdf, error) in enumerate(results, 1):
+            if error is None:
+                archive.writestr(zip_path, pdf)
+            else:
+                failures.append((zip_path, error))
+            if progress:
+                progress(done, total, zip_path, error)
+
+    return failures
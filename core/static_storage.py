@@ -0,0 +1,85 @@
+"""
+Static files pipeline: content-hashed names plus precompressed variants.
+
+`collectstatic` writes every file under a hashed name (bootstrap.min.<hash>.css)
+and, for text assets, `.gz` and `.br` siblings next to both the original and the
+hashed copy. core.middleware.StaticFilesMiddleware serves them.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only gzip variants are written without it
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico')
+MIN_COMPRESS_SIZE = 256
+# skip a variant that does not save at least 5%
+MAX_COMPRESSED_RATIO = 0.95
+
+
+def gzip_bytes(data):
+    # mtime=0 keeps the output byte-for-byte reproducible across deploys
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data):
+    return brotli.compress(data, quality=11)
+
+
+COMPRESSORS = [('.gz', gzip_bytes)]
+if brotli is not None:
+    COMPRESSORS.append(('.br', brotli_bytes))
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # vendor bundles ship without their .map files; keep collectstatic working
+    manifest_strict = False
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def converter_ignoring_missing_maps(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                matches = matchobj.groupdict()
+                if matches['url'].strip().endswith('.map'):
+                    return matches['matched']
+                raise
+        return converter_ignoring_missing_maps
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed = set()
+        for name, hashed_name, was_processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(was_processed, Exception):
+                processed.add(name)
+                if hashed_name:
+                    processed.add(hashed_name)
+            yield name, hashed_name, was_processed
+
+        if dry_run:
+            return
+
+        for name in sorted(processed):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+
+        for suffix, compressor in COMPRESSORS:
+            compressed = compressor(data)
+            if len(compressed) > len(data) * MAX_COMPRESSED_RATIO:
+                continue
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            os.utime(path + suffix, (os.path.getatime(path), os.path.getmtime(path)))
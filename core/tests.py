@@ -1,3 +1,812 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time as time_module
+from datetime import datetime, time, timedelta
+from unittest import mock
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import (
+    archive, events, forecasting, geo, holds, ics, importer, metrics, pickup, profiling, reconcile, search, static_storage,
+    throttle, tournaments, utilization, waitlist,
+)
+from .admin import BookingAdmin
+from .gateway_stub import StubGateway
+from .middleware import pick_variant
+from .models import (
+    ArchivedBooking, Booking, BookingEvent, DemandForecast, EventCheckpoint, FeedVersion, Field, Notification,
+    Review, SlotHold, Team, TeamBooking, TeamMember, TimeSlot, Venue, WaitlistEntry,
+)
+
+
+# pages render without `collectstatic`; CollectedStaticTests covers the manifest
+plain_static = override_settings(STORAGES={
+    **settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+def make_field(name='Field 1', price='1000'):
+    return Field.objects.create(name=name, location='Kathmandu', price_per_hour=Decimal(price))
+
+
+def make_booking(user, field, day, start=time(18), end=time(19), **kwargs):
+    kwargs.setdefault('status', 'approved')
+    return Booking.objects.create(
+        user=user, field=field, date=day, start_time=start, end_time=end,
+        amount=kwargs.pop('amount', Decimal('1000')), **kwargs,
+    )
+
+
+# ------------------------------------------------------------
+# slot holds and waitlist
+# ------------------------------------------------------------
+
+class HoldWaitlistTests(TestCase):
+    def setUp(self):
+        self.field = make_field()
+        self.day = timezone.localdate() + timedelta(days=3)
+        self.owner = User.objects.create_user('owner')
+        self.holder = User.objects.create_user('holder')
+        self.waiting = User.objects.create_user('waiting')
+
+    def test_promotion_skips_a_held_slot(self):
+        # the slot is freed and held before the waitlist gets to it
+        booking = make_booking(self.owner, self.field, self.day, status='rejected')
+        waitlist.join_waitlist(self.waiting, self.field, self.day, time(18), time(19))
+        hold = holds.place_hold(self.holder, self.field, self.day, time(18), time(19))
+
+        self.assertEqual(waitlist.release_slot(booking), [])
+        self.assertTrue(WaitlistEntry.objects.filter(user=self.waiting, status='waiting').exists())
+        self.assertIsNotNone(holds.convert_hold(hold.id, self.holder, payment_ref='idx-1'))
+
+    def test_promotion_goes_ahead_once_the_hold_expired(self):
+        booking = make_booking(self.owner, self.field, self.day, status='rejected')
+        waitlist.join_waitlist(self.waiting, self.field, self.day, time(18), time(19))
+        hold = holds.place_hold(self.holder, self.field, self.day, time(18), time(19))
+        SlotHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        promoted = waitlist.release_slot(booking)
+        self.assertEqual([b.user for b in promoted], [self.waiting])
+
+    def test_sweeping_an_expired_hold_promotes_the_waitlist(self):
+        hold = holds.place_hold(self.holder, self.field, self.day, time(18), time(19))
+        waitlist.join_waitlist(self.waiting, self.field, self.day, time(18), time(19))
+        SlotHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - holds.SWEEP_GRACE * 2)
+
+        self.assertEqual(holds.sweep_expired(), 1)
+        self.assertTrue(Booking.objects.filter(user=self.waiting, status='approved').exists())
+
+    def test_active_hold_is_refused_when_an_approved_booking_overlaps(self):
+        hold = holds.place_hold(self.holder, self.field, self.day, time(18), time(19))
+        make_booking(self.owner, self.field, self.day, time(18, 30), time(19, 30))
+
+        self.assertIsNone(holds.convert_hold(hold.id, self.holder, payment_ref='idx-1'))
+        # released, not deleted: reconcile_payments reports the payment for a refund
+        hold.refresh_from_db()
+        self.assertIsNotNone(hold.released_at)
+        self.assertFalse(holds.active_holds().filter(pk=hold.pk).exists())
+        self.assertEqual(Booking.objects.filter(status='approved').count(), 1)
+
+    def test_expired_hold_is_honoured_while_the_slot_is_free(self):
+        hold = holds.place_hold(self.holder, self.field, self.day, time(18), time(19))
+        SlotHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        booking = holds.convert_hold(hold.id, self.holder, payment_ref='idx-1')
+        self.assertEqual((booking.status, booking.payment_status), ('approved', 'paid'))
+
+    def test_expired_hold_is_lost_to_another_hold(self):
+        hold = holds.place_hold(self.holder, self.field, self.day, time(18), time(19))
+        SlotHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        holds.place_hold(self.owner, self.field, self.day, time(18), time(19))
+
+        self.assertIsNone(holds.convert_hold(hold.id, self.holder, payment_ref='idx-1'))
+
+
+class NearbyAvailabilityTests(TestCase):
+    def setUp(self):
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.player = User.objects.create_user('player')
+
+    def free_ids(self, start, end, user=None):
+        fields = geo.available_between(Field.objects.all(), self.day, start, end, user=user)
+        return set(fields.values_list('id', flat=True))
+
+    def test_held_slots_and_closed_hours_are_not_offered(self):
+        held, open_late, no_hours = make_field('Held'), make_field('Open late'), make_field('No hours')
+        TimeSlot.objects.create(field=open_late, start_time=time(16), end_time=time(18))
+        TimeSlot.objects.create(field=open_late, start_time=time(18), end_time=time(20))
+        TimeSlot.objects.create(field=held, start_time=time(8), end_time=time(22))
+        holds.place_hold(User.objects.create_user('holder'), held, self.day, time(18), time(19))
+
+        self.assertEqual(self.free_ids(time(17, 30), time(18, 30)), {open_late.id, no_hours.id})
+        self.assertEqual(self.free_ids(time(19, 30), time(20, 30)), {held.id, no_hours.id})
+        holds.place_hold(self.player, no_hours, self.day, time(9), time(10))
+        self.assertEqual(self.free_ids(time(9), time(10), user=self.player), {held.id, no_hours.id})
+
+
+# ------------------------------------------------------------
+# rating aggregates
+# ------------------------------------------------------------
+
+class FieldRatingTests(TestCase):
+    def test_saving_a_stale_field_keeps_the_review_counters(self):
+        field = make_field()
+        stale = Field.objects.get(pk=field.pk)
+        Review.objects.create(field=field, user=User.objects.create_user('reviewer'), rating=4, comment='ok')
+
+        stale.name = 'Renamed'
+        stale.save()
+        field.refresh_from_db()
+        self.assertEqual((field.name, field.rating_count, field.rating_sum, field.rating_4_count), ('Renamed', 1, 4, 1))
+
+
+# ------------------------------------------------------------
+# utilization heatmap
+# ------------------------------------------------------------
+
+@plain_static
+class HeatmapRangeTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('staff'))
+
+    def heatmap_range(self, start, end):
+        with mock.patch('core.views.analytics.utilization', wraps=utilization.utilization) as computed:
+            response = self.client.get('/analytics-dashboard/', {'start': start, 'end': end})
+        self.assertEqual(response.status_code, 200)
+        return computed.call_args.args, [str(m) for m in response.context['messages']]
+
+    def test_long_ranges_are_clamped(self):
+        (start, end), notes = self.heatmap_range('1990-01-01', '2030-12-31')
+        self.assertEqual((end, (end - start).days + 1), (datetime(2030, 12, 31).date(), 366))
+        self.assertIn('366 days', notes[0])
+
+    def test_an_end_before_the_start_is_rejected(self):
+        (start, end), notes = self.heatmap_range('2024-03-01', '2024-02-01')
+        self.assertEqual((start, end), utilization.default_range())
+        self.assertIn('must not be before', notes[0])
+
+
+# ------------------------------------------------------------
+# demand forecasts
+# ------------------------------------------------------------
+
+class ForecastTests(TestCase):
+    def test_level_and_trend_per_field_weekday_and_hour(self):
+        today = datetime(2026, 3, 2).date()
+        user, steady, growing = User.objects.create_user('player'), make_field('Steady'), make_field('Growing')
+        for weeks_back in (3, 2, 1):
+            # the same weekday as `today`, 18:00-19:30 every week
+            make_booking(user, steady, today - timedelta(weeks=weeks_back), time(18), time(19, 30), status='pending')
+        # the day after: 0, 30 then 60 minutes at 10:00
+        make_booking(user, growing, today - timedelta(days=13), time(10), time(10, 30))
+        make_booking(user, growing, today - timedelta(days=6), time(10), time(11))
+        make_booking(user, growing, today - timedelta(days=6), time(14), time(15), status='rejected')
+
+        summary = forecasting.refresh_forecasts(weeks=3, half_life_weeks=2, today=today)
+
+        self.assertEqual((summary['fields'], summary['booked_hours'], summary['rows']), (2, 6.0, 3))
+        self.assertEqual(
+            sorted(DemandForecast.objects.values_list('field__name', 'date', 'hour', 'expected_hours')),
+            [('Growing', today + timedelta(days=1), 10, 1.5),
+             ('Steady', today, 18, 1.0), ('Steady', today, 19, 0.5)],
+        )
+
+    def test_series_shape(self):
+        import numpy as np
+
+        field = make_field()
+        series = forecasting.demand_series(np, [field.id], datetime(2026, 1, 5).date(), datetime(2026, 1, 18).date())
+        self.assertEqual(series.shape, (1, 14, 24))
+        self.assertEqual(forecasting.fit_forecast(np, series, 12).shape, (1, 7, 24))
+
+
+# ------------------------------------------------------------
+# bookings API
+# ------------------------------------------------------------
+
+class BulkBookingApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('player')
+        self.field = make_field()
+        self.day = timezone.localdate() + timedelta(days=2)
+        self.client.force_login(self.user)
+
+    def post(self, path, data):
+        return self.client.post(f'/api/v1/bookings/{path}', data, content_type='application/json')
+
+    def item(self, start, end, field=None):
+        return {'field': field or self.field.id, 'date': str(self.day), 'start_time': start, 'end_time': end}
+
+    def test_bulk_create_books_every_item(self):
+        response = self.post('bulk/', [self.item('08:00', '09:00'), self.item('09:00', '10:30')])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([b['amount'] for b in response.json()], ['1000.00', '1500.00'])
+        self.assertEqual(Booking.objects.filter(user=self.user, status='pending').count(), 2)
+        self.assertEqual(BookingEvent.objects.filter(kind='created').count(), 2)
+
+    def test_conflicts_are_reported_per_item_and_nothing_is_booked(self):
+        make_booking(User.objects.create_user('owner'), self.field, self.day, time(9), time(10))
+        holds.place_hold(User.objects.create_user('holder'), self.field, self.day, time(12), time(13))
+
+        response = self.post('bulk/', [
+            self.item('08:00', '09:00'), self.item('09:30', '10:30'), self.item('11:00', '12:00'),
+            self.item('12:30', '13:30'),
+        ])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['conflicts'], [1, 3])
+        self.assertFalse(Booking.objects.filter(user=self.user).exists())
+
+    def test_invalid_items_are_reported_by_index(self):
+        response = self.post('bulk/', [self.item('08:00', '09:00'), self.item('10:00', '11:00', field=999999)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'errors': {'1': {'field': ["Unknown field."]}}})
+        response = self.post('bulk/', [self.item('08:00', '09:00'), self.item('11:00', '10:00')])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_a_failure_after_the_insert_rolls_the_whole_batch_back(self):
+        with mock.patch.object(events, 'log_created', side_effect=RuntimeError("event log down")), \
+                self.assertRaises(RuntimeError):
+            self.post('bulk/', [self.item('08:00', '09:00'), self.item('09:00', '10:00')])
+        self.assertFalse(Booking.objects.exists())
+
+    def test_bulk_status_is_staff_only_and_frees_slots_for_the_waitlist(self):
+        approved = make_booking(self.user, self.field, self.day)
+        pending = make_booking(self.user, self.field, self.day, time(20), time(21), status='pending')
+        waiting = User.objects.create_user('waiting')
+        waitlist.join_waitlist(waiting, self.field, self.day, time(18), time(19))
+        self.assertEqual(self.post('bulk-status/', {'ids': [approved.id], 'status': 'rejected'}).status_code, 403)
+
+        self.client.force_login(User.objects.create_superuser('staff'))
+        response = self.post('bulk-status/', {'ids': [approved.id, pending.id], 'status': 'rejected'})
+        self.assertEqual(response.status_code, 200)
+        promoted = Booking.objects.get(user=waiting)
+        self.assertEqual(response.json(), {'updated': 2, 'promoted': [promoted.id]})
+        self.assertEqual(BookingEvent.objects.filter(kind='status', new_value='rejected').count(), 2)
+
+
+# ------------------------------------------------------------
+# field search
+# ------------------------------------------------------------
+
+class FieldSearchTests(TestCase):
+    def test_a_venue_search_is_not_crowded_out_by_other_venues(self):
+        here, there = Venue.objects.create(name='Here'), Venue.objects.create(name='There')
+        for i in range(12):
+            Field.objects.create(name=f"Futsal Futsal {i}", location='Futsal', venue=there, price_per_hour=1000)
+        ours = [
+            Field.objects.create(name=f"Court {i} futsal", location='Ring Road, Kathmandu Valley', venue=here,
+                                 price_per_hour=1000)
+            for i in range(2)
+        ]
+
+        self.assertTrue(all(f.venue == there for f in search.search_fields('futsal', limit=2)))
+        self.assertEqual(sorted(f.id for f in search.search_fields('futsal', limit=2, venue=here)),
+                         [f.id for f in ours])
+        self.assertEqual([f.id for f in search.search_fields('futzal court', limit=2, venue=here)][:1], [ours[0].id])
+
+
+# ------------------------------------------------------------
+# importer
+# ------------------------------------------------------------
+
+class BookingImportTests(TestCase):
+    def setUp(self):
+        self.field = make_field('Court A')
+        User.objects.create_user('asha', email='asha@example.com')
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def run_import(self, rows, **kwargs):
+        rejects = importer.RejectWriter(io.StringIO())
+        imported = importer.import_rows(
+            importer.BookingImporter(**kwargs), enumerate(rows, start=2), rejects, chunk_size=2,
+        )
+        return imported, rejects
+
+    def row(self, start, end, **extra):
+        return {'user': 'asha@example.com', 'field': 'court a', 'date': str(self.day),
+                'start_time': start, 'end_time': end, **extra}
+
+    def test_overlapping_approved_rows_are_rejected_across_chunks(self):
+        imported, rejects = self.run_import([
+            self.row('18:00', '19:00'),
+            self.row('20:00', '21:00'),
+            self.row('18:30', '19:30'),
+            self.row('18:30', '19:30', status='rejected'),
+            self.row('19:00', '18:00'),
+        ])
+        self.assertEqual((imported, rejects.count), (3, 2))
+        self.assertIn('overlaps approved booking 18:00-19:00', rejects.f.getvalue())
+        self.assertIn('end_time must be after start_time', rejects.f.getvalue())
+
+    def test_history_keeps_created_at_and_logs_no_events(self):
+        self.run_import([self.row('18:00', '19:00', created_at='2023-05-01 09:30'), self.row('19:00', '20:00')])
+
+        first, second = Booking.objects.order_by('start_time')
+        self.assertEqual(timezone.localtime(first.created_at).replace(tzinfo=None), datetime(2023, 5, 1, 9, 30))
+        self.assertGreater(second.created_at, first.created_at)
+        self.assertFalse(BookingEvent.objects.exists())
+        self.assertTrue(FeedVersion.objects.filter(kind='field', object_id=self.field.id).exists())
+
+    def test_log_events_logs_one_created_event_per_row(self):
+        self.run_import([self.row('18:00', '19:00'), self.row('19:00', '20:00')], log_events=True)
+        self.assertEqual(BookingEvent.objects.filter(kind='created').count(), 2)
+
+
+# ------------------------------------------------------------
+# archive
+# ------------------------------------------------------------
+
+class ArchiveTests(TestCase):
+    def test_only_settled_bookings_move_and_notifications_stay(self):
+        user, field = User.objects.create_user('player'), make_field()
+        old = timezone.localdate() - timedelta(days=400)
+        paid = make_booking(user, field, old, payment_status='paid')
+        rejected = make_booking(user, field, old, time(8), time(9), status='rejected')
+        make_booking(user, field, old, time(10), time(11), status='pending')
+        make_booking(user, field, old, time(12), time(13), payment_status='unpaid')
+        Notification.objects.create(user=user, booking=paid, kind='waitlist_promoted')
+
+        self.assertEqual(archive.archive_bookings(archive.archive_cutoff(365)), 2)
+        self.assertEqual(set(ArchivedBooking.objects.values_list('id', flat=True)), {paid.id, rejected.id})
+        self.assertEqual(ArchivedBooking.objects.get(id=paid.id).updated_at, paid.updated_at)
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertIsNone(Notification.objects.get().booking_id)
+
+
+# ------------------------------------------------------------
+# calendar feeds
+# ------------------------------------------------------------
+
+class FeedVersionTests(TestCase):
+    def test_renaming_a_field_bumps_the_feeds_showing_it(self):
+        user, field = User.objects.create_user('player'), make_field()
+        make_booking(user, field, timezone.localdate() + timedelta(days=1))
+        FeedVersion.objects.all().delete()
+
+        field.name = 'Court 9'
+        field.save()
+        self.assertEqual(ics.version('field', field.id), ics.version('user', user.id))
+        self.assertGreater(ics.version('user', user.id), ics.NEVER_CHANGED)
+
+
+# ------------------------------------------------------------
+# metrics
+# ------------------------------------------------------------
+
+class MetricsFileTests(TestCase):
+    def test_files_of_exited_processes_are_merged_at_scrape_time(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            child = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True)
+            dead = metrics.ProcessFile(Path(directory) / f"{int(child.stdout)}.bin")
+            dead.add('series', 2.0)
+            dead.close()
+            merged = metrics.ProcessFile(Path(directory) / metrics.MERGED)
+            merged.add('series', 1.0)
+            merged.close()
+
+            self.assertEqual(metrics.collect()['series'], 3.0)
+            self.assertEqual(sorted(p.name for p in Path(directory).glob('*.bin')), [metrics.MERGED])
+            self.assertEqual(metrics.collect()['series'], 3.0)
+
+    def test_unknown_request_methods_share_one_label(self):
+        self.assertEqual(metrics.request_method('PATCH'), 'PATCH')
+        self.assertEqual(metrics.request_method('PROPFIND'), 'other')
+
+
+# ------------------------------------------------------------
+# profiling
+# ------------------------------------------------------------
+
+@plain_static
+class ProfilingMiddlewareTests(TestCase):
+    def test_a_listed_view_is_sampled_and_its_stacks_saved(self):
+        from django.shortcuts import render
+
+        def slow_render(*args, **kwargs):
+            # long enough for the sampler to catch the view many times
+            time_module.sleep(0.1)
+            return render(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(PROFILING_ENABLED=True, PROFILING_VIEWS=['home'], PROFILING_DIR=directory,
+                                  PROFILING_INTERVAL_MS=1), \
+                mock.patch.object(profiling, '_sampler', None), \
+                mock.patch('core.views.public.render', slow_render):
+            response = self.client.get('/')
+            unlisted = self.client.get('/fields/')
+
+            self.assertEqual(response.status_code, 200)
+            samples = int(response['X-Profiled-Samples'])
+            self.assertGreater(samples, 0)
+            self.assertNotIn('X-Profiled-Samples', unlisted)
+            [folded] = Path(directory).glob('*' + profiling.SUFFIX)
+            self.assertTrue(folded.name.startswith('home.'))
+            lines = folded.read_text().splitlines()
+            self.assertEqual(sum(int(line.rpartition(' ')[2]) for line in lines), samples)
+            in_view = sum(int(line.rpartition(' ')[2]) for line in lines if 'core.views.public:home;' in line)
+            self.assertGreater(in_view, samples // 2)
+            # the stacks start below the middleware, not in the test client
+            self.assertFalse(any('django.test' in line for line in lines))
+            self.assertEqual(profiling.profiled_views(), {'home': samples})
+
+
+# ------------------------------------------------------------
+# static files
+# ------------------------------------------------------------
+
+class AcceptEncodingTests(TestCase):
+    variants = [('br', 'app.css.br'), ('gzip', 'app.css.gz')]
+
+    def test_q_values_rank_and_refuse_codings(self):
+        self.assertEqual(pick_variant(self.variants, 'gzip, deflate, br')[0], 'br')
+        self.assertEqual(pick_variant(self.variants, 'br;q=0, gzip')[0], 'gzip')
+        self.assertEqual(pick_variant(self.variants, 'gzip;q=0.8, br;q=0.5')[0], 'gzip')
+        self.assertIsNone(pick_variant(self.variants, 'gzip;q=0, *;q=0'))
+        self.assertIsNone(pick_variant(self.variants, 'x-gzip'))
+        self.assertIsNone(pick_variant(self.variants, ''))
+
+
+@override_settings(DEBUG=False)
+class CollectedStaticTests(TestCase):
+    def test_pages_render_against_the_collected_manifest(self):
+        # brotli at quality 11 is slow and adds nothing to what is checked here
+        with tempfile.TemporaryDirectory() as directory, override_settings(STATIC_ROOT=directory), \
+                mock.patch.object(static_storage, 'COMPRESSORS', static_storage.COMPRESSORS[:1]):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            manifest = json.loads((Path(directory) / 'staticfiles.json').read_text())
+
+            for url in ('/', '/fields/', '/login/'):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                self.assertContains(response, manifest['paths']['css/bootstrap.min.css'])
+
+
+# ------------------------------------------------------------
+# throttle
+# ------------------------------------------------------------
+
+class ThrottleStoreTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'throttle.bin'
+
+    def test_bucket_empties_then_refills_at_the_rate(self):
+        store = throttle.SharedBucketStore(self.path, 64)
+        with mock.patch('core.throttle.time.time', return_value=1000.0):
+            self.assertEqual([store.take('a', 3, 0.5) for _ in range(3)], [0, 0, 0])
+            self.assertAlmostEqual(store.take('a', 3, 0.5), 2.0)
+            self.assertEqual(store.take('b', 3, 0.5), 0)
+        with mock.patch('core.throttle.time.time', return_value=1002.0):
+            self.assertEqual(store.take('a', 3, 0.5), 0)
+
+    def test_processes_share_buckets_and_counters(self):
+        first, second = throttle.SharedBucketStore(self.path, 64), throttle.SharedBucketStore(self.path, 64)
+        first.take('a', 1, 0.001)
+        self.assertGreater(second.take('a', 1, 0.001), 0)
+        name = throttle.counter_names()[0]
+        first.incr(name)
+        self.assertEqual(second.stats()[name], 1)
+
+    def test_a_new_layout_rebuilds_the_file_and_leaves_old_mappings_alone(self):
+        old = throttle.SharedBucketStore(self.path, 64)
+        old.take('a', 1, 0.001)
+        old.incr(throttle.counter_names()[0])
+
+        with self.settings(THROTTLE_RATES={'other': {'ip': (1, 1.0)}}):
+            new = throttle.SharedBucketStore(self.path, 128)
+        self.assertEqual(self.path.stat().st_size, throttle.HEADER_SIZE + 128 * throttle.SLOT.size)
+        self.assertEqual(new.take('a', 1, 0.001), 0)
+        self.assertEqual(set(new.stats().values()), {0})
+        self.assertGreater(old.take('a', 1, 0.001), 0)
+
+
+# ------------------------------------------------------------
+# booking event log
+# ------------------------------------------------------------
+
+class EventLogTests(TestCase):
+    def setUp(self):
+        self.user, self.field = User.objects.create_user('player'), make_field()
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def event(self, event_id, **kwargs):
+        return BookingEvent.objects.create(id=event_id, booking_id=1, kind='created', new_value='pending', **kwargs)
+
+    def test_logging_outside_a_transaction_is_refused(self):
+        booking = make_booking(self.user, self.field, self.day)
+        with self.assertRaises(RuntimeError), mock.patch.object(transaction.get_connection(), 'in_atomic_block', False):
+            events.log_created([booking])
+
+    def test_changes_log_one_event_per_transition(self):
+        booking = make_booking(self.user, self.field, self.day, status='pending')
+        booking.status, booking.payment_status = 'approved', 'paid'
+        with transaction.atomic():
+            events.log_changes(booking, old_status='pending', old_payment_status='unpaid', actor=self.user)
+        self.assertEqual(
+            sorted(BookingEvent.objects.values_list('kind', 'old_value', 'new_value')),
+            [('payment', 'unpaid', 'paid'), ('status', 'pending', 'approved')],
+        )
+
+    def test_admin_add_and_edit_are_logged(self):
+        staff = User.objects.create_superuser('staff')
+        request = RequestFactory().post('/admin/')
+        request.user = staff
+        model_admin = BookingAdmin(Booking, site)
+        booking = Booking(user=self.user, field=self.field, date=self.day, start_time=time(18), end_time=time(19),
+                          status='pending', amount=Decimal('1000'))
+        model_admin.save_model(request, booking, None, change=False)
+        booking.status, booking.payment_status = 'approved', 'paid'
+        model_admin.save_model(request, booking, None, change=True)
+
+        self.assertEqual(
+            list(BookingEvent.objects.order_by('id').values_list('kind', 'old_value', 'new_value', 'actor_id')),
+            [('created', '', 'pending', staff.id), ('status', 'pending', 'approved', staff.id),
+             ('payment', 'unpaid', 'paid', staff.id)],
+        )
+
+    def test_consume_resumes_from_the_checkpoint(self):
+        for event_id in (1, 2, 3):
+            self.event(event_id)
+        seen = []
+        self.assertEqual(events.consume('test', lambda batch: seen.extend(e.id for e in batch), batch_size=2), 3)
+        self.assertEqual(events.consume('test', seen.extend), 0)
+        self.assertEqual((seen, EventCheckpoint.objects.get(consumer='test').position), ([1, 2, 3], 3))
+
+    def test_consume_waits_at_a_young_gap_and_skips_an_old_one(self):
+        self.event(1)
+        self.event(3)
+        seen = []
+        self.assertEqual(events.consume('test', lambda batch: seen.extend(e.id for e in batch)), 1)
+
+        BookingEvent.objects.filter(id=3).update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(events.consume('test', lambda batch: seen.extend(e.id for e in batch)), 1)
+        self.assertEqual(seen, [1, 3])
+
+    def test_a_failing_handler_leaves_the_checkpoint(self):
+        self.event(1)
+
+        def fail(batch):
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            events.consume('test', fail)
+        self.assertEqual(EventCheckpoint.objects.filter(consumer='test', position__gt=0).count(), 0)
+
+
+# ------------------------------------------------------------
+# pickup games
+# ------------------------------------------------------------
+
+class PickupGameTests(TestCase):
+    def setUp(self):
+        captain = User.objects.create_user('captain')
+        booking = make_booking(captain, make_field(), timezone.localdate() + timedelta(days=1))
+        self.game = TeamBooking.objects.create(booking=booking, max_players=3)
+        TeamMember.objects.create(team=self.game, user=captain, is_captain=True)
+        self.players = [User.objects.create_user(f'player{i}') for i in range(3)]
+
+    def test_joins_stop_at_max_players(self):
+        pickup.join_game(self.game.id, self.players[0])
+        pickup.join_game(self.game.id, self.players[1])
+        with self.assertRaisesMessage(pickup.JoinRefused, "full"):
+            pickup.join_game(self.game.id, self.players[2])
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.member_count, 3)
+        self.assertFalse(pickup.open_games().filter(pk=self.game.pk).exists())
+
+    def test_the_constraint_refuses_a_join_that_raced_for_the_last_spot(self):
+        pickup.join_game(self.game.id, self.players[0])
+        pickup.join_game(self.game.id, self.players[1])
+        # the open-game check passed before the other join committed
+        with mock.patch.object(pickup, 'open_games', return_value=TeamBooking.objects.all()):
+            with self.assertRaisesMessage(pickup.JoinRefused, "just filled up"):
+                pickup.join_game(self.game.id, self.players[2])
+        self.assertEqual(self.game.members.count(), 3)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TeamMember.objects.create(team=self.game, user=self.players[2])
+
+    def test_joining_twice_and_leaving(self):
+        pickup.join_game(self.game.id, self.players[0])
+        with self.assertRaisesMessage(pickup.JoinRefused, "already in"):
+            pickup.join_game(self.game.id, self.players[0])
+        self.assertTrue(pickup.leave_game(self.game.id, self.players[0]))
+        self.assertFalse(pickup.leave_game(self.game.id, self.game.members.get().user))
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.member_count, 1)
+
+
+# ------------------------------------------------------------
+# tournaments
+# ------------------------------------------------------------
+
+class TournamentScheduleTests(TestCase):
+    def setUp(self):
+        self.field = make_field()
+        TimeSlot.objects.create(field=self.field, start_time=time(10), end_time=time(22))
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.owner = User.objects.create_user('organiser')
+
+    def test_opening_hours_are_cut_into_match_windows_around_busy_time(self):
+        make_booking(self.owner, self.field, self.day, time(13), time(14, 30))
+        holds.place_hold(User.objects.create_user('holder'), self.field, self.day, time(21), time(21, 30))
+
+        windows = tournaments.free_slots([self.field.id], self.day, self.day, match_minutes=90)[self.day]
+        self.assertEqual(sorted((s.strftime('%H:%M'), e.strftime('%H:%M')) for s, e, _ in windows), [
+            ('10:00', '11:30'), ('11:30', '13:00'), ('14:30', '16:00'),
+            ('16:00', '17:30'), ('17:30', '19:00'), ('19:00', '20:30'),
+        ])
+
+    def test_one_long_time_slot_takes_several_fixtures_a_day(self):
+        teams = [Team.objects.create(name=f"Team {i}", owner=self.owner).id for i in range(6)]
+        tournament = tournaments.create_tournament(
+            'Cup', teams, [self.field.id], self.day, self.day + timedelta(days=4), rest_days=0, match_minutes=60,
+        )
+
+        matches = list(tournament.matches.order_by('date', 'start_time'))
+        self.assertEqual(len(matches), 15)
+        self.assertEqual({m.date for m in matches}, {self.day + timedelta(days=k) for k in range(5)})
+        first_day = [(m.start_time, m.end_time) for m in matches if m.date == self.day]
+        self.assertEqual(first_day, [(time(10), time(11)), (time(11), time(12)), (time(12), time(13))])
+
+
+# ------------------------------------------------------------
+# payment reconciliation
+# ------------------------------------------------------------
+
+def gateway_payment(idx, amount, state='completed'):
+    return {'idx': idx, 'amount': int(Decimal(amount) * 100), 'state': state, 'created': None}
+
+
+class ClassifyTests(TestCase):
+    def booking(self, status='approved', payment_status='unpaid', payment_ref='', amount='1000.00'):
+        return {'id': 1, 'status': status, 'payment_status': payment_status,
+                'payment_ref': payment_ref, 'amount': Decimal(amount)}
+
+    def test_findings(self):
+        cases = [
+            (self.booking(), None, 'ok', None),
+            (self.booking(payment_status='paid'), None, 'no_gateway_record', None),
+            (self.booking(payment_status='paid', payment_ref='x'), None, 'not_at_gateway', None),
+            (self.booking(), gateway_payment('x', '1000'), 'missed_callback', 'paid'),
+            (self.booking(payment_status='paid'), gateway_payment('x', '1000'), 'ref_backfilled', None),
+            (self.booking(payment_status='paid', payment_ref='x'), gateway_payment('x', '1000'), 'ok', None),
+            (self.booking(payment_status='paid'), gateway_payment('x', '1000', 'refunded'), 'refunded_at_gateway', 'refunded'),
+            (self.booking(), gateway_payment('x', '900'), 'amount_mismatch', None),
+            (self.booking(), gateway_payment('x', '1000', 'pending'), 'gateway_pending', None),
+            (self.booking(), gateway_payment('x', '1000', 'failed'), 'ok', None),
+        ]
+        for booking, payment, finding, payment_status in cases:
+            with self.subTest(finding=finding, payment=payment):
+                got, fix = reconcile.classify(booking, payment)
+                self.assertEqual(got, finding)
+                self.assertEqual((fix or {}).get('payment_status'), payment_status)
+
+    def test_a_refund_rejects_an_approved_booking(self):
+        _, fix = reconcile.classify(self.booking(payment_status='paid'), gateway_payment('x', '1000', 'refunded'))
+        self.assertEqual(fix, {'payment_status': 'refunded', 'status': 'rejected'})
+
+
+class ReconcileTests(TestCase):
+    def setUp(self):
+        self.user, self.field = User.objects.create_user('player'), make_field()
+        self.day = timezone.localdate() + timedelta(days=2)
+
+    def serve(self, transactions):
+        server = StubGateway(transactions, latency=(0, 0)).server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = reconcile.KhaltiClient(
+            base_url=f"http://127.0.0.1:{server.server_address[1]}/", secret_key='test', timeout=5, retries=0,
+        )
+        self.addCleanup(client.close)
+        return client
+
+    def stub_payment(self, booking, idx, amount=None, refunded=False):
+        return {idx: {
+            'idx': idx, 'amount': int((amount or booking.amount) * 100), 'product_identity': str(booking.id),
+            'created_on': timezone.now().isoformat(), 'refunded': refunded,
+            'state': {'name': 'Refunded' if refunded else 'Completed'},
+        }}
+
+    def test_reconcile_fixes_and_reports_against_the_stub_gateway(self):
+        missed = make_booking(self.user, self.field, self.day, time(8), time(9))
+        refunded = make_booking(self.user, self.field, self.day, time(10), time(11), payment_status='paid', payment_ref='r1')
+        mismatched = make_booking(self.user, self.field, self.day, time(12), time(13))
+        cash = make_booking(self.user, self.field, self.day, time(14), time(15), payment_status='paid')
+        waiting = User.objects.create_user('waiting')
+        waitlist.join_waitlist(waiting, self.field, self.day, time(10), time(11))
+        client = self.serve({
+            **self.stub_payment(missed, 'm1'),
+            **self.stub_payment(refunded, 'r1', refunded=True),
+            **self.stub_payment(mismatched, 'x1', amount=mismatched.amount - 100),
+        })
+
+        report = io.StringIO()
+        counts = reconcile.reconcile(self.day, self.day, client, reconcile.Report(report), batch_size=2, concurrency=2)
+
+        # the booking promoted from the waitlist is checked too, and is 'ok'
+        self.assertEqual(
+            {k: v for k, v in counts.items() if v and k != 'ok'},
+            {'missed_callback': 1, 'refunded_at_gateway': 1, 'amount_mismatch': 1, 'no_gateway_record': 1},
+        )
+        missed.refresh_from_db()
+        refunded.refresh_from_db()
+        self.assertEqual((missed.payment_status, missed.payment_ref), ('paid', 'm1'))
+        self.assertEqual((refunded.status, refunded.payment_status), ('rejected', 'refunded'))
+        self.assertTrue(Booking.objects.filter(user=waiting, status='approved').exists())
+        self.assertEqual(BookingEvent.objects.filter(booking_id__in=[missed.id, refunded.id]).count(), 3)
+        self.assertEqual(
+            sorted(row['finding'] for row in csv.DictReader(io.StringIO(report.getvalue()))),
+            ['amount_mismatch', 'missed_callback', 'no_gateway_record', 'refunded_at_gateway'],
+        )
+        cash.refresh_from_db()
+        self.assertEqual(cash.payment_status, 'paid')
+
+    def test_a_paid_hold_that_never_became_a_booking_is_reported(self):
+        paid = holds.place_hold(self.user, self.field, self.day, time(8), time(9))
+        abandoned = holds.place_hold(self.user, self.field, self.day, time(10), time(11))
+        SlotHold.objects.update(expires_at=timezone.now() - holds.SWEEP_GRACE * 2)
+        holds.sweep_expired()
+        # the callback for `paid` never arrived
+        client = self.serve({'h1': {
+            'idx': 'h1', 'amount': int(paid.amount * 100), 'product_identity': f"hold-{paid.id}",
+            'created_on': timezone.now().isoformat(), 'refunded': False, 'state': {'name': 'Completed'},
+        }})
+
+        report = io.StringIO()
+        counts = reconcile.reconcile(self.day, self.day, client, reconcile.Report(report))
+        self.assertEqual((counts['paid_hold'], counts['ok']), (1, 1))
+        [row] = csv.DictReader(io.StringIO(report.getvalue()))
+        self.assertEqual((row['hold_id'], row['finding'], row['gateway_idx']), (str(paid.id), 'paid_hold', 'h1'))
+        self.assertTrue(SlotHold.objects.filter(pk=abandoned.pk).exists())
+        self.assertFalse(Booking.objects.exists())
+
+        with override_settings(SLOT_HOLD_RETENTION_DAYS=0):
+            holds.sweep_expired()
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_dry_run_changes_nothing(self):
+        missed = make_booking(self.user, self.field, self.day)
+        client = self.serve(self.stub_payment(missed, 'm1'))
+        report = io.StringIO()
+        reconcile.reconcile(self.day, self.day, client, reconcile.Report(report), dry_run=True)
+        missed.refresh_from_db()
+        self.assertEqual(missed.payment_status, 'unpaid')
+        self.assertIn('would fix', report.getvalue())
+
+    def test_apply_skips_rows_changed_since_the_lookup(self):
+        booking = make_booking(self.user, self.field, self.day)
+        seen = {'id': booking.id, 'status': 'approved', 'payment_status': 'unpaid', 'payment_ref': ''}
+        # a late callback got in first
+        Booking.objects.filter(pk=booking.pk).update(payment_status='paid', payment_ref='cb1')
+
+        written = reconcile._apply({booking.id: (seen, {'payment_status': 'paid', 'payment_ref': 'm1'})})
+        self.assertEqual(written, set())
+        booking.refresh_from_db()
+        self.assertEqual(booking.payment_ref, 'cb1')
+        self.assertFalse(BookingEvent.objects.exists())
+
+    def test_an_unreachable_gateway_is_reported_as_unverified(self):
+        booking = make_booking(self.user, self.field, self.day)
+        client = reconcile.KhaltiClient(base_url='http://127.0.0.1:9/', secret_key='test', timeout=1, retries=0)
+        self.addCleanup(client.close)
+        counts = reconcile.reconcile(self.day, self.day, client, reconcile.Report(io.StringIO()))
+        self.assertEqual(counts['unverified'], 1)
+        booking.refresh_from_db()
+        self.assertEqual(booking.payment_status, 'unpaid')
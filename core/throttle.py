@@ -0,0 +1,216 @@
+"""
+Token-bucket rate limiting shared by every worker process on the host.
+
+Buckets live in a fixed-size table in a memory-mapped file
+(settings.THROTTLE_STORE_PATH), so all workers see the same counts without
+a network round trip. Each check hashes the key to a slot and takes a
+byte-range lock on that slot only. The whole check takes a few
+microseconds.
+
+A bucket evicted by a hash collision simply starts full again, which errs
+on the side of letting a request through.
+
+The file header records a layout id, a hash of THROTTLE_STORE_SLOTS and the
+counter names derived from THROTTLE_RATES. A process that finds a different
+layout (or an old file format) builds a fresh file and renames it into
+place, under an exclusive lock on <path>.lock. Workers still running the
+old settings keep their mapping of the old file until they restart, so
+a deploy never truncates a file under them.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process lock
+    fcntl = None
+
+
+MAGIC = b'FTHR0002'
+LAYOUT_SIZE = 8
+# key hash, tokens left, last refill (unix time)
+SLOT = struct.Struct('<Qdd')
+COUNTER = struct.Struct('<Q')
+MAX_COUNTERS = 64
+COUNTERS_OFFSET = len(MAGIC) + LAYOUT_SIZE
+HEADER_SIZE = COUNTERS_OFFSET + MAX_COUNTERS * COUNTER.size
+# slots tried after the home slot before the stalest one is evicted
+PROBES = 4
+
+
+def counter_names():
+    """Stable counter layout, identical in every process: <scope>.<kind>.<allowed|throttled>."""
+    names = []
+    for scope, kinds in sorted(settings.THROTTLE_RATES.items()):
+        for kind in sorted(kinds):
+            names += [f"{scope}.{kind}.allowed", f"{scope}.{kind}.throttled"]
+    return names[:MAX_COUNTERS]
+
+
+def layout_id(slots, names):
+    """LAYOUT_SIZE bytes identifying the slot count and counter layout of a store file."""
+    layout = repr((slots, SLOT.format, MAX_COUNTERS, names)).encode()
+    return hashlib.blake2b(layout, digest_size=LAYOUT_SIZE).digest()
+
+
+class SharedBucketStore:
+    def __init__(self, path, slots):
+        self.slots = slots
+        self.size = HEADER_SIZE + slots * SLOT.size
+        names = counter_names()
+        self.counters = {name: i for i, name in enumerate(names)}
+        self.header = MAGIC + layout_id(slots, names)
+        self._thread_lock = threading.Lock()
+
+        # serializes checking and rebuilding the file across processes
+        lock_fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            if not self._matches():
+                os.close(self.fd)
+                self._rebuild(path)
+                self.fd = os.open(path, os.O_RDWR)
+            self.map = mmap.mmap(self.fd, self.size)
+        finally:
+            os.close(lock_fd)  # releases the flock
+
+    def _matches(self):
+        return (
+            os.fstat(self.fd).st_size == self.size
+            and os.lseek(self.fd, 0, os.SEEK_SET) == 0
+            and os.read(self.fd, len(self.header)) == self.header
+        )
+
+    def _rebuild(self, path):
+        """Put an empty file with this layout at `path`; processes on the old one keep it."""
+        partial = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(partial, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.write(fd, self.header)
+            os.ftruncate(fd, self.size)
+        finally:
+            os.close(fd)
+        os.replace(partial, path)
+
+    def _lock(self, offset, length):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, length, offset)
+
+    def _unlock(self, offset, length):
+        if fcntl is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, length, offset)
+        self._thread_lock.release()
+
+    def take(self, key, capacity, rate):
+        """
+        Take one token from the bucket for `key`.
+        Returns 0 if allowed, otherwise the seconds until a token is available.
+        """
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        home = key_hash % self.slots
+        now = time.time()
+
+        # lock the run of slots this key may live in
+        first = HEADER_SIZE + home * SLOT.size
+        length = min(PROBES, self.slots - home) * SLOT.size
+        self._lock(first, length)
+        try:
+            offset, tokens, stalest = None, float(capacity), None
+            for i in range(length // SLOT.size):
+                pos = first + i * SLOT.size
+                slot_hash, slot_tokens, updated = SLOT.unpack_from(self.map, pos)
+                if slot_hash == key_hash:
+                    offset = pos
+                    tokens = min(capacity, slot_tokens + (now - updated) * rate)
+                    break
+                if stalest is None or updated < stalest[1]:
+                    stalest = (pos, updated)
+            if offset is None:
+                offset = stalest[0]
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            SLOT.pack_into(self.map, offset, key_hash, tokens, now)
+        finally:
+            self._unlock(first, length)
+        return wait
+
+    def incr(self, name):
+        index = self.counters.get(name)
+        if index is None:
+            return
+        pos = COUNTERS_OFFSET + index * COUNTER.size
+        self._lock(pos, COUNTER.size)
+        try:
+            COUNTER.pack_into(self.map, pos, COUNTER.unpack_from(self.map, pos)[0] + 1)
+        finally:
+            self._unlock(pos, COUNTER.size)
+
+    def stats(self):
+        return {
+            name: COUNTER.unpack_from(self.map, COUNTERS_OFFSET + index * COUNTER.size)[0]
+            for name, index in self.counters.items()
+        }
+
+
+_store = None
+_store_pid = None
+
+
+def get_store():
+    """The process-wide store, reopened after a fork."""
+    global _store, _store_pid
+    if _store is None or _store_pid != os.getpid():
+        _store = SharedBucketStore(settings.THROTTLE_STORE_PATH, settings.THROTTLE_STORE_SLOTS)
+        _store_pid = os.getpid()
+    return _store
+
+
+def throttle_stats():
+    return get_store().stats()
+
+
+def throttle(scope):
+    """
+    Rate-limit a view with the token buckets configured in
+    settings.THROTTLE_RATES[scope]: per user when logged in, per IP otherwise.
+    Throttled requests get a 429 with Retry-After.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            rates = settings.THROTTLE_RATES[scope]
+            if request.user.is_authenticated:
+                kind, ident = 'user', request.user.pk
+            else:
+                kind, ident = 'ip', request.META.get('REMOTE_ADDR', '')
+
+            capacity, rate = rates[kind]
+            store = get_store()
+            wait = store.take(f"{scope}:{kind}:{ident}", capacity, rate)
+
+            if wait:
+                store.incr(f"{scope}.{kind}.throttled")
+                response = JsonResponse({'detail': 'Too many requests.'}, status=429)
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+
+            store.incr(f"{scope}.{kind}.allowed")
+            return view_func(request, *args, **kwargs)
+        return _wrapped
+    return decorator
@@ -0,0 +1,27 @@
+import logging
+import time
+
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+
+def render_timed(request, template_name, context, db_ms=None):
+    """
+    render() that reports template render time on its own, as a Server-Timing
+    header (visible in the browser's network panel) and a debug log line.
+
+    Evaluate querysets before calling this and pass the time spent as db_ms,
+    so the template phase measures rendering only.
+    """
+    started = time.perf_counter()
+    response = render(request, template_name, context)
+    template_ms = (time.perf_counter() - started) * 1000
+
+    timings = [f'template;dur={template_ms:.1f};desc="{template_name}"']
+    if db_ms is not None:
+        timings.insert(0, f'db;dur={db_ms:.1f}')
+    response['Server-Timing'] = ', '.join(timings)
+
+    logger.debug("rendered %s in %.1f ms", template_name, template_ms)
+    return response
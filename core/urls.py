@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 from django.contrib.auth import views as auth_views
 
@@ -10,13 +10,16 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('register/', views.register, name='register'),
     path('fields/', views.field_list, name='field_list'),
+    path('api/fields/nearby/', views.nearby_fields_api, name='nearby_fields_api'),
     path('field/<int:field_id>/', views.field_detail, name='field_detail'),
 
     # --------------------------
     # BOOKINGS
     # --------------------------
     path('book/<int:field_id>/', views.book_field, name='book_field'),
+    path('book/<int:field_id>/waitlist/', views.join_waitlist, name='join_waitlist'),
     path('my-bookings/', views.my_bookings, name='my_bookings'),
+    path('checkout/<int:hold_id>/', views.hold_checkout, name='hold_checkout'),
 
     # --------------------------
     # RECEIPTS
@@ -40,6 +43,7 @@ urlpatterns = [
     # ANALYTICS
     # --------------------------
     path('analytics-dashboard/', views.analytics_dashboard, name='analytics_dashboard'),
+    path('forecast-dashboard/', views.forecast_dashboard, name='forecast_dashboard'),
 
     # --------------------------
     # SINGLE FIELD CALENDAR
@@ -52,6 +56,21 @@ urlpatterns = [
     # --------------------------
     path('calendar-all/', views.all_fields_calendar, name='all_fields_calendar'),
     path('api/calendar-all/', views.all_fields_api, name='all_fields_api'),
+    path('api/throttle-stats/', views.throttle_stats_api, name='throttle_stats_api'),
+    path('metrics', views.prometheus_metrics, name='prometheus_metrics'),
+
+    # --------------------------
+    # ICALENDAR FEEDS
+    # --------------------------
+    path('calendar/subscribe/', views.calendar_subscriptions, name='calendar_subscriptions'),
+    path('calendar/feed/<str:token>.ics', views.ics_feed, name='ics_feed'),
+
+    # --------------------------
+    # PROFILING (staff)
+    # --------------------------
+    path('profiling/', views.profiling_index, name='profiling_index'),
+    re_path(r'^profiling/(?P<view_name>[\w.:-]+)\.(?P<fmt>folded|svg)$',
+            views.profiling_download, name='profiling_download'),
 
     # --------------------------
     # PROFILE & ACCOUNT
@@ -69,14 +88,23 @@ urlpatterns = [
 
     path('export-excel/', views.export_bookings_excel, name='export_excel'),
 
+    path("khalti/callback/<int:booking_id>/", views.khalti_callback, name="khalti_callback"),
+    path("khalti/callback/hold/<int:hold_id>/", views.khalti_callback, name="khalti_hold_callback"),
+    path('field/<int:field_id>/review/', views.add_review, name='add_review'),
+    path("teams/", views.team_list, name="team_list"),
+    path("teams/mine/", views.my_teams, name="my_teams"),
+    path("teams/create/", views.create_team, name="create_team"),
+    path("teams/join/<int:team_id>/", views.join_team, name="join_team"),
+    path("teams/leave/<int:team_id>/", views.leave_team, name="leave_team"),
+    path("games/", views.pickup_games, name="pickup_games"),
+    path("games/<int:game_id>/join/", views.join_pickup_game, name="join_pickup_game"),
+    path("games/<int:game_id>/leave/", views.leave_pickup_game, name="leave_pickup_game"),
+    path('matches/', views.match_list, name='match_list'),
+    path('matches/schedule/', views.schedule_match, name='schedule_match'),
+    path('matches/<int:match_id>/score/', views.report_score, name='report_score'),
+    path('matches/fixtures/', views.generate_fixtures, name='generate_fixtures'),
+    path('matches/tournament/<int:tournament_id>/advance/', views.advance_tournament, name='advance_tournament'),
+    path("leaderboard/", views.leaderboard, name="leaderboard"),
+
 ]
-path("khalti/callback/<int:booking_id>/", views.khalti_callback, name="khalti_callback")
-path('field/<int:field_id>/review/', views.add_review, name='add_review'),
-path("teams/", views.my_teams, name="my_teams"),
-path("teams/create/", views.create_team, name="create_team"),
-path("teams/join/<int:team_id>/", views.join_team, name="join_team"),
-path('matches/', views.match_list, name='match_list'),
-path('matches/schedule/', views.schedule_match, name='schedule_match'),
-path('matches/<int:match_id>/score/', views.report_score, name='report_score'),
-path("leaderboard/", views.leaderboard, name="leaderboard"),
 
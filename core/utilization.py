@@ -0,0 +1,273 @@
+"""
+Court utilization by field, weekday and hour of day.
+
+The database collapses approved bookings into one row per
+(field, weekday, start, end) shape with a count. Bookings follow a
+handful of slot times, so that is at most a few thousand rows, even for
+millions of bookings. NumPy then spreads each
+shape's minutes over the hours it covers, weighted by the count, and
+divides by the minutes the field was open (TimeSlot hours times the number
+of times that weekday occurs in the range). No Python loop ever touches an
+individual booking.
+
+Two cache layers keep this cheap for any date range. Finished results are
+cached per range for settings.UTILIZATION_CACHE_SECONDS. Booked minutes
+for each whole past month are cached for
+settings.UTILIZATION_MONTH_CACHE_SECONDS. Both layers are kept per venue,
+and a venue's heatmap reads only its own bookings through the
+venue-leading index. A new range therefore sums cached
+months and only reads the partial months at either end from the database.
+The forget_changed_months booking event consumer drops a month's entry when
+a booking in that month changes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Func, IntegerField
+from django.db.models.functions import ExtractWeekDay
+from django.utils import timezone
+
+from . import metrics
+from .archive import booking_sources
+from .models import Field, TimeSlot
+from .venues import cache_part
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def _minutes_per_hour(np, starts, ends, weights):
+    """
+    Minutes each [start, end) interval (in minutes since midnight) covers in
+    every hour of the day, times its weight. Returns an (n, 24) array.
+    """
+    hour_start = np.arange(24) * 60
+    overlap = (
+        np.minimum(ends[:, None], hour_start + 60)
+        - np.maximum(starts[:, None], hour_start)
+    )
+    return np.clip(overlap, 0, 60) * weights[:, None]
+
+
+class WeekdayNumber(Func):
+    """
+    Day of the week, Sunday=1 .. Saturday=7, like ExtractWeekDay. On SQLite
+    it uses the built-in strftime(). Django's extract helper there is a
+    Python function called once per row, and it dominated the query on large
+    booking tables.
+    """
+    arity = 1
+    output_field = IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return compiler.compile(ExtractWeekDay(self.get_source_expressions()[0]))
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template="(CAST(strftime('%%%%w', %(expressions)s) AS INTEGER) + 1)",
+            **extra_context,
+        )
+
+
+def _booking_shapes(start_date, end_date, venue_id=None):
+    """(field_id, weekday Sunday=1, start, end, count) rows from every booking table."""
+    rows = []
+    for bookings in booking_sources():
+        if venue_id is not None:
+            bookings = bookings.filter(venue_id=venue_id)
+        rows += (
+            bookings.filter(status='approved', date__gte=start_date, date__lte=end_date)
+            .annotate(wd=WeekdayNumber('date'))
+            .values_list('field_id', 'wd', 'start_time', 'end_time')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+    return rows
+
+
+def _booked_minutes(np, start_date, end_date, venue_id=None):
+    """{field_id: (7, 24) array of approved booked minutes} between the dates (inclusive)."""
+    shapes = np.array(
+        [
+            (field_id, (wd + 5) % 7, s.hour * 60 + s.minute, e.hour * 60 + e.minute, n)
+            for field_id, wd, s, e, n in _booking_shapes(start_date, end_date, venue_id)
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 5)
+    if not len(shapes):
+        return {}
+
+    field_ids, field_idx = np.unique(shapes[:, 0], return_inverse=True)
+    grid = np.zeros((len(field_ids), 7, 24))
+    minutes = _minutes_per_hour(np, shapes[:, 2], shapes[:, 3], shapes[:, 4])
+    np.add.at(grid, (field_idx, shapes[:, 1]), minutes)
+    return dict(zip(field_ids.tolist(), grid))
+
+
+def _month_key(venue_id, month):
+    return f"utilization:month:{cache_part(venue_id)}:{month}"
+
+
+def _closed_month_minutes(np, first_day, last_day, refresh, venue_id=None):
+    """_booked_minutes() for a whole past month of one venue (None: all venues), cached."""
+    key = _month_key(venue_id, f"{first_day:%Y-%m}")
+    minutes = None if refresh else metrics.cache_lookup('utilization_month', cache.get(key))
+    if minutes is None:
+        minutes = _booked_minutes(np, first_day, last_day, venue_id)
+        cache.set(key, minutes, settings.UTILIZATION_MONTH_CACHE_SECONDS)
+    return minutes
+
+
+def _range_pieces(start_date, end_date):
+    """
+    Split the range into (first, last, closed) pieces: whole calendar months
+    that ended before the current month (closed), and the stretches in
+    between (consecutive ones merged).
+    """
+    this_month = timezone.localdate().replace(day=1)
+    pieces = []
+    day = start_date
+    while day <= end_date:
+        month_last = (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        last = min(month_last, end_date)
+        closed = day.day == 1 and last == month_last and month_last < this_month
+        if not closed and pieces and not pieces[-1][2]:
+            pieces[-1] = (pieces[-1][0], last, False)
+        else:
+            pieces.append((day, last, closed))
+        day = last + timedelta(days=1)
+    return pieces
+
+
+def compute_utilization(start_date, end_date, refresh=False, venue_id=None):
+    """
+    Booked minutes and occupancy for every field of a venue (None: every
+    field) between start_date and end_date (inclusive).
+
+    Whole past months come from a per-month cache (recomputed when
+    refresh=True), so only the partial months at either end of the range
+    are read from the database.
+
+    Returns {'fields': [(id, name)], 'booked_hours': (F, 7, 24) array,
+    'occupancy': (F, 7, 24) array, NaN where the field was closed,
+    'field_occupancy': (F,) array over the whole range}.
+    """
+    import numpy as np
+
+    fields = Field.objects.all() if venue_id is None else Field.objects.filter(venue_id=venue_id)
+    fields = list(fields.order_by('name').values_list('id', 'name'))
+    index = {field_id: i for i, (field_id, _) in enumerate(fields)}
+    booked = np.zeros((len(fields), 7, 24))
+
+    for first, last, closed in _range_pieces(start_date, end_date):
+        if closed:
+            minutes = _closed_month_minutes(np, first, last, refresh, venue_id)
+        else:
+            minutes = _booked_minutes(np, first, last, venue_id)
+        for field_id, grid in minutes.items():
+            if field_id in index:
+                booked[index[field_id]] += grid
+
+    # open minutes per field and hour; TimeSlots are the same every day
+    open_minutes = np.zeros((len(fields), 24))
+    slots = np.array(
+        [
+            (index[field_id], s.hour * 60 + s.minute, e.hour * 60 + e.minute)
+            for field_id, s, e in TimeSlot.objects.filter(field_id__in=index)
+            .values_list('field_id', 'start_time', 'end_time')
+            if field_id in index
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    if len(slots):
+        np.add.at(open_minutes, slots[:, 0], _minutes_per_hour(np, slots[:, 1], slots[:, 2], np.ones(len(slots))))
+    open_minutes = np.minimum(open_minutes, 60)
+
+    # how often each weekday occurs in the range
+    days = np.arange(np.datetime64(start_date), np.datetime64(end_date) + 1)
+    weekday_counts = np.bincount((days.astype(np.int64) + 3) % 7, minlength=7)  # 1970-01-01 was a Thursday
+
+    capacity = open_minutes[:, None, :] * weekday_counts[None, :, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        occupancy = np.where(capacity > 0, np.minimum(booked / capacity, 1.0), np.nan)
+        # bookings outside opening hours do not count towards the field total
+        in_hours = np.minimum(booked, capacity).sum(axis=(1, 2))
+        field_capacity = capacity.sum(axis=(1, 2))
+        field_occupancy = np.where(field_capacity > 0, in_hours / field_capacity, np.nan)
+
+    return {
+        'fields': fields,
+        'booked_hours': booked / 60,
+        'occupancy': occupancy,
+        'field_occupancy': field_occupancy,
+    }
+
+
+def utilization(start_date, end_date, refresh=False, venue_id=None):
+    """compute_utilization() through the cache; refresh=True recomputes."""
+    key = f"utilization:{cache_part(venue_id)}:{start_date.isoformat()}:{end_date.isoformat()}"
+    result = None if refresh else metrics.cache_lookup('utilization', cache.get(key))
+    if result is None:
+        result = compute_utilization(start_date, end_date, refresh=refresh, venue_id=venue_id)
+        cache.set(key, result, settings.UTILIZATION_CACHE_SECONDS)
+    return result
+
+
+def heatmap_rows(result):
+    """
+    Template-friendly view of a utilization result: per field, one row per
+    weekday with (booked hours, occupancy %) cells for the hours the field
+    is open or was booked.
+    """
+    import numpy as np
+
+    booked, occupancy = result['booked_hours'], result['occupancy']
+    used = (booked.sum(axis=(0, 1)) > 0) | ~np.isnan(occupancy).all(axis=(0, 1))
+    hours = [int(h) for h in np.flatnonzero(used)]
+
+    tables = []
+    for i, (field_id, name) in enumerate(result['fields']):
+        rows = []
+        for d, label in enumerate(WEEKDAYS):
+            cells = []
+            for h in hours:
+                share = occupancy[i, d, h]
+                closed = np.isnan(share)
+                cells.append({
+                    'hours': round(float(booked[i, d, h]), 1),
+                    'pct': None if closed else round(float(share) * 100),
+                    'alpha': None if closed else f"{float(share):.2f}",
+                })
+            rows.append({'weekday': label, 'cells': cells})
+        total = result['field_occupancy'][i]
+        tables.append({
+            'id': field_id, 'name': name, 'rows': rows,
+            'occupancy': None if np.isnan(total) else round(float(total) * 100),
+        })
+    return {'hours': hours, 'fields': tables}
+
+
+def default_range():
+    end = timezone.localdate()
+    return end - timedelta(days=settings.UTILIZATION_DEFAULT_DAYS - 1), end
+
+
+def forget_changed_months(events):
+    """
+    Booking event consumer: drop the cached minutes of every month in which
+    a booking was created or changed status, so closed months edited after
+    the fact are recomputed on the next read.
+    """
+    changed = [event.data for event in events
+               if event.kind in ('created', 'status') and event.data.get('date')]
+    # events logged before venues existed carry no venue_id
+    missing = {data['field_id'] for data in changed if 'venue_id' not in data}
+    field_venues = dict(Field.objects.filter(id__in=missing).values_list('id', 'venue_id')) if missing else {}
+    keys = set()
+    for data in changed:
+        month = data['date'][:7]
+        venue_id = data['venue_id'] if 'venue_id' in data else field_venues.get(data['field_id'])
+        keys.add(_month_key(venue_id, month))
+        keys.add(_month_key(None, month))
+    cache.delete_many(list(keys))
@@ -0,0 +1,71 @@
+"""
+Venue scoping for staff pages.
+
+Staff members manage the venues they are listed on (Venue.staff); superusers
+manage every venue. Staff pages work on one venue at a time, picked with
+?venue=<id> and remembered in the session, so their queries filter on the
+venue column that leads the Booking and Field indexes. Superusers can also
+pick ?venue=all for the whole company.
+"""
+from django.core.exceptions import PermissionDenied
+
+from .models import Booking, Venue
+
+SESSION_KEY = 'venue_id'
+
+
+def staff_venues(user):
+    """Venues `user` may manage."""
+    if user.is_superuser:
+        return Venue.objects.all()
+    return Venue.objects.filter(staff=user)
+
+
+def staff_bookings(user, queryset=None):
+    """`queryset` (all bookings by default; archived ones work too) cut down to the venues `user` manages."""
+    queryset = Booking.objects.all() if queryset is None else queryset
+    if user.is_superuser:
+        return queryset
+    return queryset.filter(venue__staff=user)
+
+
+def current_venue(request):
+    """
+    (venue, venues) for a staff page: the venue picked by ?venue= or earlier
+    in the session, else the user's first one, and every venue they may pick.
+    venue is None when a superuser picked all venues, or none exist yet.
+    """
+    user = request.user
+    venues = list(staff_venues(user))
+    if not venues:
+        if user.is_superuser:
+            return None, venues
+        raise PermissionDenied("You do not manage any venue.")
+
+    wanted = request.GET.get('venue') or request.session.get(SESSION_KEY)
+    if wanted == 'all' and user.is_superuser:
+        request.session[SESSION_KEY] = 'all'
+        return None, venues
+    venue = next((v for v in venues if str(v.id) == str(wanted)), venues[0])
+    request.session[SESSION_KEY] = venue.id
+    return venue, venues
+
+
+def requested_venue(request):
+    """The Venue picked with ?venue=<id> on a public page, or None for all venues."""
+    wanted = request.GET.get('venue', '')
+    return Venue.objects.filter(id=wanted).first() if wanted.isdigit() else None
+
+
+def for_venue(queryset, venue):
+    """Filter a Booking, ArchivedBooking or Field queryset to `venue` (None: no filter)."""
+    return queryset if venue is None else queryset.filter(venue=venue)
+
+
+def venue_id(venue):
+    return None if venue is None else venue.id
+
+
+def cache_part(venue_id):
+    """A venue id's part of a cache key."""
+    return 'all' if venue_id is None else str(venue_id)
@@ -0,0 +1,28 @@
+"""
+Views, split by feature.
+
+Heavy libraries (pdfkit, openpyxl, qrcode, requests) are imported inside the
+views that use them, so importing this package stays cheap for every worker
+boot and manage.py command. `python manage.py bench_startup` guards that.
+"""
+from .public import home, register, field_list, field_detail, nearby_fields_api, profile_view
+from .bookings import book_field, join_waitlist, my_bookings, hold_checkout
+from .receipts import booking_receipt, admin_receipt, booking_receipt_pdf, generate_qr_base64
+from .staff import (
+    admin_dashboard, update_booking_status, update_payment_status, export_bookings_excel, throttle_stats_api,
+    profiling_index, profiling_download, prometheus_metrics,
+)
+from .analytics import analytics_dashboard, forecast_dashboard
+from .calendar import (
+    availability_calendar, availability_api, all_fields_calendar, all_fields_api,
+    calendar_subscriptions, ics_feed,
+)
+from .payments import khalti_callback
+from .reviews import add_review
+from .teams import (
+    my_teams, team_list, create_team, join_team, leave_team,
+    pickup_games, join_pickup_game, leave_pickup_game,
+)
+from .matches import (
+    schedule_match, match_list, report_score, leaderboard, generate_fixtures, advance_tournament,
+)
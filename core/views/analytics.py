@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.utils import timezone
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from ..db_router import reporting_view
+from ..archive import booking_sources
+from ..utilization import utilization, heatmap_rows, default_range
+from ..forecasting import cached_forecast_table
+from ..venues import current_venue, for_venue, venue_id
+
+
+# ============================================================
+# ANALYTICS DASHBOARD
+# ============================================================
+
+@staff_member_required
+@reporting_view
+def analytics_dashboard(request):
+    venue, venues = current_venue(request)
+
+    # live and archived bookings of the venue together
+    total_revenue = 0
+    total_bookings = 0
+    approved_bookings = 0
+    monthly = {}
+
+    for bookings in booking_sources():
+        bookings = for_venue(bookings, venue)
+        total_revenue += bookings.filter(payment_status='paid').aggregate(Sum('amount'))['amount__sum'] or 0
+        total_bookings += bookings.count()
+        approved_bookings += bookings.filter(status='approved').count()
+
+        rows = (
+            bookings.filter(payment_status='paid')
+            .annotate(month=TruncMonth('date'))
+            .values('month')
+            .annotate(total=Sum('amount'))
+        )
+        for m in rows:
+            monthly[m['month']] = monthly.get(m['month'], 0) + m['total']
+
+    # utilization heatmap for ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: last few weeks)
+    start, end = default_range()
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else start
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else end
+    except ValueError:
+        messages.error(request, "⚠️ Dates must be YYYY-MM-DD.")
+        start, end = default_range()
+    if end < start:
+        messages.error(request, "⚠️ The end date must not be before the start date.")
+        start, end = default_range()
+    # the grid and the booking scan grow with the range
+    max_days = settings.UTILIZATION_MAX_DAYS
+    if (end - start).days >= max_days:
+        messages.warning(request, f"Showing the last {max_days} days of the range; pick a shorter one to see more.")
+        start = end - timedelta(days=max_days - 1)
+    heatmap = heatmap_rows(utilization(start, end, refresh=bool(request.GET.get('refresh')),
+                                       venue_id=venue_id(venue)))
+
+    labels = [month.strftime("%b %Y") for month in sorted(monthly)]
+    data = [float(monthly[month]) for month in sorted(monthly)]
+
+    return render(request, 'analytics_dashboard.html', {
+        'venue': venue,
+        'venues': venues,
+        'total_revenue': total_revenue,
+        'total_bookings': total_bookings,
+        'approved_bookings': approved_bookings,
+        'labels': labels,
+        'data': data,
+        'heatmap': heatmap,
+        'heatmap_start': start,
+        'heatmap_end': end,
+    })
+
+
+@staff_member_required
+def forecast_dashboard(request):
+    venue, venues = current_venue(request)
+    # written by `manage.py refresh_forecasts`
+    table = cached_forecast_table(timezone.localdate(), venue_id=venue_id(venue))
+    return render(request, 'forecast_dashboard.html', {'forecast': table, 'venue': venue, 'venues': venues})
@@ -0,0 +1,175 @@
+from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+from django.utils.http import urlencode
+
+from ..models import Field, Booking, SlotHold, Team
+from ..timing import render_timed
+from .. import events, holds, metrics, waitlist
+
+import time
+from datetime import datetime
+from decimal import Decimal
+
+
+# ============================================================
+# BOOKING SYSTEM
+# ============================================================
+
+@login_required
+def book_field(request, field_id):
+    field = get_object_or_404(Field, id=field_id)
+
+    initial = {
+        'date': request.GET.get('date', ''),
+        'start': request.GET.get('start', ''),
+        'end': request.GET.get('end', ''),
+    }
+
+    user_teams = request.user.teams.all()  # 🆕 teams user belongs to
+
+    if request.method == 'POST':
+        date = request.POST.get('date')
+        start_time = request.POST.get('start_time')
+        end_time = request.POST.get('end_time')
+        team_id = request.POST.get('team_id')  # 🆕 from dropdown (optional)
+
+        team = None
+        if team_id:
+            team = get_object_or_404(Team, id=team_id, members=request.user)
+
+        # conflict check... (approved bookings, and slots someone else is paying for)
+        conflict = Booking.objects.filter(
+            field=field,
+            date=date,
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+            status='approved'
+        ).exists() or holds.overlapping_holds(field.id, date, start_time, end_time, exclude_user=request.user).exists()
+
+        if conflict:
+            metrics.BOOKING_CONFLICTS.inc(source='web')
+            messages.error(request, "⚠️ This field is already booked for that time slot.")
+            # offer a place in the queue for exactly this slot instead
+            return render(request, 'book_field.html', {
+                'field': field,
+                'initial': {'date': date, 'start': start_time, 'end': end_time},
+                'user_teams': user_teams,
+                'waitlist_offer': {'date': date, 'start_time': start_time, 'end_time': end_time, 'team_id': team_id or ''},
+            })
+
+        # compute price...
+        start_dt = datetime.fromisoformat(f"{date} {start_time}")
+        end_dt = datetime.fromisoformat(f"{date} {end_time}")
+
+        if end_dt <= start_dt:
+            messages.error(request, "⚠️ End time must be after start time.")
+            return redirect('book_field', field_id=field.id)
+
+        if request.POST.get('action') == 'pay':
+            # reserve the slot while the player pays; khalti_callback books it
+            try:
+                hold = holds.place_hold(request.user, field, start_dt.date(), start_dt.time(), end_dt.time(), team=team)
+            except holds.SlotTaken as exc:
+                messages.error(request, f"⚠️ {exc}")
+                return redirect('book_field', field_id=field.id)
+            return redirect('hold_checkout', hold_id=hold.id)
+
+        duration_hours = Decimal((end_dt - start_dt).seconds) / Decimal(3600)
+        amount = (duration_hours * Decimal(field.price_per_hour)).quantize(Decimal("0.01"))
+
+        with transaction.atomic():
+            booking = Booking.objects.create(
+                user=request.user,
+                field=field,
+                date=date,
+                start_time=start_time,
+                end_time=end_time,
+                status='pending',
+                amount=amount,
+                payment_status='unpaid',
+                team=team  # 🆕 save team
+            )
+            events.log_created([booking], actor=request.user)
+
+        # if you’re using email helper:
+        # send_booking_email(booking, 'created')
+
+        messages.success(request, f"Booking submitted! Amount: Rs. {amount}. Awaiting approval.")
+        return redirect('my_bookings')
+
+    return render(request, 'book_field.html', {
+        'field': field,
+        'initial': initial,
+        'user_teams': user_teams,  # 🆕 send teams to template
+    })
+
+@login_required
+def join_waitlist(request, field_id):
+    field = get_object_or_404(Field, id=field_id)
+    if request.method != 'POST':
+        return redirect('book_field', field_id=field.id)
+
+    team_id = request.POST.get('team_id')
+    team = None
+    if team_id:
+        team = get_object_or_404(Team, id=team_id, members=request.user)
+
+    try:
+        date = parse_date(request.POST.get('date', ''))
+        start_time = parse_time(request.POST.get('start_time', ''))
+        end_time = parse_time(request.POST.get('end_time', ''))
+    except ValueError:
+        date = start_time = end_time = None
+    if not (date and start_time and end_time) or end_time <= start_time:
+        messages.error(request, "⚠️ Pick a valid date and time range.")
+        return redirect('book_field', field_id=field.id)
+    if date < timezone.localdate():
+        messages.error(request, "⚠️ That date has already passed.")
+        return redirect('book_field', field_id=field.id)
+    # the queue is for taken slots only; a free one can simply be booked
+    if not holds.slot_taken(field.id, date, start_time, end_time, request.user):
+        messages.info(request, "This slot is free, so you can book it right away.")
+        return redirect(
+            f"{reverse('book_field', args=[field.id])}?"
+            f"{urlencode({'date': date, 'start': start_time.strftime('%H:%M'), 'end': end_time.strftime('%H:%M')})}"
+        )
+
+    entry = waitlist.join_waitlist(request.user, field, date, start_time, end_time, team=team)
+    messages.success(
+        request,
+        f"You're #{waitlist.queue_position(entry)} on the waitlist. "
+        "If the slot frees up it will be booked for you and you'll get an email.",
+    )
+    return redirect('my_bookings')
+
+
+@login_required
+def my_bookings(request):
+    started = time.perf_counter()
+    bookings = list(
+        Booking.objects.filter(user=request.user)
+        .select_related('field', 'team')
+        .order_by('-date', '-start_time')
+    )
+    db_ms = (time.perf_counter() - started) * 1000
+    return render_timed(request, 'my_bookings.html', {'bookings': bookings}, db_ms=db_ms)
+
+
+@login_required
+def hold_checkout(request, hold_id):
+    hold = (
+        SlotHold.objects.filter(id=hold_id, user=request.user, expires_at__gt=timezone.now())
+        .select_related('field').first()
+    )
+    if hold is None:
+        messages.error(request, "⚠️ Your hold on this slot has expired. Please pick the slot again.")
+        return redirect('my_bookings')
+    return render(request, 'hold_checkout.html', {
+        'hold': hold,
+        'seconds_left': int((hold.expires_at - timezone.now()).total_seconds()),
+    })
@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.shortcuts import render, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
+
+from .. import ics
+from ..models import Field, Booking, Team, Venue
+from ..holds import active_holds
+from ..throttle import throttle
+from ..venues import for_venue, requested_venue
+
+
+# ============================================================
+# CALENDAR – SINGLE FIELD
+# ============================================================
+
+HOLD_COLOR = "#adb5bd"
+
+
+def _hold_events(holds):
+    # slots being paid for right now (core/holds.py) are taken until they expire
+    return [{
+        "id": f"hold-{h['id']}",
+        "title": f"{h['field__name']} (held)",
+        "start": f"{h['date']}T{h['start_time']}",
+        "end": f"{h['date']}T{h['end_time']}",
+        "color": HOLD_COLOR,
+    } for h in holds.values('id', 'field__name', 'date', 'start_time', 'end_time')]
+
+
+@login_required
+def availability_calendar(request, field_id):
+    field = get_object_or_404(Field, id=field_id)
+    return render(request, 'availability_calendar.html', {'field': field})
+
+
+@require_GET
+@throttle('calendar_api')
+def availability_api(request, field_id):
+    field = get_object_or_404(Field, id=field_id)
+
+    qs = Booking.objects.filter(field=field)
+    qs = qs.filter(status__in=['approved', 'pending']) if request.user.is_staff else qs.filter(status='approved')
+
+    events = [{
+        "id": b.id,
+        "title": f"{b.field.name}",
+        "start": f"{b.date}T{b.start_time}",
+        "end": f"{b.date}T{b.end_time}",
+        "color": "#28a745" if b.status == "approved" else "#ffc107",
+    } for b in qs]
+    events += _hold_events(active_holds().filter(field=field))
+
+    return JsonResponse(events, safe=False)
+
+
+# ============================================================
+# CALENDAR – ALL FIELDS COMBINED
+# ============================================================
+
+@login_required
+def all_fields_calendar(request):
+    venue = requested_venue(request)
+    fields = for_venue(Field.objects.order_by('name'), venue)
+    return render(request, 'all_fields_calendar.html', {
+        'fields': fields, 'venue': venue, 'venues': Venue.objects.all(),
+    })
+
+
+@require_GET
+@throttle('calendar_api')
+def all_fields_api(request):
+    venue = requested_venue(request)
+    qs = for_venue(Booking.objects, venue)
+    qs = qs.filter(status__in=['approved', 'pending']) if request.user.is_staff else qs.filter(status='approved')
+    # FullCalendar asks for the visible range only (?start=&end=, ISO datetimes)
+    try:
+        start, end = (parse_date(request.GET.get(k, '')[:10]) for k in ('start', 'end'))
+    except ValueError:
+        start = end = None
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+
+    colors = ["#1abc9c", "#3498db", "#9b59b6", "#f39c12", "#e74c3c", "#2ecc71", "#34495e"]
+
+    events = [{
+        "id": b['id'],
+        "title": b['field__name'],
+        "start": f"{b['date']}T{b['start_time']}",
+        "end": f"{b['date']}T{b['end_time']}",
+        "color": colors[(b['field_id'] - 1) % len(colors)],
+    } for b in qs.values('id', 'field_id', 'field__name', 'date', 'start_time', 'end_time')]
+
+    held = active_holds() if venue is None else active_holds().filter(field__venue=venue)
+    if start:
+        held = held.filter(date__gte=start)
+    if end:
+        held = held.filter(date__lte=end)
+    events += _hold_events(held)
+
+    return JsonResponse(events, safe=False)
+
+
+# ============================================================
+# ICALENDAR FEEDS
+# ============================================================
+
+@login_required
+def calendar_subscriptions(request):
+    user = request.user
+    teams = Team.objects.filter(Q(owner=user) | Q(members=user)).distinct().order_by('name')
+    fields = Field.objects.filter(booking__user=user).distinct().order_by('name')
+
+    def feed_url(kind, object_id):
+        url = request.build_absolute_uri(reverse('ics_feed', args=[ics.feed_token(kind, object_id)]))
+        return url.replace('https://', 'webcal://', 1).replace('http://', 'webcal://', 1)
+
+    return render(request, 'calendar_subscriptions.html', {
+        'my_feed': feed_url('user', user.id),
+        'team_feeds': [(team, feed_url('team', team.id)) for team in teams],
+        'field_feeds': [(field, feed_url('field', field.id)) for field in fields],
+        'past_days': settings.ICS_PAST_DAYS,
+        'future_days': settings.ICS_FUTURE_DAYS,
+    })
+
+
+@require_GET
+def ics_feed(request, token):
+    feed = ics.read_token(token)
+    if feed is None:
+        raise Http404("Unknown calendar feed.")
+    kind, object_id = feed
+
+    # one query decides between 304, a cached payload and a rebuild
+    changed_at = ics.version(kind, object_id)
+    modified = ics.last_modified(changed_at)
+    etag = quote_etag(f"{kind}-{object_id}-{modified.timestamp():.6f}")
+    response = get_conditional_response(request, etag=etag, last_modified=int(modified.timestamp()))
+    if response is None:
+        response = HttpResponse(ics.cached_feed(kind, object_id, changed_at), content_type=ics.CONTENT_TYPE)
+        response['Content-Disposition'] = f'inline; filename="{kind}-{object_id}.ics"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified.timestamp())
+    patch_cache_control(response, private=True, max_age=300)
+    return response
@@ -0,0 +1,127 @@
+from datetime import date
+
+from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.urls import reverse
+
+from .. import tournaments
+from ..models import Field, Team, Match, Tournament
+from ..db_router import reporting_view
+from ..venues import current_venue, for_venue
+
+
+@login_required
+def schedule_match(request):
+    teams = Team.objects.all()
+    fields = Field.objects.all()
+
+    if request.method == "POST":
+        team_a = Team.objects.get(id=request.POST.get("team_a"))
+        team_b = Team.objects.get(id=request.POST.get("team_b"))
+        field = Field.objects.get(id=request.POST.get("field"))
+
+        date = request.POST.get("date")
+        start = request.POST.get("start_time")
+        end = request.POST.get("end_time")
+
+        if team_a == team_b:
+            messages.error(request, "A team cannot challenge itself.")
+            return redirect("schedule_match")
+        
+        Match.objects.create(
+            team_a=team_a,
+            team_b=team_b,
+            field=field,
+            date=date,
+            start_time=start,
+            end_time=end,
+            status="scheduled"
+        )
+
+        messages.success(request, "Match scheduled successfully!")
+        return redirect("match_list")
+
+    return render(request, "schedule_match.html", {"teams": teams, "fields": fields})
+def match_list(request):
+    matches = Match.objects.select_related('team_a', 'team_b', 'field').order_by('-date', '-start_time')
+    tournament = None
+    if request.GET.get('tournament', '').isdigit():
+        tournament = get_object_or_404(Tournament, id=request.GET['tournament'])
+        matches = matches.filter(tournament=tournament).order_by('round', 'group', 'date', 'start_time')
+    return render(request, 'match_list.html', {'matches': matches, 'tournament': tournament})
+
+@login_required
+def report_score(request, match_id):
+    match = get_object_or_404(Match, id=match_id)
+
+    if request.method == "POST":
+        match.score_a = int(request.POST.get("score_a"))
+        match.score_b = int(request.POST.get("score_b"))
+        match.status = "completed"
+        match.save()
+
+        messages.success(request, "Match result submitted!")
+        return redirect("match_list")
+
+    return render(request, "report_score.html", {"match": match})
+
+@reporting_view
+def leaderboard(request):
+    teams = Team.objects.all()
+    teams = sorted(teams, key=lambda t: t.points(), reverse=True)
+    return render(request, "leaderboard.html", {"teams": teams})
+
+
+# ------------------------------------------------------------
+# TOURNAMENT FIXTURES
+# ------------------------------------------------------------
+
+@staff_member_required
+def generate_fixtures(request):
+    venue, venues = current_venue(request)
+    fields = for_venue(Field.objects.order_by('name'), venue)
+    teams = Team.objects.order_by('name')
+
+    if request.method == 'POST':
+        post = request.POST
+        try:
+            # only fields of the venue being managed
+            field_ids = fields.filter(id__in=[int(i) for i in post.getlist('fields')]).values_list('id', flat=True)
+            tournament = tournaments.create_tournament(
+                post.get('name', '').strip() or "Tournament",
+                [int(team_id) for team_id in post.getlist('teams')],
+                list(field_ids),
+                date.fromisoformat(post.get('start', '')), date.fromisoformat(post.get('end', '')),
+                format=post.get('format', 'league'), double=bool(post.get('double')),
+                groups=int(post.get('groups') or 4), rest_days=int(post.get('rest_days') or 0),
+                match_minutes=int(post.get('match_minutes') or tournaments.DEFAULT_MATCH_MINUTES),
+                created_by=request.user,
+            )
+        except ValueError:
+            messages.error(request, "⚠️ Fill in valid dates and numbers.")
+        except tournaments.FixtureError as exc:
+            messages.error(request, f"⚠️ {exc}")
+        else:
+            messages.success(request, f"{tournament.matches.count()} matches scheduled for {tournament.name}.")
+            return redirect(f"{reverse('match_list')}?tournament={tournament.id}")
+
+    return render(request, 'generate_fixtures.html', {
+        'teams': teams, 'fields': fields, 'venue': venue, 'venues': venues,
+        'formats': Tournament.FORMAT_CHOICES, 'form': request.POST,
+        'picked_teams': request.POST.getlist('teams'), 'picked_fields': request.POST.getlist('fields'),
+    })
+
+
+@staff_member_required
+def advance_tournament(request, tournament_id):
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    if request.method == 'POST':
+        try:
+            matches = tournaments.advance_knockout(tournament)
+        except tournaments.FixtureError as exc:
+            messages.error(request, f"⚠️ {exc}")
+        else:
+            messages.success(request, f"Next knockout round scheduled: {len(matches)} matches.")
+    return redirect(f"{reverse('match_list')}?tournament={tournament.id}")
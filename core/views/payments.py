@@ -0,0 +1,79 @@
+import json
+import time
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from .. import events, holds, metrics
+from ..models import Booking, SlotHold
+
+
+def _verify_khalti(token, amount):
+    import requests
+
+    # Khalti verification endpoint
+    url = f"{settings.KHALTI_API_URL}payment/verify/"
+    payload = {
+        "token": token,
+        "amount": amount
+    }
+    headers = {
+        "Authorization": f"Key {settings.KHALTI_SECRET_KEY}"
+    }
+
+    started = time.perf_counter()
+    try:
+        response = requests.post(url, payload, headers=headers).json()
+    except (requests.RequestException, ValueError):
+        metrics.KHALTI_VERIFICATIONS.inc(outcome='error')
+        raise
+    finally:
+        metrics.KHALTI_SECONDS.observe(time.perf_counter() - started)
+
+    verified = bool(response.get("idx"))
+    metrics.KHALTI_VERIFICATIONS.inc(outcome='verified' if verified else 'rejected')
+    return verified, response
+
+
+@csrf_exempt
+@login_required
+def khalti_callback(request, booking_id=None, hold_id=None):
+    # paying for an existing booking, or for a held slot (booked once paid)
+    if hold_id is not None:
+        hold = get_object_or_404(SlotHold, id=hold_id, user=request.user)
+    else:
+        booking = get_object_or_404(Booking, id=booking_id, user=request.user)
+
+    data = json.loads(request.body)
+    token = data.get("token")
+    amount = data.get("amount")
+
+    verified, response = _verify_khalti(token, amount)
+    if not verified:
+        return JsonResponse({"success": False, "error": response})
+
+    if hold_id is not None:
+        if response.get("amount") != int(hold.amount * 100):
+            return JsonResponse({"success": False, "error": "Paid amount does not match the booking."})
+        booking = holds.convert_hold(hold.id, request.user, payment_ref=response["idx"])
+        if booking is None:
+            return JsonResponse({
+                "success": False,
+                "error": "The slot was taken before the payment completed. The payment will be refunded.",
+            })
+        return JsonResponse({"success": True, "booking_id": booking.id})
+
+    old_payment_status = booking.payment_status
+    booking.payment_status = "paid"
+    booking.payment_date = timezone.now()
+    # the gateway's transaction id, which reconcile_payments audits
+    booking.payment_ref = response["idx"][:64]
+    with transaction.atomic():
+        booking.save()
+        events.log_changes(booking, old_payment_status=old_payment_status, actor=request.user)
+    return JsonResponse({"success": True})
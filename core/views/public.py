@@ -0,0 +1,133 @@
+from datetime import date, time
+
+from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth import login
+
+from ..models import Field, Venue
+from ..forms import ProfileForm
+from ..search import search_fields
+from ..geo import available_between, fields_within, nearest_fields
+from ..throttle import throttle
+from ..venues import for_venue, requested_venue
+
+REVIEWS_PER_PAGE = 10
+
+# ============================================================
+# PUBLIC PAGES
+# ============================================================
+
+def home(request):
+    return render(request, 'home.html')
+
+
+def register(request):
+    if request.method == 'POST':
+        form = UserCreationForm(request.POST)
+        if form.is_valid():
+            user = form.save()
+            login(request, user)
+            messages.success(request, "Account created successfully!")
+            return redirect('home')
+        else:
+            messages.error(request, "Please correct the errors below.")
+    else:
+        form = UserCreationForm()
+
+    return render(request, 'register.html', {'form': form})
+
+
+def field_list(request):
+    query = request.GET.get('q', '').strip()
+    venue = requested_venue(request)
+    fields = search_fields(query, venue=venue) if query else for_venue(Field.objects.order_by('name'), venue)
+    return render(request, 'field_list.html', {
+        'fields': fields, 'query': query, 'venue': venue, 'venues': Venue.objects.all(),
+    })
+
+
+@require_GET
+@throttle('nearby_api')
+def nearby_fields_api(request):
+    """
+    ?lat=&lng= [&radius=<km>] [&limit=] [&date=&start=&end=]
+
+    Fields within `radius` km, or the `limit` nearest ones when no radius is
+    given. With date/start/end, only fields open and free for that whole
+    slot: no approved booking and nobody else paying for it.
+    """
+    try:
+        lat = float(request.GET['lat'])
+        lng = float(request.GET['lng'])
+        radius = float(request.GET['radius']) if request.GET.get('radius') else None
+        limit = min(int(request.GET.get('limit', 5)), 50)
+        slot = [request.GET.get(k) for k in ('date', 'start', 'end')]
+        if any(slot):
+            slot = [date.fromisoformat(slot[0]), time.fromisoformat(slot[1]), time.fromisoformat(slot[2])]
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({'detail': "lat and lng are required; radius, limit, date, start and end must be valid."},
+                            status=400)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (radius is not None and not 0 < radius <= 200):
+        return JsonResponse({'detail': "Coordinates or radius out of range."}, status=400)
+
+    fields = Field.objects.all()
+    if any(slot):
+        fields = available_between(fields, *slot, user=request.user)
+    if radius is None:
+        found = nearest_fields(lat, lng, limit=limit, queryset=fields)
+    else:
+        found = fields_within(lat, lng, radius, queryset=fields)[:limit]
+
+    return JsonResponse({'fields': [{
+        'id': field.id,
+        'name': field.name,
+        'location': field.location,
+        'price_per_hour': str(field.price_per_hour),
+        'distance_km': round(distance, 2),
+        'url': reverse('field_detail', args=[field.id]),
+        'book_url': reverse('book_field', args=[field.id]),
+    } for field, distance in found]})
+
+
+# ============================================================
+# PROFILE
+# ============================================================
+
+@login_required
+def profile_view(request):
+    if request.method == 'POST':
+        form = ProfileForm(request.POST, instance=request.user)
+        if form.is_valid():
+            form.save()
+            messages.success(request, "Profile updated!")
+            return redirect('profile')
+    else:
+        form = ProfileForm(instance=request.user)
+
+    return render(request, 'profile.html', {'form': form})
+
+
+def field_detail(request, field_id):
+    field = get_object_or_404(Field, id=field_id)
+
+    # newest-first review feed, paged by id (?before=<review id>) so any
+    # page is one index range scan, however many reviews the field has
+    reviews = field.reviews.select_related('user').order_by('-id')
+    before = request.GET.get('before', '')
+    if before.isdigit():
+        reviews = reviews.filter(id__lt=int(before))
+    reviews = list(reviews[:REVIEWS_PER_PAGE + 1])
+    older = reviews[REVIEWS_PER_PAGE - 1].id if len(reviews) > REVIEWS_PER_PAGE else None
+
+    return render(request, 'field_detail.html', {
+        'field': field,
+        'reviews': reviews[:REVIEWS_PER_PAGE],
+        'older_before': older,
+        'is_first_page': not before.isdigit(),
+    })
@@ -0,0 +1,91 @@
+from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from ..archive import booking_sources, get_booking_or_404
+from ..venues import staff_bookings
+
+
+# ============================================================
+# RECEIPTS
+# ============================================================
+
+def generate_qr_base64(data: str) -> str:
+    # qrcode (and Pillow behind it) is only needed on receipt pages
+    import base64
+    from io import BytesIO
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        box_size=6,
+        border=2
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    qr_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    return qr_base64
+
+
+@login_required
+def booking_receipt(request, booking_id):
+    booking = get_booking_or_404(id=booking_id, user=request.user)
+
+    payment_text = (
+        f"Futsal Payment\n"
+        f"Field: {booking.field.name}\n"
+        f"Date: {booking.date}\n"
+        f"Time: {booking.start_time}-{booking.end_time}\n"
+        f"Amount: Rs. {booking.amount}\n"
+        f"Pay to: 98XXXXXXXX (example)"
+    )
+
+    qr_base64 = generate_qr_base64(payment_text)
+
+    return render(request, 'booking_receipt.html', {
+        'booking': booking,
+        'qr_base64': qr_base64,
+    })
+
+@staff_member_required
+def admin_receipt(request, booking_id):
+    # only bookings at the venues this staff member manages
+    sources = [staff_bookings(request.user, manager.all()) for manager in booking_sources()]
+    booking = get_booking_or_404(sources, id=booking_id)
+
+    payment_text = (
+        f"Futsal Payment\n"
+        f"Field: {booking.field.name}\n"
+        f"Date: {booking.date}\n"
+        f"Time: {booking.start_time}-{booking.end_time}\n"
+        f"Amount: Rs. {booking.amount}\n"
+        f"Pay to: 98XXXXXXXX"
+    )
+
+    qr_base64 = generate_qr_base64(payment_text)
+
+    return render(request, 'booking_receipt.html', {
+        'booking': booking,
+        'admin_view': True,
+        'qr_base64': qr_base64,
+    })
+
+
+@login_required
+def booking_receipt_pdf(request, booking_id):
+    import pdfkit
+
+    booking = get_booking_or_404(id=booking_id, user=request.user)
+
+    html = render_to_string('booking_receipt.html', {'booking': booking})
+    pdf = pdfkit.from_string(html, False)
+
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename=receipt_{booking.id}.pdf'
+    return response
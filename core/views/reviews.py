@@ -0,0 +1,34 @@
+from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.db import IntegrityError, transaction
+
+from ..models import Field, Review
+from ..forms import ReviewForm
+
+
+@login_required
+def add_review(request, field_id):
+    field = get_object_or_404(Field, id=field_id)
+    if Review.objects.filter(field=field, user=request.user).exists():
+        messages.error(request, "You already reviewed this field.")
+        return redirect('field_detail', field_id=field.id)
+
+    if request.method == 'POST':
+        form = ReviewForm(request.POST)
+        if form.is_valid():
+            rev = form.save(commit=False)
+            rev.field = field
+            rev.user = request.user
+            try:
+                # the review and the field's rating counters commit together
+                with transaction.atomic():
+                    rev.save()
+            except IntegrityError:  # a concurrent submit won the unique constraint
+                messages.error(request, "You already reviewed this field.")
+                return redirect('field_detail', field_id=field.id)
+            messages.success(request, "Review submitted!")
+            return redirect('field_detail', field_id=field.id)
+    else:
+        form = ReviewForm()
+    return render(request, 'add_review.html', {'form': form, 'field': field})
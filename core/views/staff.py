@@ -0,0 +1,199 @@
+import time
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404, redirect, render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, JsonResponse
+from django.contrib import messages
+from django.db import transaction
+from django.utils import timezone
+
+from .. import events
+from ..models import Booking
+from ..db_router import reporting_view
+from ..emails import send_booking_email
+from ..archive import booking_sources, merged_bookings
+from ..throttle import throttle_stats
+from .. import metrics, profiling
+from ..timing import render_timed
+from ..venues import current_venue, for_venue, staff_bookings
+from ..waitlist import release_slot
+
+
+# ============================================================
+# ADMIN MANAGEMENT
+# ============================================================
+
+@staff_member_required
+def admin_dashboard(request):
+    venue, venues = current_venue(request)
+    started = time.perf_counter()
+    bookings = list(
+        for_venue(Booking.objects, venue)
+        .select_related('user', 'field', 'team').order_by('-date', '-start_time')
+    )
+    db_ms = (time.perf_counter() - started) * 1000
+    return render_timed(request, 'admin_dashboard.html', {
+        'bookings': bookings, 'venue': venue, 'venues': venues,
+    }, db_ms=db_ms)
+
+
+@staff_member_required
+def update_booking_status(request, booking_id, status):
+    booking = get_object_or_404(staff_bookings(request.user), id=booking_id)
+    
+    if request.method == 'POST':
+        old_status = booking.status
+        was_approved = old_status == 'approved'
+        booking.status = status
+        with transaction.atomic():
+            booking.save()
+            events.log_changes(booking, old_status=old_status, actor=request.user)
+        messages.success(request, f"Booking updated to {status.title()}.")
+
+        if status == 'approved':
+            send_booking_email(booking, 'approved')
+        elif status == 'rejected':
+            send_booking_email(booking, 'rejected')
+
+        if was_approved and status != 'approved':
+            promoted = release_slot(booking)
+            if promoted:
+                messages.info(request, f"Slot given to {len(promoted)} waitlisted request(s).")
+    
+    return redirect('admin_dashboard')
+
+
+@staff_member_required
+def update_payment_status(request, booking_id, action):
+    booking = get_object_or_404(staff_bookings(request.user), id=booking_id)
+
+    if request.method == 'POST':
+        old_status, old_payment_status = booking.status, booking.payment_status
+        if action == "paid":
+            booking.payment_status = "paid"
+            booking.payment_date = timezone.now()
+        elif action == "unpaid":
+            booking.payment_status = "unpaid"
+            booking.payment_date = None
+        elif action == "refunded":
+            booking.payment_status = "refunded"
+            # a refunded booking is cancelled; stop it blocking the slot
+            freed = booking.status == 'approved'
+            if freed:
+                booking.status = "rejected"
+
+        with transaction.atomic():
+            booking.save()
+            events.log_changes(booking, old_status=old_status,
+                               old_payment_status=old_payment_status, actor=request.user)
+        messages.success(request, "Payment status updated.")
+        send_booking_email(booking, 'payment')
+
+        if action == "refunded" and freed:
+            promoted = release_slot(booking)
+            if promoted:
+                messages.info(request, f"Slot given to {len(promoted)} waitlisted request(s).")
+
+    return redirect('admin_dashboard')
+
+
+@staff_member_required
+def throttle_stats_api(request):
+    return JsonResponse(throttle_stats())
+
+
+def prometheus_metrics(request):
+    # scraped without a session, so allow the configured addresses as well as staff
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS and not request.user.is_staff:
+        raise Http404
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@staff_member_required
+def profiling_index(request):
+    if request.method == 'POST':
+        profiling.clear(request.POST.get('view') or None)
+        messages.success(request, "Profiles cleared.")
+        return redirect('profiling_index')
+
+    views = [
+        {'name': name, 'samples': samples, 'seconds': samples * settings.PROFILING_INTERVAL_MS / 1000}
+        for name, samples in profiling.profiled_views().items()
+    ]
+    return render(request, 'profiling.html', {
+        'views': views,
+        'enabled': settings.PROFILING_ENABLED,
+        'watched': settings.PROFILING_VIEWS,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE * 100,
+    })
+
+
+@staff_member_required
+def profiling_download(request, view_name, fmt):
+    stacks = profiling.load_stacks(view_name)
+    if not stacks:
+        raise Http404("No samples for this view.")
+    filename = profiling.safe_name(view_name)
+    if fmt == 'svg':
+        response = HttpResponse(profiling.flamegraph_svg(stacks, view_name), content_type='image/svg+xml')
+    else:
+        response = HttpResponse(profiling.folded_text(stacks), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.folded"'
+    return response
+
+
+@staff_member_required
+@reporting_view
+def export_bookings_excel(request):
+    import openpyxl
+    from openpyxl.utils import get_column_letter
+
+    # live and archived bookings of the current venue, newest first
+    venue, _ = current_venue(request)
+    bookings = merged_bookings(
+        *(for_venue(source, venue).select_related('user', 'field').order_by('-date', '-start_time')
+          for source in booking_sources()),
+        key=lambda b: (b.date, b.start_time),
+        reverse=True,
+    )
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Bookings"
+
+    # Header row
+    headers = [
+        "User", "Field", "Date", "Start Time", "End Time", 
+        "Amount (Rs)", "Payment Status", "Booking Status", "Created At"
+    ]
+
+    ws.append(headers)
+
+    # Data rows
+    for b in bookings:
+        ws.append([
+            b.user.username,
+            b.field.name,
+            b.date.strftime("%Y-%m-%d"),
+            b.start_time.strftime("%H:%M"),
+            b.end_time.strftime("%H:%M"),
+            float(b.amount),
+            b.payment_status,
+            b.status,
+            b.created_at.strftime("%Y-%m-%d %H:%M"),
+        ])
+
+    # Auto-column width
+    for i, col in enumerate(ws.columns, 1):
+        max_length = max(len(str(cell.value)) for cell in col)
+        ws.column_dimensions[get_column_letter(i)].width = max_length + 2
+
+    # Response
+    response = HttpResponse(
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = 'attachment; filename="bookings.xlsx"'
+
+    wb.save(response)
+    return response
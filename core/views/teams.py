@@ -0,0 +1,112 @@
+from datetime import date
+
+from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+
+from .. import pickup
+from ..models import Field, Team, TeamMember, Venue
+from ..forms import TeamForm
+from ..venues import for_venue, requested_venue
+
+PICKUP_GAMES_SHOWN = 100
+
+
+@login_required
+def my_teams(request):
+    teams = TeamMember.objects.filter(user=request.user)
+    return render(request, "my_teams.html", {"teams": teams})
+
+
+@login_required
+def team_list(request):
+    my_teams = request.user.teams.all()
+    other_public_teams = Team.objects.filter(is_public=True).exclude(members=request.user)
+    return render(request, 'team_list.html', {
+        'my_teams': my_teams,
+        'other_public_teams': other_public_teams
+    })
+
+@login_required
+def create_team(request):
+    if request.method == 'POST':
+        form = TeamForm(request.POST)
+        if form.is_valid():
+            team = form.save(commit=False)
+            team.owner = request.user
+            team.save()
+            team.members.add(request.user)
+            messages.success(request, "Team created and you were added as a member.")
+            return redirect('team_list')
+    else:
+        form = TeamForm()
+    return render(request, 'create_team.html', {'form': form})
+
+@login_required
+def join_team(request, team_id):
+    team = get_object_or_404(Team, id=team_id, is_public=True)
+    team.members.add(request.user)
+    messages.success(request, f"You joined team {team.name}.")
+    return redirect('team_list')
+
+def leave_team(request, team_id):
+    team = get_object_or_404(Team, id=team_id)
+    if request.user in team.members.all():
+        team.members.remove(request.user)
+        messages.success(request, f"You left team {team.name}.")
+    return redirect('team_list')
+
+
+# ------------------------------------------------------------
+# PICKUP GAMES
+# ------------------------------------------------------------
+
+def pickup_games(request):
+    """Open public games to join, filtered by ?date=, ?field=, ?venue= and ?spots=."""
+    try:
+        day = date.fromisoformat(request.GET['date']) if request.GET.get('date') else None
+    except ValueError:
+        day = None
+    field_id = request.GET.get('field', '')
+    field_id = int(field_id) if field_id.isdigit() else None
+    spots = request.GET.get('spots', '')
+    min_spots = int(spots) if spots.isdigit() else 1
+    venue = requested_venue(request)
+
+    games = list(
+        pickup.find_games(date=day, field_id=field_id, venue=venue, min_spots=min_spots)
+        .select_related('booking__field')[:PICKUP_GAMES_SHOWN]
+    )
+    joined = set()
+    if request.user.is_authenticated and games:
+        joined = set(TeamMember.objects.filter(
+            user=request.user, team_id__in=[g.id for g in games],
+        ).values_list('team_id', flat=True))
+
+    return render(request, 'pickup_games.html', {
+        'games': games, 'joined': joined, 'day': day, 'field_id': field_id, 'min_spots': min_spots,
+        'venue': venue, 'venues': Venue.objects.all(),
+        'fields': for_venue(Field.objects.order_by('name').only('id', 'name'), venue),
+    })
+
+
+@login_required
+def join_pickup_game(request, game_id):
+    if request.method != 'POST':
+        return redirect('pickup_games')
+    try:
+        pickup.join_game(game_id, request.user)
+    except pickup.JoinRefused as exc:
+        messages.error(request, f"⚠️ {exc}")
+    else:
+        messages.success(request, "You're in! See you on the pitch.")
+    return redirect('pickup_games')
+
+
+@login_required
+def leave_pickup_game(request, game_id):
+    if request.method != 'POST':
+        return redirect('pickup_games')
+    if pickup.leave_game(game_id, request.user):
+        messages.success(request, "You left the game.")
+    return redirect('pickup_games')
@@ -0,0 +1,113 @@
+"""
+Per-slot waitlists.
+
+A user who asks for a slot that is already booked can join the waitlist for
+that (field, date, time range). When an approved booking stops holding its
+slot (rejected, or refunded), release_slot() hands the slot to the head of
+the queue: the waiting entry with the highest priority, then the oldest,
+whose time range fits inside the freed one. The lookup walks
+waitlist_queue_idx in order, so it costs an index seek plus a handful of
+rows, however many pending bookings or waitlist entries exist.
+
+Entries that clash with another approved booking or with someone's active
+slot hold (core/holds.py) are skipped: the holder is paying for that slot.
+The promoted user gets an approved booking and a queued Notification
+(sent by `manage.py send_notifications`).
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .events import log_created
+from .holds import overlapping_holds
+from .models import Booking, WaitlistEntry, Notification, booking_amount
+
+# waiting entries looked at per freed slot before giving up; entries that fit
+# the freed range but clash with another approved booking or an active hold
+# are skipped
+PROBES = 20
+
+
+def join_waitlist(user, field, date, start_time, end_time, team=None, priority=0):
+    """Add a waiting entry, or return the user's existing one for the same slot."""
+    entry, _ = WaitlistEntry.objects.get_or_create(
+        user=user, field=field, date=date, start_time=start_time, end_time=end_time,
+        status='waiting',
+        defaults={'team': team, 'priority': priority},
+    )
+    return entry
+
+
+def queue_position(entry):
+    """1-based place of a waiting entry among the entries for its slot."""
+    ahead = WaitlistEntry.objects.filter(
+        Q(priority__gt=entry.priority) | Q(priority=entry.priority, requested_at__lt=entry.requested_at),
+        field_id=entry.field_id, date=entry.date, status='waiting',
+        start_time=entry.start_time, end_time=entry.end_time,
+    ).count()
+    return ahead + 1
+
+
+def _overlaps_approved(field_id, date, start_time, end_time):
+    return Booking.objects.filter(
+        field_id=field_id, date=date, status='approved',
+        start_time__lt=end_time, end_time__gt=start_time,
+    ).exists()
+
+
+def promote_next(field_id, date, start_time, end_time):
+    """
+    Give the free range [start_time, end_time) on field/date to waiting
+    entries, head of the queue first, until nothing else fits.
+    Returns the bookings created.
+    """
+    if date < timezone.localdate():
+        return []
+
+    promoted = []
+    with transaction.atomic():
+        queue = (
+            WaitlistEntry.objects.select_for_update()
+            .select_related('field')
+            .filter(
+                field_id=field_id, date=date, status='waiting',
+                start_time__gte=start_time, end_time__lte=end_time,
+            )
+            .order_by('-priority', 'requested_at')
+        )
+        for entry in queue[:PROBES]:
+            if _overlaps_approved(field_id, date, entry.start_time, entry.end_time):
+                continue
+            if overlapping_holds(field_id, date, entry.start_time, entry.end_time).exists():
+                continue
+
+            booking = Booking.objects.create(
+                user_id=entry.user_id,
+                field_id=field_id,
+                team_id=entry.team_id,
+                date=date,
+                start_time=entry.start_time,
+                end_time=entry.end_time,
+                status='approved',
+                amount=booking_amount(entry.field.price_per_hour, date, entry.start_time, entry.end_time),
+                payment_status='unpaid',
+            )
+            log_created([booking])
+            entry.status = 'promoted'
+            entry.booking = booking
+            entry.save(update_fields=['status', 'booking'])
+            Notification.objects.create(user_id=entry.user_id, booking=booking, kind='waitlist_promoted')
+            promoted.append(booking)
+    return promoted
+
+
+def release_slot(booking):
+    """Call after `booking` stopped being approved; promotes whoever is next."""
+    return promote_next(booking.field_id, booking.date, booking.start_time, booking.end_time)
+
+
+def release_slots(bookings):
+    promoted = []
+    for booking in bookings:
+        promoted += release_slot(booking)
+    return promoted
@@ -38,18 +38,22 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'futsal_app',
     'core',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'futsal_project.urls'
@@ -79,8 +83,121 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Read-only replica for reporting reads (analytics, exports, leaderboard).
+    # Locally a SQLite snapshot of 'default', see `manage.py refresh_replica`.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Reporting reads fall back to 'default' when the replica is older than this (seconds)
+REPLICA_MAX_STALENESS = 15 * 60
+
+# Bookings dated further back than this are moved to ArchivedBooking by
+# `manage.py archive_bookings`
+BOOKING_ARCHIVE_HORIZON_DAYS = 90
+
+# Utilization heatmap on the analytics dashboard (core/utilization.py):
+# default and longest date range, how long a computed range stays cached, and
+# how long the per-month totals of past months are reused (seconds)
+UTILIZATION_DEFAULT_DAYS = 28
+UTILIZATION_MAX_DAYS = 366
+UTILIZATION_CACHE_SECONDS = 10 * 60
+UTILIZATION_MONTH_CACHE_SECONDS = 24 * 60 * 60
+
+# Demand forecasts (core/forecasting.py, `manage.py refresh_forecasts`):
+# weeks of history fitted, how fast older weeks lose weight, how long past
+# forecasts are kept, and how long the dashboard table is cached (seconds)
+FORECAST_HISTORY_WEEKS = 104
+FORECAST_HALF_LIFE_WEEKS = 12
+FORECAST_KEEP_DAYS = 60
+FORECAST_CACHE_SECONDS = 60 * 60
+
+# Booking event log consumers (core/events.py, `manage.py consume_events`):
+# name -> dotted path of a function taking a list of BookingEvents. A consumer
+# waits this long (seconds) at a gap in event ids before skipping it.
+BOOKING_EVENT_CONSUMERS = {
+    'utilization_months': 'core.utilization.forget_changed_months',
+}
+BOOKING_EVENT_GAP_GRACE_SECONDS = 60
+
+# Slots are held this long (minutes) for a player paying with Khalti (core/holds.py);
+# `manage.py sweep_holds --interval 60` releases expired holds, and deletes them
+# SLOT_HOLD_RETENTION_DAYS later, once reconcile_payments has checked their payments
+SLOT_HOLD_MINUTES = 10
+SLOT_HOLD_RETENTION_DAYS = 30
+
+# Khalti merchant API, used to verify payments and by `manage.py reconcile_payments`
+# (core/reconcile.py). Point KHALTI_API_URL at `manage.py stub_gateway` to try it locally.
+KHALTI_API_URL = 'https://khalti.com/api/v2/'
+KHALTI_SECRET_KEY = 'test_secret_key_1234567890'
+# Reconciliation: concurrent gateway lookups, (connect, read) timeout per request
+# in seconds, and retries of failed requests with exponential backoff
+RECONCILE_CONCURRENCY = 8
+RECONCILE_TIMEOUT = (3.05, 10)
+RECONCILE_RETRIES = 3
+
+# iCalendar feeds (core/ics.py): days before and after today each feed covers,
+# and how long a rendered feed stays cached (it is also rebuilt when it changes)
+ICS_PAST_DAYS = 30
+ICS_FUTURE_DAYS = 180
+ICS_CACHE_SECONDS = 24 * 60 * 60
+
+# REST API (core/api), served under /api/v1/
+REST_FRAMEWORK = {
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
+    'ALLOWED_VERSIONS': ['v1'],
+    'DEFAULT_PAGINATION_CLASS': 'core.api.pagination.IdCursorPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+}
+
+# Token-bucket rate limits (core/throttle.py), shared by all workers on the host
+# through a memory-mapped file. Each kind maps to (burst capacity, tokens per second):
+# 'user' applies to logged-in users, 'ip' to anonymous clients.
+THROTTLE_RATES = {
+    'calendar_api': {
+        'ip': (30, 0.5),
+        'user': (60, 1.0),
+    },
+    'nearby_api': {
+        'ip': (20, 0.5),
+        'user': (40, 1.0),
+    },
 }
+THROTTLE_STORE_PATH = BASE_DIR / 'throttle.bin'
+THROTTLE_STORE_SLOTS = 65536
+
+# Sampling profiler (core/profiling.py). When enabled, requests to the URL names in
+# PROFILING_VIEWS, a random PROFILING_SAMPLE_RATE share of all requests, and staff
+# requests sent with "X-Profile: 1" are sampled every PROFILING_INTERVAL_MS.
+# Collapsed stacks are kept under PROFILING_DIR and browsed by staff at /profiling/.
+PROFILING_ENABLED = False
+PROFILING_VIEWS = []  # e.g. ['leaderboard', 'export_excel', 'book_field']
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_INTERVAL_MS = 5
+PROFILING_DIR = BASE_DIR / 'profiles'
+
+# Prometheus metrics (core/metrics.py), served at /metrics. Each worker process
+# writes its own memory-mapped file in METRICS_DIR; files of exited workers are
+# merged into one at the next scrape, so the directory needs no manual cleanup.
+# Scrapes are accepted from these addresses, and from logged-in staff.
+METRICS_ENABLED = True
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
 
 
 # Password validation
@@ -119,6 +236,18 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# collectstatic writes content-hashed names plus .gz/.br variants,
+# which core.middleware.StaticFilesMiddleware serves with far-future caching
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "core.static_storage.CompressedManifestStaticFilesStorage",
+    },
+}
 
 
 MEDIA_URL = '/media/'